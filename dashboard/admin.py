@@ -2,8 +2,9 @@ from django.contrib import admin
 from .models import (
     TraitSchedule, TraitTimeline, PlantTraitData, FieldPlot, Trial,
     Germplasm, ObservationLevel, Sample, Season, Program,
-    Person, ObservationMethod, Image
+    Person, ObservationMethod, Image, TraitMatrix, Location
 )
+from .brapi_cache import bump_data_version
 import csv
 from django.http import HttpResponse
 from rangefilter.filters import DateRangeFilter
@@ -59,6 +60,7 @@ class TraitTimelineAdmin(admin.ModelAdmin):
 
     def mark_as_completed(self, request, queryset):
         updated = queryset.update(status_flag='❌')
+        bump_data_version(TraitTimeline)
         self.message_user(request, f"{updated} record(s) marked as ❌ (completed).")
 
     mark_as_completed.short_description = "Mark selected as ❌ (completed)"
@@ -81,6 +83,21 @@ class PlantTraitDataAdmin(admin.ModelAdmin):
     ordering = ('-timestamp',)
     list_per_page = 25
 
+@admin.register(TraitMatrix)
+class TraitMatrixAdmin(admin.ModelAdmin):
+    list_display = ('upload_id', 'uploaded_by', 'row_count', 'created_on')
+    list_filter = ('uploaded_by',)
+    readonly_fields = ('upload_id', 'created_on')
+    ordering = ('-created_on',)
+    list_per_page = 25
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('locationDbId', 'locationName', 'plot_count', 'latitude', 'longitude', 'updated_on')
+    search_fields = ('locationName',)
+    # Maintained from FieldPlot by dashboard.location_index
+    readonly_fields = [f.name for f in Location._meta.fields]
+
 @admin.register(FieldPlot)
 class FieldPlotAdmin(admin.ModelAdmin):
     list_display = ('plant_id', 'latitude', 'longitude', 'status', 'planting_date')
@@ -0,0 +1,29 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_save
+
+
+class DashboardConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'dashboard'
+
+    # Models served through BrAPI; their writes invalidate ETags and cached pages
+    BRAPI_MODELS = (
+        'PlantTraitData', 'FieldPlot', 'Germplasm', 'Trial', 'Sample', 'TraitSchedule',
+        'Program', 'Person', 'ObservationMethod', 'Image', 'ObservationLevel', 'Season', 'Location',
+    )
+    # Also versioned: cached PDF reports (dashboard.pdf_jobs) are keyed on them
+    REPORT_MODELS = ('TraitTimeline',)
+
+    def ready(self):
+        from .brapi_cache import bump_on_write
+        from .location_index import refresh_plot_location, remember_previous_location
+
+        for name in self.BRAPI_MODELS + self.REPORT_MODELS:
+            model = self.get_model(name)
+            post_save.connect(bump_on_write, sender=model, dispatch_uid=f'brapi_version_save_{name}')
+            post_delete.connect(bump_on_write, sender=model, dispatch_uid=f'brapi_version_delete_{name}')
+
+        plot = self.get_model('FieldPlot')
+        pre_save.connect(remember_previous_location, sender=plot, dispatch_uid='location_index_pre_save')
+        post_save.connect(refresh_plot_location, sender=plot, dispatch_uid='location_index_save')
+        post_delete.connect(refresh_plot_location, sender=plot, dispatch_uid='location_index_delete')
@@ -0,0 +1,98 @@
+"""
+dashboard.benchmarks
+
+Shared pieces of the benchmark_* management commands: synthetic rows
+inserted in batches inside a transaction that is rolled back, timing, and
+parity checks that print the first differences and fail the command.
+
+    class Command(BenchmarkCommand):
+        def handle(self, *args, **opts):
+            with rolled_back():
+                insert_in_batches(TraitTimeline, synthetic_rows())
+                fast_ms, got = timed(lambda: ...)
+                slow_ms, expected = timed(lambda: ...)
+                if got != expected:
+                    self.mismatch("...")
+            self.check_parity("rows differ")
+"""
+
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+TRAITS_PER_PLANT = 20
+INSERT_BATCH_SIZE = 10000
+# Differences printed by BenchmarkCommand.mismatch(); later ones are only counted
+MAX_REPORTED = 10
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is rolled back when it ends."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def batches(objs, size=INSERT_BATCH_SIZE):
+    batch = []
+    for obj in objs:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_in_batches(model, objs):
+    for batch in batches(objs):
+        model.objects.bulk_create(batch)
+
+
+def timed(function):
+    """(elapsed ms, result) of one call of ``function``."""
+    started = time.perf_counter()
+    result = function()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def best_of(repeat, function):
+    """(best elapsed ms, result) over ``repeat`` calls of ``function``."""
+    best = result = None
+    for _ in range(repeat):
+        elapsed, result = timed(function)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def speedup(slow_ms, fast_ms):
+    return f"{slow_ms / fast_ms if fast_ms else float('inf'):.1f}×"
+
+
+class BenchmarkCommand(BaseCommand):
+    """A benchmark that also checks two implementations agree."""
+
+    def execute(self, *args, **options):
+        self.mismatches = 0
+        return super().execute(*args, **options)
+
+    def mismatch(self, message):
+        """Count one difference, printing the first MAX_REPORTED."""
+        self.mismatches += 1
+        if self.mismatches <= MAX_REPORTED:
+            self.stdout.write(self.style.ERROR(f"  {message}"))
+
+    def check_parity(self, message):
+        """Fail the command with "<count> <message>" if there was any mismatch."""
+        if self.mismatches:
+            raise CommandError(f"{self.mismatches} {message}")
@@ -0,0 +1,128 @@
+"""
+dashboard.brapi_batch
+
+Several BrAPI GETs in one round trip: POST /brapi/v2/batch with
+
+    {"requests": ["calls", "programs", {"id": "units", "path": "observationunits",
+                                        "params": {"studyDbId": "1", "pageSize": 100}}]}
+
+Each sub-request is dispatched to its view with the batch request's
+already-authenticated user, so the OAuth token is checked once. Only GETs
+are run (they are read-only, which is what makes running them concurrently
+safe); they go to a small thread pool (BRAPI_BATCH_WORKERS, default 4) and
+their results come back in request order.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+BRAPI_URLCONF = 'dashboard.urls.brapi_urls'
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_REQUESTS = 20
+
+# Headers of the batch POST that make no sense on its GETs
+DROPPED_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_ENCODING', 'HTTP_IF_NONE_MATCH')
+
+
+def max_requests():
+    return getattr(settings, 'BRAPI_BATCH_MAX_REQUESTS', DEFAULT_MAX_REQUESTS)
+
+
+def parse_sub_request(item, index):
+    """(id, path, query string) of one entry of ``requests``; raises ValueError."""
+    if isinstance(item, str):
+        item = {'path': item}
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        raise ValueError(f"requests[{index}] must be a path or an object with a 'path'")
+    url = urlsplit(item['path'])
+    path = url.path.lstrip('/')
+    if path.startswith('brapi/v2/'):
+        path = path[len('brapi/v2/'):]
+    params = item.get('params') or {}
+    if not isinstance(params, dict):
+        raise ValueError(f"requests[{index}].params must be an object")
+    query = '&'.join(part for part in (url.query, urlencode(params, doseq=True)) if part)
+    return str(item.get('id', index)), path, query
+
+
+def sub_request(request, prefix, path, query):
+    """A GET HttpRequest for ``path`` that reuses the authentication of ``request``."""
+    params = QueryDict(query, mutable=True)
+    params.pop('stream', None)  # a streamed body cannot be embedded
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = prefix + path
+    sub.META = {key: value for key, value in request.META.items() if key not in DROPPED_META}
+    sub.META.update(REQUEST_METHOD='GET', PATH_INFO=sub.path, QUERY_STRING=params.urlencode(),
+                    HTTP_ACCEPT='application/json')
+    sub.GET = params
+    # Picked up by DRF's Request instead of running the authenticators again
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    sub.user = request.user
+    return sub
+
+
+def dispatch(request, prefix, path, query):
+    """(status code, data) of one sub-request."""
+    try:
+        match = resolve('/' + path, urlconf=BRAPI_URLCONF)
+    except Resolver404:
+        return 404, None
+    if match.url_name == 'brapi_batch':
+        return 400, None
+    try:
+        response = match.func(sub_request(request, prefix, path, query), *match.args, **match.kwargs)
+    except Http404:
+        return 404, None
+    return response.status_code, getattr(response, 'data', None)
+
+
+def dispatch_in_thread(request, prefix, path, query):
+    close_old_connections()
+    try:
+        return dispatch(request, prefix, path, query)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+
+
+def batch_workers():
+    return getattr(settings, 'BRAPI_BATCH_WORKERS', DEFAULT_WORKERS)
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=batch_workers(), thread_name_prefix='brapi-batch')
+    return _executor
+
+
+def run_batch(request, prefix, sub_requests):
+    """
+    Run the parsed ``sub_requests`` ((id, path, query) tuples) and return one
+    {"id", "path", "status", "body"} dict per sub-request, in order.
+    """
+    if batch_workers() and len(sub_requests) > 1:
+        futures = [executor().submit(dispatch_in_thread, request, prefix, path, query)
+                   for _, path, query in sub_requests]
+        outcomes = [future.result() for future in futures]
+    else:
+        outcomes = [dispatch(request, prefix, path, query) for _, path, query in sub_requests]
+
+    results = []
+    for (sub_id, path, query), (status_code, data) in zip(sub_requests, outcomes):
+        results.append({
+            "id": sub_id,
+            "path": path + (f"?{query}" if query else ''),
+            "status": status_code,
+            "body": data,
+        })
+    return results
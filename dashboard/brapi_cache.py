@@ -0,0 +1,145 @@
+"""
+dashboard.brapi_cache
+
+Conditional GET and response caching for BrAPI endpoints.
+
+Every model a BrAPI view reads from has a write counter in DataVersion. It is
+bumped by post_save/post_delete signals and explicitly by the bulk write paths
+(which bypass signals). A view decorated with ``@brapi_cache(Model, ...)``:
+
+* derives an ETag from the request path, Accept header and the current
+  versions of its models (one indexed query) and answers ``304 Not Modified`` when it matches
+  ``If-None-Match``;
+* keeps the serialized page in a bounded per-process LRU keyed by the same
+  data, so repeated polls skip the query and serialization entirely. Pages
+  of more than BRAPI_CACHE_MAX_RECORDS records (default 1000, the default
+  pageSize) are not kept, so the LRU stays within entries x records however
+  large a pageSize clients ask for.
+
+A write changes the version, so stale entries are never served and simply age
+out of the LRU.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import DataVersion
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_RECORDS = 1000
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def data_versions(*models):
+    """Current version of each model, in the order given (0 if never written)."""
+    labels = [model_label(m) for m in models]
+    found = dict(DataVersion.objects.filter(model_label__in=labels).values_list('model_label', 'version'))
+    return tuple(found.get(label, 0) for label in labels)
+
+
+def bump_data_version(*models):
+    """Record a write to ``models``; call this from bulk paths that skip model signals."""
+    for model in models:
+        label = model_label(model)
+        if not DataVersion.objects.filter(model_label=label).update(version=F('version') + 1):
+            version, created = DataVersion.objects.get_or_create(model_label=label, defaults={'version': 1})
+            if not created:
+                DataVersion.objects.filter(pk=version.pk).update(version=F('version') + 1)
+
+
+def bump_on_write(sender, **kwargs):
+    """post_save / post_delete receiver, connected in DashboardConfig.ready()."""
+    bump_data_version(sender)
+
+
+class ResponseCache:
+    """A small thread-safe LRU of serialized BrAPI payloads."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(getattr(settings, 'BRAPI_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+
+def cacheable(data):
+    """Whether a BrAPI payload is small enough for response_cache."""
+    try:
+        records = data['result']['data']
+    except (KeyError, TypeError):
+        return True
+    return not isinstance(records, list) or len(records) <= getattr(
+        settings, 'BRAPI_CACHE_MAX_RECORDS', DEFAULT_MAX_RECORDS)
+
+
+def make_etag(path, versions, variant=''):
+    digest = hashlib.sha1(f"{path}|{versions}|{variant}".encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def brapi_cache(*models):
+    """
+    Decorate a BrAPI view (below ``@api_view``) that reads from ``models``.
+    Only GET requests are cached; other methods pass straight through.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            path = request.get_full_path()
+            versions = data_versions(*models)
+            # Endpoints with several renderers (JSON / CSV) differ by Accept
+            etag = make_etag(path, versions, request.META.get('HTTP_ACCEPT', ''))
+
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+            if etag in [tag.strip() for tag in if_none_match.split(',')]:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+
+            cached = response_cache.get(etag)
+            if cached is not None:
+                response = Response(cached)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                # Streamed pages are never held in memory, so only their ETag applies
+                if isinstance(response, Response) and cacheable(response.data):
+                    response_cache.set(etag, response.data)
+            response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,253 @@
+"""
+dashboard.brapi_search
+
+The BrAPI v2 search pattern: POST /search/{entity} with a filter body,
+GET /search/{entity}/{searchResultsDbId} for the results.
+
+A search is first probed with a bounded LIMIT query. Small result sets are
+answered immediately; larger ones are saved as a SearchRequest and run by a
+background worker, so heavy cross-trial queries do not hold a request
+worker. The matching primary keys are stored sorted, delta-encoded and
+zlib-compressed, and pages are fetched from them by primary key.
+
+Searches run on a small in-process thread pool (BRAPI_SEARCH_WORKERS,
+default 2). With BRAPI_SEARCH_WORKERS = 0 they are left pending for the
+run_brapi_searches command. A search queued or running for longer than
+BRAPI_SEARCH_TIMEOUT seconds is taken to have lost its worker (e.g. to a
+restart) and is queued again; one that has been running MAX_ATTEMPTS times
+is failed.
+"""
+
+import datetime
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import FieldPlot, Germplasm, PlantTraitData, Sample, SearchRequest, TraitSchedule, Trial
+
+DEFAULT_SYNC_LIMIT = 1000
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 900
+MAX_ATTEMPTS = 2
+
+
+def as_list(value):
+    if value is None or value == '' or value == []:
+        return None
+    return value if isinstance(value, list) else [value]
+
+
+def query_datetime(value):
+    """Aware datetime from an ISO 8601 date or date-time; raises ValueError."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def body_datetime(params, key):
+    """query_datetime() of a search body value, or None when absent; raises ValueError naming ``key``."""
+    value = params.get(key)
+    if value is None or value == '':
+        return None
+    try:
+        return query_datetime(value)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid {key}: {value}")
+
+
+def filter_in(queryset, params, key, lookup):
+    values = as_list(params.get(key))
+    return queryset.filter(**{lookup: values}) if values else queryset
+
+
+def plots_for(params):
+    """FieldPlot ids matching the study/trial/location filters, or None when none are given."""
+    plots = FieldPlot.objects.all()
+    filtered = False
+    for key, lookup in (('studyDbIds', 'trial_id__in'), ('trialDbIds', 'trial__trialDbId__in'),
+                        ('locationNames', 'location__in')):
+        if as_list(params.get(key)):
+            plots = filter_in(plots, params, key, lookup)
+            filtered = True
+    return plots if filtered else None
+
+
+def search_observations(params):
+    queryset = PlantTraitData.objects.all()
+    queryset = filter_in(queryset, params, 'observationDbIds', 'pk__in')
+    queryset = filter_in(queryset, params, 'observationUnitDbIds', 'plant_id__in')
+    queryset = filter_in(queryset, params, 'observationVariableNames', 'trait__in')
+    variable_ids = as_list(params.get('observationVariableDbIds'))
+    if variable_ids:
+        queryset = queryset.filter(trait__in=TraitSchedule.objects.filter(id__in=variable_ids).values('trait'))
+    plots = plots_for(params)
+    if plots is not None:
+        queryset = queryset.filter(plant_id__in=plots.values('plant_id'))
+    start = body_datetime(params, 'observationTimeStampRangeStart')
+    end = body_datetime(params, 'observationTimeStampRangeEnd')
+    if start:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end:
+        queryset = queryset.filter(timestamp__lte=end)
+    return queryset
+
+
+def search_observation_units(params):
+    queryset = filter_in(FieldPlot.objects.all(), params, 'observationUnitDbIds', 'plant_id__in')
+    plots = plots_for(params)
+    return queryset.filter(pk__in=plots.values('pk')) if plots is not None else queryset
+
+
+def search_germplasm(params):
+    queryset = Germplasm.objects.all()
+    for key, lookup in (('germplasmDbIds', 'germplasmDbId__in'), ('germplasmNames', 'germplasmName__in'),
+                        ('commonCropNames', 'commonCropName__in'), ('genus', 'genus__in'),
+                        ('species', 'species__in')):
+        queryset = filter_in(queryset, params, key, lookup)
+    return queryset
+
+
+def search_studies(params):
+    queryset = Trial.objects.all()
+    for key, lookup in (('studyDbIds', 'id__in'), ('studyNames', 'trialName__in'),
+                        ('trialDbIds', 'trialDbId__in'), ('programNames', 'programName__in'),
+                        ('locationNames', 'location__in'), ('seasonDbIds', 'startDate__year__in')):
+        queryset = filter_in(queryset, params, key, lookup)
+    return queryset
+
+
+def search_samples(params):
+    queryset = Sample.objects.all()
+    for key, lookup in (('sampleDbIds', 'sampleDbId__in'), ('observationUnitDbIds', 'observationUnitDbId__in'),
+                        ('studyDbIds', 'studyDbId__in'), ('germplasmDbIds', 'germplasmDbId__in')):
+        queryset = filter_in(queryset, params, key, lookup)
+    return queryset
+
+
+SEARCHES = {
+    'observations': search_observations,
+    'observationunits': search_observation_units,
+    'germplasm': search_germplasm,
+    'studies': search_studies,
+    'samples': search_samples,
+}
+
+
+def search_queryset(entity, params):
+    """Queryset of ``entity`` matching a BrAPI search body, ordered by primary key; raises KeyError for unknown entities."""
+    return SEARCHES[entity](params or {}).order_by('pk')
+
+
+def pack_ids(ids):
+    """Sorted primary keys -> delta-encoded, zlib-compressed bytes."""
+    deltas, previous = array('q'), 0
+    for pk in ids:
+        deltas.append(pk - previous)
+        previous = pk
+    return zlib.compress(deltas.tobytes())
+
+
+def unpack_ids(blob):
+    deltas = array('q')
+    deltas.frombytes(zlib.decompress(bytes(blob)))
+    ids, total = [], 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
+
+
+_executor = None
+
+
+def search_workers():
+    return getattr(settings, 'BRAPI_SEARCH_WORKERS', DEFAULT_WORKERS)
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=search_workers(), thread_name_prefix='brapi-search')
+    return _executor
+
+
+def start_search(entity, params, user=None):
+    """
+    Run or queue a search. Returns (ids, None) when it was answered within
+    BRAPI_SEARCH_SYNC_LIMIT rows, else (None, SearchRequest) for a queued one.
+    """
+    limit = getattr(settings, 'BRAPI_SEARCH_SYNC_LIMIT', DEFAULT_SYNC_LIMIT)
+    ids = list(search_queryset(entity, params).values_list('pk', flat=True)[:limit + 1])
+    if len(ids) <= limit:
+        return ids, None
+
+    search = SearchRequest.objects.create(entity=entity, parameters=params, requested_by=user, queued_on=timezone.now())
+    if search_workers():
+        queue_search(search.pk)
+    return None, search
+
+
+def queue_search(pk):
+    transaction.on_commit(lambda: executor().submit(run_search_in_thread, pk))
+
+
+def recover_stale_searches(searches=None, queue=True):
+    """
+    Searches of ``searches`` (default: all) whose worker must have stopped:
+    PENDING or RUNNING since longer than BRAPI_SEARCH_TIMEOUT seconds. They
+    are queued again (submitted to this process's workers when ``queue``),
+    or FAILED once they have been running MAX_ATTEMPTS times. Returns how
+    many were recovered.
+    """
+    searches = SearchRequest.objects.all() if searches is None else searches
+    now = timezone.now()
+    cutoff = now - datetime.timedelta(seconds=getattr(settings, 'BRAPI_SEARCH_TIMEOUT', DEFAULT_TIMEOUT))
+    stale_running = searches.filter(status=SearchRequest.RUNNING, started_on__lt=cutoff)
+    recovered = stale_running.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=SearchRequest.FAILED, error="The search worker stopped before finishing", completed_on=now)
+    requeued = stale_running.update(status=SearchRequest.PENDING, started_on=None, queued_on=now)
+    # Pending searches queued on a pool that has since gone away
+    requeued += searches.filter(
+        Q(queued_on__lt=cutoff) | Q(queued_on__isnull=True, created_on__lt=cutoff),
+        status=SearchRequest.PENDING,
+    ).update(queued_on=now)
+    if requeued and queue and search_workers():
+        for pk in searches.filter(status=SearchRequest.PENDING, queued_on=now).values_list('pk', flat=True):
+            queue_search(pk)
+    return recovered + requeued
+
+
+def run_search(pk):
+    """Compute and store the result set of a pending SearchRequest (no-op if another worker claimed it)."""
+    if not SearchRequest.objects.filter(pk=pk, status=SearchRequest.PENDING).update(
+            status=SearchRequest.RUNNING, started_on=timezone.now(), attempts=F('attempts') + 1):
+        return
+    search = SearchRequest.objects.get(pk=pk)
+    try:
+        ids = list(search_queryset(search.entity, search.parameters).values_list('pk', flat=True).iterator())
+    except (DatabaseError, KeyError, ValueError, TypeError) as exc:
+        SearchRequest.objects.filter(pk=pk).update(
+            status=SearchRequest.FAILED, error=str(exc), completed_on=timezone.now())
+        return
+    SearchRequest.objects.filter(pk=pk).update(
+        status=SearchRequest.DONE, result_ids=pack_ids(ids), result_count=len(ids), completed_on=timezone.now())
+
+
+def run_search_in_thread(pk):
+    close_old_connections()
+    try:
+        run_search(pk)
+    finally:
+        connection.close()
@@ -1,12 +1,18 @@
 # dashboard/views.py (or your app's views.py)
 
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.settings import api_settings
 from rest_framework.response import Response
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.http import StreamingHttpResponse
+from django.db import DatabaseError
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from rest_framework import status
-import datetime
+from collections import defaultdict
 
 # Assuming these are in your_app/utils.py or similar
 # from .utils import apply_dynamic_filters
@@ -22,18 +28,43 @@ def apply_dynamic_filters(queryset, query_params, field_mapping):
 
 from dashboard.models import ( # Changed from .models to dashboard.models based on initial code
     ObservationVariable, PlantTraitData, Sample, Trial, Germplasm, FieldPlot,
-    TraitSchedule, Program, Person, ObservationMethod, Image, ObservationLevel
+    TraitSchedule, Program, Person, ObservationMethod, Image, ObservationLevel, Location,
+    SearchRequest
 )
+from dashboard.brapi_batch import max_requests, parse_sub_request, run_batch
+from dashboard.brapi_cache import brapi_cache
+from dashboard.brapi_search import SEARCHES, query_datetime, recover_stale_searches, start_search, unpack_ids
+from dashboard.ingest import register_samples, upsert_observations
+from dashboard.pivot import latest_observations, pivot_traits
+from dashboard.renderers import CSVTableRenderer, TSVTableRenderer
+from dashboard.parsers import GzipJSONParser
+from dashboard.spatial import nearest, parse_bbox, within_bbox, within_radius
 from dashboard.serializers import ( # Changed from .serializers to dashboard.serializers
-    ObservationSerializer, ObservationUnitSerializer, TrialSerializer,
     ObservationVariableSerializer, GermplasmSerializer, ProgramSerializer,
     PersonSerializer, ObservationMethodSerializer, ImageSerializer,
-    SampleSerializer, ObservationLevelSerializer
+    SampleSerializer, ObservationLevelSerializer,
+    fast_germplasm, fast_observation_units, fast_observations, fast_samples, fast_trials
 )
 
-def build_response(data, total_count, page=0, page_size=1000, status_messages=None, datafiles=None):
+def pagination_metadata(total_count, page, page_size, cursor=None):
+    pagination = {
+        "pageSize": page_size,
+        "currentPage": page,
+        "totalCount": total_count,
+        "totalPages": (total_count + page_size - 1) // page_size if total_count is not None and page_size else None,
+    }
+    if cursor is not None:
+        pagination.update(cursor)
+    return pagination
+
+
+def build_response(data, total_count, page=0, page_size=1000, status_messages=None, datafiles=None,
+                   cursor=None, status=status.HTTP_200_OK):
     """
     Helper function to build a consistent BrAPI response structure.
+
+    ``total_count`` may be None when a token-paged request did not ask for
+    the count; ``cursor`` carries currentPageToken/nextPageToken in that mode.
     """
     if status_messages is None:
         status_messages = []
@@ -42,17 +73,257 @@ def build_response(data, total_count, page=0, page_size=1000, status_messages=No
 
     return Response({
         "metadata": {
-            "pagination": {
-                "pageSize": page_size,
-                "currentPage": page,
-                "totalCount": total_count,
-                "totalPages": (total_count + page_size - 1) // page_size
-            },
+            "pagination": pagination_metadata(total_count, page, page_size, cursor),
             "status": status_messages,
             "datafiles": datafiles
         },
         "result": {"data": data}
-    })
+    }, status=status)
+
+
+def encode_page_token(pk):
+    return urlsafe_base64_encode(force_bytes(pk))
+
+
+def row_pk(row):
+    """Primary key of a model instance or of a ValuesSerializer row (pk first)."""
+    return row[0] if isinstance(row, tuple) else row.pk
+
+
+def decode_page_token(token, cast=int):
+    try:
+        return cast(force_str(urlsafe_base64_decode(token)))
+    except (TypeError, ValueError):
+        raise InvalidPage("Invalid pageToken")
+
+
+def page_params(request, default_page_size=1000):
+    """(page, page_size) from the query string; raises InvalidPage."""
+    try:
+        page = int(request.GET.get('page', 0))
+        page_size = int(request.GET.get('pageSize', default_page_size))
+    except ValueError:
+        raise InvalidPage("Invalid page number")
+    if page < 0 or page_size < 1:
+        raise InvalidPage("Invalid page number")
+    return page, page_size
+
+
+def paginate(request, queryset, default_page_size=1000, key='pk'):
+    """
+    Page a queryset for a BrAPI list endpoint.
+
+    By default this is classic page/pageSize paging (OFFSET + COUNT). Sending
+    ``pageToken`` (empty for the first page) switches to keyset paging on the
+    primary key: each page is an indexed range scan, so deep pages cost the
+    same as the first, and the COUNT is skipped unless
+    ``includeTotalCount=true``.
+
+    ``key`` is the column pages are keyed on. Other than the primary key it
+    must be the only column of a flat, distinct values_list(), whose values
+    then serve as the tokens (e.g. the plant_ids of observations/table).
+
+    Returns (page_items, build_response kwargs); raises InvalidPage.
+    """
+    page, page_size = page_params(request, default_page_size)
+
+    if 'pageToken' in request.GET:
+        token = request.GET['pageToken']
+        rows = queryset.order_by(key)
+        if token:
+            rows = rows.filter(**{f'{key}__gt': decode_page_token(token, int if key == 'pk' else str)})
+        items = list(rows[:page_size + 1])
+        has_next = len(items) > page_size
+        items = items[:page_size]
+        total_count = queryset.count() if request.GET.get('includeTotalCount') == 'true' else None
+        cursor = {
+            "currentPageToken": token or None,
+            "nextPageToken": encode_page_token(row_pk(items[-1]) if key == 'pk' else items[-1]) if has_next else None,
+        }
+        return items, {"total_count": total_count, "page": 0, "page_size": page_size, "cursor": cursor}
+
+    if not queryset.ordered:
+        queryset = queryset.order_by('pk')
+    paginator = Paginator(queryset, page_size)
+    return paginator.page(page + 1), {"total_count": paginator.count, "page": page, "page_size": page_size}
+
+
+STREAM_CHUNK_SIZE = 500
+
+
+def stream_requested(request):
+    return request.GET.get('stream') == 'true'
+
+
+def stream_response(request, queryset, serialize, default_page_size=1000, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streaming counterpart of paginate() + build_response(), used for ``?stream=true``.
+
+    Records are read with a chunked queryset iterator and written to the
+    response as each chunk is serialized, so memory stays flat for any
+    pageSize and the first bytes go out before the page has been read. The
+    envelope is the usual one, except that ``metadata`` follows ``result`` so
+    nextPageToken can be taken from the last streamed row.
+
+    ``serialize`` turns a list of rows into a list of dicts, e.g. the many()
+    of the ValuesSerializer whose queryset() gave ``queryset``. Raises
+    InvalidPage, like paginate().
+    """
+    page, page_size = page_params(request, default_page_size)
+    token_mode = 'pageToken' in request.GET
+    token = request.GET.get('pageToken', '')
+
+    if token_mode:
+        rows = queryset.order_by('pk')
+        if token:
+            rows = rows.filter(pk__gt=decode_page_token(token))
+        # One extra row tells us whether there is a next page
+        rows = rows[:page_size + 1]
+        page = 0
+    else:
+        if not queryset.ordered:
+            queryset = queryset.order_by('pk')
+        paginator = Paginator(queryset, page_size)
+        rows = paginator.page(page + 1).object_list
+
+    encoder = JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+    def encode_chunk(chunk, first):
+        records = ','.join(encoder.encode(item) for item in serialize(chunk))
+        return records if first else ',' + records
+
+    def generate():
+        yield '{"result":{"data":['
+        sent, chunk, last_pk, has_next = 0, [], None, False
+        for obj in rows.iterator(chunk_size=chunk_size):
+            if sent + len(chunk) == page_size:
+                has_next = True
+                break
+            chunk.append(obj)
+            last_pk = row_pk(obj)
+            if len(chunk) >= chunk_size:
+                yield encode_chunk(chunk, first=not sent)
+                sent += len(chunk)
+                chunk = []
+        if chunk:
+            yield encode_chunk(chunk, first=not sent)
+
+        if token_mode:
+            total_count = queryset.count() if request.GET.get('includeTotalCount') == 'true' else None
+            cursor = {
+                "currentPageToken": token or None,
+                "nextPageToken": encode_page_token(last_pk) if has_next else None,
+            }
+        else:
+            total_count, cursor = paginator.count, None
+        metadata = {
+            "pagination": pagination_metadata(total_count, page, page_size, cursor),
+            "status": [],
+            "datafiles": [],
+        }
+        yield ']},"metadata":' + encoder.encode(metadata) + '}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+def invalid_page_response(exc):
+    return build_response([], 0, status_messages=[{"message": str(exc) or "Invalid page number", "code": "400"}],
+                          status=status.HTTP_400_BAD_REQUEST)
+
+
+def invalid_filter_response(exc):
+    return build_response([], 0, status_messages=[{"message": str(exc), "code": "400"}],
+                          status=status.HTTP_400_BAD_REQUEST)
+
+
+def query_list(request, name):
+    """All values of a query parameter, whether repeated or comma-separated."""
+    return [value for param in request.GET.getlist(name) for value in param.split(',') if value]
+
+
+def sparse_fields(request, serializer, required=()):
+    """
+    ``serializer`` restricted to the ``fields`` query parameter (plus
+    ``required``), or unchanged when it is absent. Raises ValueError.
+    """
+    keys = query_list(request, 'fields')
+    if not keys:
+        return serializer
+    return serializer.only(dict.fromkeys([*keys, *required]))
+
+
+def include_observations(units):
+    """Embed the observations of a page of serialized units, read with one query."""
+    by_unit = defaultdict(list)
+    observations = PlantTraitData.objects.filter(
+        plant_id__in=[unit['observationUnitDbId'] for unit in units]).order_by('pk')
+    for observation in fast_observations.many(fast_observations.queryset(observations)):
+        by_unit[observation['observationUnitDbId']].append(observation)
+    for unit in units:
+        unit['observations'] = by_unit.get(unit['observationUnitDbId'], [])
+    return units
+
+
+def unit_serializer(request):
+    """The serialize function for observation units: ``fields=`` and ``includeObservations=true`` applied."""
+    if request.GET.get('includeObservations') != 'true':
+        serializer = sparse_fields(request, fast_observation_units)
+        return serializer, serializer.many
+    serializer = sparse_fields(request, fast_observation_units, required=['observationUnitDbId'])
+    return serializer, lambda rows: include_observations(serializer.many(rows))
+
+
+def filter_by_time(queryset, request, lookups):
+    """
+    Apply ``{query parameter: field lookup}`` date-time filters, e.g. the
+    ``updatedSince`` change feed. Raises ValueError naming a malformed value.
+    """
+    for param, lookup in lookups.items():
+        value = request.GET.get(param)
+        if value:
+            try:
+                when = query_datetime(value)
+            except ValueError:
+                raise ValueError(f"Invalid {param}: {value}")
+            queryset = queryset.filter(**{lookup: when})
+    return queryset
+
+
+def query_number(request, name, cast=float):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+def filter_by_area(queryset, request):
+    """
+    Spatial filters for observation units: ``bbox=west,south,east,north``,
+    and around ``latitude``/``longitude`` either ``radius`` (metres) or the
+    ``nearest`` N units. Raises ValueError naming a malformed value.
+    """
+    bbox = parse_bbox(request.GET.get('bbox'))
+    if bbox is not None:
+        queryset = within_bbox(bbox, queryset)
+    radius = query_number(request, 'radius')
+    count = query_number(request, 'nearest', int)
+    if radius is None and count is None:
+        return queryset
+
+    latitude, longitude = query_number(request, 'latitude'), query_number(request, 'longitude')
+    if latitude is None or longitude is None:
+        raise ValueError("radius and nearest need latitude and longitude")
+    if radius is not None:
+        queryset = within_radius(latitude, longitude, radius, queryset)
+    if count is not None:
+        # Closest first; only page/pageSize paging keeps this order (pageToken pages by pk)
+        pks = [plot.pk for plot in nearest(latitude, longitude, count, queryset)]
+        queryset = queryset.filter(pk__in=pks).order_by(
+            Case(*[When(pk=pk, then=Value(rank)) for rank, pk in enumerate(pks)], output_field=IntegerField()))
+    return queryset
 
 # --- BrAPI Endpoints ---
 
@@ -66,6 +337,7 @@ def brapi_calls(request):
         {"call": "observationvariables", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "observationunits", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "observations", "methods": ["GET", "POST"], "versions": ["2.0"]},
+        {"call": "observations/table", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "studies", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "germplasm", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "locations", "methods": ["GET"], "versions": ["2.0"]},
@@ -79,6 +351,9 @@ def brapi_calls(request):
         {"call": "observationmethods", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "images", "methods": ["GET"], "versions": ["2.0"]},
         {"call": "observationlevels", "methods": ["GET"], "versions": ["2.0"]},
+        {"call": "search/{entity}", "methods": ["POST"], "versions": ["2.0"]},
+        {"call": "search/{entity}/{searchResultsDbId}", "methods": ["GET"], "versions": ["2.0"]},
+        {"call": "batch", "methods": ["POST"], "versions": ["2.0"]},
     ]
     return Response({
         "metadata": {},
@@ -86,62 +361,64 @@ def brapi_calls(request):
     })
 
 @api_view(['GET'])
+@brapi_cache(Trial)
 def brapi_trials(request):
     """
     Retrieves a list of trials with pagination.
     """
-    trials = Trial.objects.all()
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(trials, page_size)
     try:
-        paged_trials = paginator.page(page + 1) # Paginator pages are 1-indexed
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
-
-    data = TrialSerializer(paged_trials, many=True).data
-    return build_response(data, paginator.count, page, page_size)
+        serializer = sparse_fields(request, fast_trials)
+    except ValueError as exc:
+        return invalid_filter_response(exc)
+    rows = serializer.queryset(Trial.objects.all())
+    try:
+        if stream_requested(request):
+            return stream_response(request, rows, serializer.many)
+        paged_trials, pagination = paginate(request, rows)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
+
+    return build_response(serializer.many(paged_trials), **pagination)
+
+def study_data(trial):
+    """BrAPI study representation of a Trial (list and search results)."""
+    return {
+        "studyDbId": str(trial.id), # Assuming 'id' is used for studyDbId as in the original first code
+        "studyName": trial.trialName,
+        "trialDbId": str(trial.trialDbId), # Keep trialDbId if it's distinct and needed
+        "locationDbId": getattr(trial, 'locationDbId', "1"), # Assuming a field or default
+        "locationName": getattr(trial, 'location', "Field 1"),
+        "season": {
+            "seasonDbId": str(trial.startDate.year) if trial.startDate else "unknown",
+            "season": str(trial.startDate.year) if trial.startDate else "unknown"
+        },
+        "startDate": trial.startDate.isoformat() if trial.startDate else None,
+        "endDate": trial.endDate.isoformat() if trial.endDate else None,
+        "status": "active",
+        "programDbId": getattr(trial, 'programDbId', ''),
+        "programName": getattr(trial, 'programName', ''),
+        "observationVariableDbIds": [], # Populate if available in Trial model
+        "studyType": "field",
+        "additionalInfo": getattr(trial, 'additionalInfo', {})
+    }
 
 @api_view(['GET'])
+@brapi_cache(Trial)
 def brapi_studies(request):
     """
     Retrieves a list of studies (trials) with detailed information.
     """
     studies_queryset = Trial.objects.all()
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(studies_queryset, page_size)
     try:
-        paged_studies = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
-
-    data = []
-    for trial in paged_studies:
-        data.append({
-            "studyDbId": str(trial.id), # Assuming 'id' is used for studyDbId as in the original first code
-            "studyName": trial.trialName,
-            "trialDbId": str(trial.trialDbId), # Keep trialDbId if it's distinct and needed
-            "locationDbId": getattr(trial, 'locationDbId', "1"), # Assuming a field or default
-            "locationName": getattr(trial, 'location', "Field 1"),
-            "season": {
-                "seasonDbId": str(trial.startDate.year) if trial.startDate else "unknown",
-                "season": str(trial.startDate.year) if trial.startDate else "unknown"
-            },
-            "startDate": trial.startDate.isoformat() if trial.startDate else None,
-            "endDate": trial.endDate.isoformat() if trial.endDate else None,
-            "status": "active",
-            "programDbId": getattr(trial, 'programDbId', ''),
-            "programName": getattr(trial, 'programName', ''),
-            "observationVariableDbIds": [], # Populate if available in Trial model
-            "studyType": "field",
-            "additionalInfo": getattr(trial, 'additionalInfo', {})
-        })
-    return build_response(data, paginator.count, page, page_size)
+        paged_studies, pagination = paginate(request, studies_queryset)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
+
+    data = [study_data(trial) for trial in paged_studies]
+    return build_response(data, **pagination)
 
 @api_view(['GET'])
+@brapi_cache(Trial)
 def brapi_study_detail(request, studyDbId):
     """
     Retrieves details for a specific study by ID.
@@ -173,25 +450,27 @@ def brapi_study_detail(request, studyDbId):
     return build_response(result, 1, 0, 1) # Single item, so totalCount is 1
 
 @api_view(['GET'])
+@brapi_cache(TraitSchedule)
 def brapi_observationvariables(request):
     """
     Retrieves a list of observation variables (traits) with pagination.
     """
     # Assuming TraitSchedule is the model for observation variables
     traits = TraitSchedule.objects.filter(active=True)
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(traits, page_size)
     try:
-        paged_traits = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+        if stream_requested(request):
+            return stream_response(
+                request, traits, lambda chunk: ObservationVariableSerializer(chunk, many=True).data)
+        paged_traits, pagination = paginate(request, traits)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
     data = ObservationVariableSerializer(paged_traits, many=True).data
-    return build_response(data, paginator.count, page, page_size)
+    return build_response(data, **pagination)
 
 @api_view(['GET', 'POST'])
+@parser_classes([GzipJSONParser])
+@brapi_cache(PlantTraitData)
 def brapi_observations(request):
     """
     Handles GET requests for observations (with filtering and pagination)
@@ -207,87 +486,37 @@ def brapi_observations(request):
         }
         observations = apply_dynamic_filters(observations, request.GET, field_mapping)
 
-        # Date range filtering
-        start_date = request.GET.get('observationTimeStampRangeStart')
-        end_date = request.GET.get('observationTimeStampRangeEnd')
-
-        if start_date:
-            parsed_start = parse_datetime(start_date)
-            if parsed_start:
-                observations = observations.filter(recorded_at__gte=parsed_start) # Assuming 'recorded_at'
-        if end_date:
-            parsed_end = parse_datetime(end_date)
-            if parsed_end:
-                observations = observations.filter(recorded_at__lte=parsed_end)
-
-        page = int(request.GET.get('page', 0))
-        page_size = int(request.GET.get('pageSize', 1000))
-
-        paginator = Paginator(observations, page_size)
+        # Date range filtering; timestamp is also the row's modification time
+        try:
+            observations = filter_by_time(observations, request, {
+                'observationTimeStampRangeStart': 'timestamp__gte',
+                'observationTimeStampRangeEnd': 'timestamp__lte',
+                'updatedSince': 'timestamp__gte',
+            })
+            serializer = sparse_fields(request, fast_observations)
+        except ValueError as exc:
+            return invalid_filter_response(exc)
+
+        rows = serializer.queryset(observations)
         try:
-            paged_obs = paginator.page(page + 1)
-        except Exception:
-            return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+            if stream_requested(request):
+                return stream_response(request, rows, serializer.many)
+            paged_obs, pagination = paginate(request, rows)
+        except InvalidPage as exc:
+            return invalid_page_response(exc)
 
-        data = ObservationSerializer(paged_obs, many=True).data
-        return build_response(data, paginator.count, page, page_size)
+        data = serializer.many(paged_obs)
+        return build_response(data, **pagination)
 
     elif request.method == 'POST':
         payload = request.data.get("observations", [])
-        created_ids = []
-        errors = []
-
-        for obs in payload:
-            unit_id = obs.get("observationUnitDbId")
-            trait_variable_name = obs.get("observationVariableName")
-            value = obs.get("value")
-            timestamp = obs.get("observationTimeStamp")
-
-            if not all([unit_id, trait_variable_name, value, timestamp]):
-                errors.append({"observation": obs, "error": "Missing required fields"})
-                continue
-
-            try:
-                # Find FieldPlot by plant_id for observationUnitDbId
-                field_plot = FieldPlot.objects.get(plant_id=unit_id)
-            except FieldPlot.DoesNotExist:
-                errors.append({"observation": obs, "error": f"Observation unit {unit_id} not found"})
-                continue
-
-            try:
-                # Find TraitSchedule by trait_name (or other identifier if available)
-                # It's better to link to a TraitSchedule if possible, or ensure 'trait' in PlantTraitData
-                # is consistent with ObservationVariable
-                # For simplicity, assuming trait_variable_name can be directly used for 'trait' field
-                pass # No direct TraitSchedule object needed for PlantTraitData if trait is just a string
-
-            except Exception as e:
-                errors.append({"observation": obs, "error": f"Error finding trait: {e}"})
-                continue
-
-            try:
-                # Convert timestamp to datetime object
-                dt_obj = datetime.datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-            except ValueError:
-                errors.append({"observation": obs, "error": f"Invalid timestamp format: {timestamp}"})
-                continue
-
-            try:
-                # Use update_or_create to handle potential existing observations for the same unit/trait
-                # This assumes a unique constraint or desired behavior for updates
-                # If you always want to create new observations, use .create()
-                obj, created = PlantTraitData.objects.update_or_create(
-                    plant_id=unit_id,
-                    trait=trait_variable_name, # Use the trait name
-                    defaults={
-                        "value": value,
-                        "timestamp": dt_obj, # Use 'timestamp' if that's the field name
-                        # "recorded_at": dt_obj, # Use 'recorded_at' if that's the field name
-                    }
-                )
-                created_ids.append(str(obj.id))
-            except Exception as e:
-                errors.append({"observation": obs, "error": f"Database error: {e}"})
+        if not isinstance(payload, list):
+            payload = []
+        try:
+            created_ids, errors = upsert_observations(payload, user=request.user if request.user.is_authenticated else None)
+        except DatabaseError as e:
+            created_ids, errors = [], [{"observation": None, "error": f"Database error: {e}"}]
+        created_ids = [str(pk) for pk in created_ids]
 
         status_messages = [{"message": f"{len(created_ids)} observations recorded successfully", "code": "201"}]
         if errors:
@@ -295,25 +524,111 @@ def brapi_observations(request):
 
         return build_response(created_ids, len(created_ids), status_messages=status_messages, status=status.HTTP_201_CREATED if not errors else status.HTTP_207_MULTI_STATUS)
 
+TABLE_HEADER_ROW = ["studyDbId", "locationName", "observationUnitDbId"]
+
 @api_view(['GET'])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [CSVTableRenderer, TSVTableRenderer])
+@brapi_cache(PlantTraitData, FieldPlot, TraitSchedule, Location)
+def brapi_observations_table(request):
+    """
+    Observation units x variables matrix (BrAPI observations/table) holding
+    the latest value of each variable. JSON by default; CSV or TSV with
+    ``Accept: text/csv`` / ``text/tsv`` (or ``?format=csv|tsv``).
+
+    Pages are pages of observation units. Each one is a single pivot query
+    (see dashboard.pivot) instead of one serialized object per value.
+    """
+    observations = PlantTraitData.objects.all()
+    unit_ids = query_list(request, 'observationUnitDbId')
+    if unit_ids:
+        observations = observations.filter(plant_id__in=unit_ids)
+
+    plots = FieldPlot.objects.all()
+    plot_filters = {
+        'studyDbId': 'trial_id__in',
+        'trialDbId': 'trial__trialDbId__in',
+        'locationDbId': 'location__in',
+    }
+    filtered = False
+    for param, lookup in plot_filters.items():
+        values = query_list(request, param)
+        if param == 'locationDbId' and values:
+            values = Location.objects.filter(locationDbId__in=[v for v in values if v.isdigit()]).values('locationName')
+        if values:
+            plots = plots.filter(**{lookup: values})
+            filtered = True
+    if filtered:
+        observations = observations.filter(plant_id__in=plots.values('plant_id'))
+
+    variables = query_list(request, 'observationVariableDbId')
+    variable_ids = dict(TraitSchedule.objects.values_list('trait', 'id'))
+    if variables:
+        names = dict(TraitSchedule.objects.filter(id__in=[v for v in variables if v.isdigit()]).values_list('id', 'trait'))
+        traits = list(dict.fromkeys(names.get(int(v), v) if v.isdigit() else v for v in variables))
+    else:
+        traits = sorted(observations.order_by().values_list('trait', flat=True).distinct())
+
+    units = observations.order_by('plant_id').values_list('plant_id', flat=True).distinct()
+    try:
+        paged_units, pagination = paginate(request, units, key='plant_id')
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
+    page_units = list(paged_units)
+
+    rows = pivot_traits(latest_observations(observations.filter(plant_id__in=page_units)), traits) if traits else []
+    values = {row[0]: row[1:] for row in rows}
+    plot_info = {
+        plant_id: (trial_id, location)
+        for plant_id, trial_id, location in FieldPlot.objects.filter(plant_id__in=page_units).values_list('plant_id', 'trial_id', 'location')
+    }
+    empty = (None,) * len(traits)
+
+    def table_row(unit):
+        trial_id, location = plot_info.get(unit, (None, None))
+        return [None if trial_id is None else str(trial_id), location, unit, *values.get(unit, empty)]
+
+    table = {
+        "headerRow": TABLE_HEADER_ROW,
+        "observationVariables": [
+            {"observationVariableDbId": str(variable_ids.get(trait, trait)), "observationVariableName": trait}
+            for trait in traits
+        ],
+        "data": [table_row(unit) for unit in page_units],
+    }
+    if request.accepted_renderer.format in ('csv', 'tsv'):
+        return Response(table)
+
+    # BrAPI puts headerRow / observationVariables next to data in result
+    response = build_response(table.pop("data"), **pagination)
+    response.data["result"].update(table)
+    return response
+
+@api_view(['GET'])
+@brapi_cache(FieldPlot, PlantTraitData)
 def brapi_observationunits(request):
     """
     Retrieves a list of observation units (FieldPlots) with pagination.
     """
     units = FieldPlot.objects.all()
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(units, page_size)
     try:
-        paged_units = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+        units = filter_by_time(units, request, {'updatedSince': 'updated_on__gte'})
+        units = filter_by_area(units, request)
+        serializer, serialize = unit_serializer(request)
+    except ValueError as exc:
+        return invalid_filter_response(exc)
+    rows = serializer.queryset(units)
+    try:
+        if stream_requested(request):
+            return stream_response(request, rows, serialize)
+        paged_units, pagination = paginate(request, rows)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
-    data = ObservationUnitSerializer(paged_units, many=True).data
-    return build_response(data, paginator.count, page, page_size)
+    data = serialize(list(paged_units))
+    return build_response(data, **pagination)
 
 @api_view(['GET'])
+@brapi_cache(Trial, FieldPlot, PlantTraitData)
 def brapi_study_observationunits(request, studyDbId):
     """
     Retrieves observation units associated with a specific study.
@@ -324,23 +639,34 @@ def brapi_study_observationunits(request, studyDbId):
         return build_response([], 0, 0, 0, [{"message": f"Study with DbId={studyDbId} not found", "code": "404"}], status=status.HTTP_404_NOT_FOUND)
 
     units = FieldPlot.objects.filter(trial=trial)
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(units, page_size)
     try:
-        paged_units = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+        units = filter_by_time(units, request, {'updatedSince': 'updated_on__gte'})
+        units = filter_by_area(units, request)
+        serializer, serialize = unit_serializer(request)
+    except ValueError as exc:
+        return invalid_filter_response(exc)
+    rows = serializer.queryset(units)
+    try:
+        if stream_requested(request):
+            return stream_response(request, rows, serialize)
+        paged_units, pagination = paginate(request, rows)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
-    data = ObservationUnitSerializer(paged_units, many=True).data
-    return build_response(data, paginator.count, page, page_size)
+    data = serialize(list(paged_units))
+    return build_response(data, **pagination)
 
-@api_view(['GET'])
+@api_view(['GET', 'POST'])
+@parser_classes([GzipJSONParser])
+@brapi_cache(Sample)
 def brapi_samples(request):
     """
-    Retrieves a list of samples with filtering and pagination.
+    Retrieves a list of samples with filtering and pagination (GET), or
+    registers new samples (POST).
     """
+    if request.method == 'POST':
+        return create_samples(request)
+
     samples = Sample.objects.all()
 
     field_mapping = {
@@ -352,77 +678,39 @@ def brapi_samples(request):
     }
     samples = apply_dynamic_filters(samples, request.GET, field_mapping)
 
-    start_date = request.GET.get('startDate')
-    end_date = request.GET.get('endDate')
-
-    if start_date:
-        parsed_start = parse_datetime(start_date)
-        if parsed_start:
-            samples = samples.filter(takenDateTime__gte=parsed_start) # Assuming 'takenDateTime' for samples
-    if end_date:
-        parsed_end = parse_datetime(end_date)
-        if parsed_end:
-            samples = samples.filter(takenDateTime__lte=parsed_end)
-
-    page = int(request.GET.get("page", 0))
-    page_size = int(request.GET.get("pageSize", 1000))
+    try:
+        samples = filter_by_time(samples, request, {
+            'startDate': 'sampleTimestamp__gte',
+            'endDate': 'sampleTimestamp__lte',
+            'updatedSince': 'updated_on__gte',
+        })
+        serializer = sparse_fields(request, fast_samples)
+    except ValueError as exc:
+        return invalid_filter_response(exc)
 
-    paginator = Paginator(samples, page_size)
+    rows = serializer.queryset(samples)
     try:
-        paged_samples = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+        if stream_requested(request):
+            return stream_response(request, rows, serializer.many)
+        paged_samples, pagination = paginate(request, rows)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
-    serialized_data = SampleSerializer(paged_samples, many=True).data
-    return build_response(serialized_data, paginator.count, page, page_size)
+    serialized_data = serializer.many(paged_samples)
+    return build_response(serialized_data, **pagination)
 
-@api_view(['POST'])
-def brapi_post_samples(request):
+def create_samples(request):
     """
-    Creates new samples from a POST request.
+    Registers the samples of a POST request in one batch.
     """
     samples_data = request.data.get("samples", [])
-    created_samples_data = []
-    errors = []
-
-    for sample_data in samples_data:
-        try:
-            # Ensure required fields are present
-            required_fields = ["sampleName", "observationUnitDbId", "takenDateTime", "sampleType"]
-            if not all(field in sample_data for field in required_fields):
-                errors.append({"sample": sample_data.get("sampleName", "N/A"), "error": "Missing required fields"})
-                continue
-
-            # Look up related FieldPlot for observationUnitDbId
-            observation_unit_db_id = sample_data.get("observationUnitDbId")
-            try:
-                observation_unit = FieldPlot.objects.get(plant_id=observation_unit_db_id)
-            except FieldPlot.DoesNotExist:
-                errors.append({"sample": sample_data.get("sampleName", "N/A"), "error": f"ObservationUnitDbId '{observation_unit_db_id}' not found"})
-                continue
-
-            # Parse takenDateTime
-            taken_date_time_str = sample_data.get("takenDateTime")
-            try:
-                taken_date_time = datetime.datetime.fromisoformat(taken_date_time_str.replace("Z", "+00:00"))
-            except ValueError:
-                errors.append({"sample": sample_data.get("sampleName", "N/A"), "error": f"Invalid 'takenDateTime' format: {taken_date_time_str}"})
-                continue
-
-            new_sample = Sample.objects.create(
-                sampleName=sample_data.get("sampleName"),
-                sampleDescription=sample_data.get("sampleDescription", ""),
-                studyDbId=sample_data.get("studyDbId"),
-                observationUnitDbId=observation_unit_db_id, # Store the ID directly
-                observationUnit=observation_unit, # Link to the actual object if needed by your model
-                takenDateTime=taken_date_time,
-                sampleType=sample_data.get("sampleType", "TISSUE"),
-                tissueType=sample_data.get("tissueType", "LEAF"),
-                additionalInfo=sample_data.get("additionalInfo", {})
-            )
-            created_samples_data.append(SampleSerializer(new_sample).data)
-        except Exception as e:
-            errors.append({"sample": sample_data.get("sampleName", "N/A"), "error": str(e)})
+    if not isinstance(samples_data, list):
+        samples_data = []
+    try:
+        created, errors = register_samples(samples_data)
+    except DatabaseError as e:
+        created, errors = [], [{"sample": "N/A", "error": f"Database error: {e}"}]
+    created_samples_data = SampleSerializer(created, many=True).data
 
     status_messages = [{"message": f"{len(created_samples_data)} samples created successfully", "code": "201"}]
     if errors:
@@ -430,7 +718,16 @@ def brapi_post_samples(request):
 
     return build_response(created_samples_data, len(created_samples_data), status_messages=status_messages, status=status.HTTP_201_CREATED if not errors else status.HTTP_207_MULTI_STATUS)
 
+@api_view(['POST'])
+@parser_classes([GzipJSONParser])
+def brapi_post_samples(request):
+    """
+    Creates new samples from a POST request.
+    """
+    return create_samples(request)
+
 @api_view(['GET'])
+@brapi_cache(Germplasm)
 def brapi_germplasm(request):
     """
     Retrieves a list of germplasm with filtering and pagination.
@@ -445,19 +742,22 @@ def brapi_germplasm(request):
     }
     queryset = apply_dynamic_filters(queryset, request.GET, field_mapping)
 
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    paginator = Paginator(queryset, page_size)
     try:
-        paged_germplasm = paginator.page(page + 1)
-    except Exception:
-        return build_response([], 0, page, page_size, [{"message": "Invalid page number", "code": "400"}], status=status.HTTP_400_BAD_REQUEST)
+        serializer = sparse_fields(request, fast_germplasm)
+    except ValueError as exc:
+        return invalid_filter_response(exc)
+    rows = serializer.queryset(queryset)
+    try:
+        if stream_requested(request):
+            return stream_response(request, rows, serializer.many)
+        paged_germplasm, pagination = paginate(request, rows)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
-    serializer = GermplasmSerializer(paged_germplasm, many=True)
-    return build_response(serializer.data, paginator.count, page, page_size)
+    return build_response(serializer.many(paged_germplasm), **pagination)
 
 @api_view(['GET'])
+@brapi_cache(Germplasm)
 def brapi_germplasm_detail(request, germplasmDbId):
     """
     Retrieves details for a specific germplasm by ID.
@@ -470,36 +770,46 @@ def brapi_germplasm_detail(request, germplasmDbId):
     serializer = GermplasmSerializer(germplasm)
     return build_response(serializer.data, 1, 0, 1)
 
+def location_data(location):
+    """BrAPI representation of a Location index row."""
+    data = {
+        "locationDbId": str(location.locationDbId),
+        "locationName": location.locationName,
+        "latitude": str(location.latitude) if location.latitude is not None else None,
+        "longitude": str(location.longitude) if location.longitude is not None else None,
+        "coordinates": None,
+        "additionalInfo": {
+            "plotCount": location.plot_count,
+            "boundingBox": None,
+        },
+    }
+    if location.latitude is not None and location.longitude is not None:
+        data["coordinates"] = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [location.longitude, location.latitude]},
+        }
+        data["additionalInfo"]["boundingBox"] = [
+            location.min_longitude, location.min_latitude, location.max_longitude, location.max_latitude,
+        ]
+    return data
+
 @api_view(['GET'])
+@brapi_cache(Location)
 def brapi_locations(request):
     """
-    Retrieves unique locations from FieldPlot data.
+    Retrieves locations from the Location index (maintained from FieldPlot,
+    see dashboard.location_index).
     """
-    plots = FieldPlot.objects.exclude(location__isnull=True).exclude(location__exact='').distinct('location')
-    
-    unique_locations = []
-    # Assign unique IDs if not naturally available
-    for i, plot in enumerate(plots):
-        unique_locations.append({
-            "locationDbId": str(i + 1), # Assigning a simple sequential ID
-            "locationName": plot.location,
-            "latitude": str(plot.latitude) if plot.latitude else None,
-            "longitude": str(plot.longitude) if plot.longitude else None,
-            # Add other relevant location details from FieldPlot if available
-        })
-
-    total_count = len(unique_locations)
-    page = int(request.GET.get('page', 0))
-    page_size = int(request.GET.get('pageSize', 1000))
-
-    # Manual pagination since we're building a list
-    start_index = page * page_size
-    end_index = start_index + page_size
-    paginated_locations = unique_locations[start_index:end_index]
+    locations = Location.objects.filter(plot_count__gt=0)
+    try:
+        paged_locations, pagination = paginate(request, locations)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
 
-    return build_response(paginated_locations, total_count, page, page_size)
+    return build_response([location_data(location) for location in paged_locations], **pagination)
 
 @api_view(['GET'])
+@brapi_cache(TraitSchedule)
 def brapi_commoncropnames(request):
     """
     Retrieves distinct crop names from TraitSchedule.
@@ -509,6 +819,7 @@ def brapi_commoncropnames(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(Person)
 def brapi_people(request):
     """
     Retrieves a list of people.
@@ -519,6 +830,7 @@ def brapi_people(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(ObservationMethod)
 def brapi_observationmethods(request):
     """
     Retrieves a list of observation methods.
@@ -529,6 +841,7 @@ def brapi_observationmethods(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(Image)
 def brapi_images(request):
     """
     Retrieves a list of images.
@@ -539,6 +852,7 @@ def brapi_images(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(Trial)
 def brapi_programs(request):
     """
     Retrieves distinct program names from trials.
@@ -549,6 +863,7 @@ def brapi_programs(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(Trial)
 def brapi_seasons(request):
     """
     Retrieves unique seasons (years from trial start dates).
@@ -567,6 +882,7 @@ def brapi_seasons(request):
     return build_response(data, len(data))
 
 @api_view(['GET'])
+@brapi_cache(ObservationLevel)
 def brapi_observationlevels(request):
     """
     Retrieves observation levels.
@@ -590,10 +906,126 @@ def brapi_phenotypes(request):
     """
     return build_response([], 0)
 
+# --- BrAPI search (see dashboard.brapi_search) ---
+
+SEARCH_RESULT_SERIALIZERS = {
+    'observations': (PlantTraitData, fast_observations),
+    'observationunits': (FieldPlot, fast_observation_units),
+    'germplasm': (Germplasm, fast_germplasm),
+    'samples': (Sample, fast_samples),
+}
+
+
+def search_results_data(entity, ids):
+    """Serialize the ``entity`` rows whose primary keys are ``ids`` (ascending)."""
+    if entity == 'studies':
+        return [study_data(trial) for trial in Trial.objects.filter(pk__in=ids).order_by('pk')]
+    model, serializer = SEARCH_RESULT_SERIALIZERS[entity]
+    return serializer.many(serializer.queryset(model.objects.filter(pk__in=ids).order_by('pk')))
+
+
+def search_page_response(entity, ids, page, page_size):
+    page_ids = ids[page * page_size:(page + 1) * page_size]
+    return build_response(search_results_data(entity, page_ids), len(ids), page, page_size)
+
+
+def search_pending_response(search):
+    return Response({
+        "metadata": {
+            "pagination": pagination_metadata(None, 0, 0),
+            "status": [{"message": f"Search {search.status}; poll GET search/{search.entity}/{search.searchResultsDbId}", "code": "202"}],
+            "datafiles": []
+        },
+        "result": {"searchResultsDbId": str(search.searchResultsDbId)}
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+def unknown_search_response(entity):
+    return build_response([], 0, 0, 0, [{"message": f"Unsupported search entity '{entity}'", "code": "404"}], status=status.HTTP_404_NOT_FOUND)
+
+
+def submit_search(request, entity):
+    """
+    Answers a BrAPI search body directly when the result set is small, or
+    queues it and returns its searchResultsDbId (202).
+    """
+    if entity not in SEARCHES:
+        return unknown_search_response(entity)
+    params = request.data if isinstance(request.data, dict) else {}
+    try:
+        page = int(params.get('page', 0))
+        page_size = int(params.get('pageSize', 1000))
+        if page < 0 or page_size < 1:
+            raise InvalidPage("Invalid page number")
+        ids, search = start_search(entity, params, user=request.user if request.user.is_authenticated else None)
+    except (InvalidPage, ValueError, TypeError) as exc:
+        return build_response([], 0, status_messages=[{"message": f"Invalid search: {exc}", "code": "400"}],
+                              status=status.HTTP_400_BAD_REQUEST)
+
+    if search is not None:
+        return search_pending_response(search)
+    return search_page_response(entity, ids, page, page_size)
+
+@api_view(['POST'])
+def brapi_search(request, entity):
+    """
+    POST /search/{entity}: observations, observationunits, germplasm, studies, samples.
+    """
+    return submit_search(request, entity)
+
+@api_view(['GET'])
+def brapi_search_results(request, entity, searchResultsDbId):
+    """
+    GET /search/{entity}/{searchResultsDbId}: a page of a stored search.
+    """
+    if entity not in SEARCHES:
+        return unknown_search_response(entity)
+    try:
+        search = SearchRequest.objects.get(entity=entity, searchResultsDbId=searchResultsDbId)
+    except (SearchRequest.DoesNotExist, ValidationError):
+        return build_response([], 0, 0, 0, [{"message": f"Search {searchResultsDbId} not found", "code": "404"}], status=status.HTTP_404_NOT_FOUND)
+
+    if search.status in (SearchRequest.PENDING, SearchRequest.RUNNING) and recover_stale_searches(SearchRequest.objects.filter(pk=search.pk)):
+        search.refresh_from_db()
+    if search.status == SearchRequest.FAILED:
+        return build_response([], 0, status_messages=[{"message": f"Search failed: {search.error}", "code": "500"}],
+                              status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if search.status != SearchRequest.DONE:
+        return search_pending_response(search)
+
+    try:
+        page, page_size = page_params(request)
+    except InvalidPage as exc:
+        return invalid_page_response(exc)
+    return search_page_response(entity, unpack_ids(search.result_ids), page, page_size)
+
 @api_view(['POST'])
 def brapi_studies_search(request):
     """
-    Placeholder for studies search (POST).
+    Studies search (POST); same as POST /search/studies.
     """
-    # Implement filtering logic based on request.data for POST searches
-    return build_response([], 0)
\ No newline at end of file
+    return submit_search(request, 'studies')
+
+@api_view(['POST'])
+@parser_classes([GzipJSONParser])
+def brapi_batch(request):
+    """
+    Runs a list of BrAPI GET sub-requests in one request; see dashboard.brapi_batch.
+    """
+    items = request.data.get("requests") if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return invalid_filter_response("Expected a non-empty 'requests' list")
+    if len(items) > max_requests():
+        return invalid_filter_response(f"At most {max_requests()} requests per batch")
+    try:
+        sub_requests = [parse_sub_request(item, index) for index, item in enumerate(items)]
+    except ValueError as exc:
+        return invalid_filter_response(exc)
+
+    prefix = request.path.rsplit('/', 1)[0] + '/'
+    results = run_batch(request, prefix, sub_requests)
+    status_messages = [
+        {"message": f"{result['path']} returned {result['status']}", "code": str(result['status']), "details": result['id']}
+        for result in results if result['status'] != status.HTTP_200_OK
+    ]
+    return build_response(results, len(results), status_messages=status_messages)
@@ -0,0 +1,157 @@
+"""
+dashboard.heatmap_raster
+
+PNG overview tiles of the plant x trait matrices, for zoom levels where
+drawing one element per cell is hopeless.
+
+A matrix is read once per data version into a NumPy array:
+
+    status   the latest status flag level (FLAG_LEVELS index) of every plant
+             and trait, plants in plant_id order and traits as in the
+             heatmap tiles of dashboard.heatmap_tiles
+    values   the latest value of every numeric trait of /api/trait-values/,
+             scaled to 0..1 per trait, plants in primary-key order
+
+Tiles are cut from it and coloured through a lookup table, so no Python
+runs per cell. Plants are rows and traits columns; at zoom z a pixel
+covers 2**z plants of one trait, taking the most common status level or
+the mean of the known values. Without a zoom the smallest one that fits
+every plant in a single tile is used, so an overview is one image.
+"""
+
+import io
+import math
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .brapi_cache import ResponseCache
+from .heatmap_tiles import FLAG_LEVELS, flag_level, heatmap_traits
+from .models import PlantTraitData
+from .pivot import latest_observations
+from .trait_values import cached_trait_columns
+
+KINDS = ('status', 'values')
+TILE_SIZE = 256
+MAX_ZOOM = 20
+
+# Same colours as the trait heatmap page, one per FLAG_LEVELS index
+STATUS_COLORS = np.array(
+    [[0xcc, 0xcc, 0xcc, 255], [0xff, 0x4d, 0x4d, 255], [0xff, 0xc1, 0x07, 255], [0x28, 0xa7, 0x45, 255]],
+    dtype=np.uint8,
+)
+# Green (low) to red (high) as on the field visualization, then transparent for "no value"
+VALUE_COLORS = np.concatenate([
+    np.stack([np.arange(256), 255 - np.arange(256), np.zeros(256), np.full(256, 255)], axis=1),
+    [[0, 0, 0, 0]],
+]).astype(np.uint8)
+
+matrix_cache = ResponseCache(getattr(settings, 'HEATMAP_RASTER_MATRICES', 4))
+tile_cache = ResponseCache(getattr(settings, 'HEATMAP_RASTER_TILES', 256))
+
+
+def status_matrix(plots, cache_key):
+    """uint8 (plants x traits) of status levels, missing observations at 0."""
+    plants = sorted(plots.values_list('plant_id', flat=True))
+    traits = heatmap_traits(plots, cache_key)
+    matrix = np.zeros((len(plants), len(traits)), dtype=np.uint8)
+
+    observations = PlantTraitData.objects.filter(plant_id__in=plots.values('plant_id'))
+    cells = list(latest_observations(observations).annotate(level=flag_level()).values_list('plant_id', 'trait', 'level'))
+    if cells:
+        row_of = {plant_id: i for i, plant_id in enumerate(plants)}
+        column_of = {trait: j for j, trait in enumerate(traits)}
+        plant_ids, trait_names, levels = zip(*cells)
+        rows = np.fromiter(map(row_of.__getitem__, plant_ids), np.intp, len(cells))
+        columns = np.fromiter(map(column_of.__getitem__, trait_names), np.intp, len(cells))
+        matrix[rows, columns] = levels
+    return matrix, traits
+
+
+def value_matrix(plots, cache_key):
+    """float64 (plants x numeric traits) scaled to 0..1 per trait, NaN where there is no value."""
+    columns = cached_trait_columns(plots, cache_key)
+    numeric = [trait for trait in columns["traits"] if trait["type"] == "numeric"]
+    length = len(columns["plants"])
+    matrix = np.full((length, len(numeric)), np.nan)
+    for j, trait in enumerate(numeric):
+        values = np.frombuffer(trait["values"], dtype=np.float64)
+        valid = np.unpackbits(np.frombuffer(trait["valid"], dtype=np.uint8), bitorder='little')[:length].astype(bool)
+        low, high = trait["range"]
+        matrix[valid, j] = (values[valid] - low) / (high - low) if high > low else 0.5
+    return matrix, [trait["name"] for trait in numeric]
+
+
+def cached_matrix(kind, plots, cache_key):
+    """(matrix, trait names) for ``kind``, kept per ``cache_key`` (which must include the data versions)."""
+    key = (kind, cache_key)
+    cached = matrix_cache.get(key)
+    if cached is None:
+        cached = (status_matrix if kind == 'status' else value_matrix)(plots, cache_key)
+        matrix_cache.set(key, cached)
+    return cached
+
+
+def overview_zoom(rows):
+    """The smallest zoom at which ``rows`` plants fit in one tile."""
+    return min(MAX_ZOOM, max(0, math.ceil(math.log2(rows / TILE_SIZE)))) if rows > TILE_SIZE else 0
+
+
+def downsample_levels(block, factor):
+    """Most common level over each run of ``factor`` rows (the last run may be shorter)."""
+    runs = -(-len(block) // factor)
+    padded = np.full((runs * factor, block.shape[1]), len(FLAG_LEVELS), dtype=np.uint8)
+    padded[:len(block)] = block
+    padded = padded.reshape(runs, factor, block.shape[1])
+    counts = np.stack([(padded == level).sum(axis=1) for level in range(len(FLAG_LEVELS))])
+    return counts.argmax(axis=0).astype(np.uint8)
+
+
+def downsample_values(block, factor):
+    """Mean of the known values over each run of ``factor`` rows, NaN where there are none."""
+    runs = -(-len(block) // factor)
+    padded = np.full((runs * factor, block.shape[1]), np.nan)
+    padded[:len(block)] = block
+    padded = padded.reshape(runs, factor, block.shape[1])
+    known = ~np.isnan(padded)
+    counts = known.sum(axis=1)
+    sums = np.where(known, padded, 0).sum(axis=1)
+    return np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+
+
+def colorize(kind, pixels):
+    if kind == 'status':
+        return STATUS_COLORS[pixels]
+    indexes = np.where(np.isnan(pixels), 256, np.rint(np.nan_to_num(pixels) * 255)).astype(np.intp)
+    return VALUE_COLORS[indexes]
+
+
+def render_tile(kind, matrix, zoom, x, y):
+    """PNG bytes of tile (x, y) at ``zoom``, or None when it lies outside the matrix."""
+    factor = 2 ** zoom
+    first_row, first_column = y * TILE_SIZE * factor, x * TILE_SIZE
+    block = matrix[first_row:first_row + TILE_SIZE * factor, first_column:first_column + TILE_SIZE]
+    if not block.size:
+        return None
+    if factor > 1:
+        block = (downsample_levels if kind == 'status' else downsample_values)(block, factor)
+    image = Image.fromarray(np.ascontiguousarray(colorize(kind, block)), 'RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def raster_tile(kind, plots, cache_key, zoom=None, x=0, y=0):
+    """
+    (png, info) for one tile; ``png`` is None outside the matrix. ``info``
+    gives the matrix size, the zoom used and the column trait names.
+    """
+    matrix, traits = cached_matrix(kind, plots, cache_key)
+    zoom = overview_zoom(len(matrix)) if zoom is None else zoom
+    key = (kind, cache_key, zoom, x, y)
+    png = tile_cache.get(key)
+    if png is None:
+        png = render_tile(kind, matrix, zoom, x, y)
+        tile_cache.set(key, png)
+    return png, {"rows": matrix.shape[0], "columns": matrix.shape[1], "zoom": zoom, "traits": traits}
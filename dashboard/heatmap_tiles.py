@@ -0,0 +1,107 @@
+"""
+dashboard.heatmap_tiles
+
+The plot x trait status heatmap served in tiles, so a page only ever loads
+the window it shows.
+
+Rows are FieldPlots (optionally one trial's), in plant_id order unless the
+request sorts them by the flag of a trait. Columns are the traits observed
+for those plots. A tile holds the latest status flag of each of its cells
+as a small integer (FLAG_LEVELS index): 0 too early / none, 1 overdue,
+2 due soon, 3 completed.
+"""
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .brapi_cache import ResponseCache
+from .models import PlantTraitData
+from .pivot import latest_observations
+
+FLAG_LEVELS = ('🕓', '❌', '⏳', '✔️')
+MAX_TILE_ROWS = 500
+MAX_TILE_COLUMNS = 200
+
+traits_cache = ResponseCache(getattr(settings, 'HEATMAP_TRAITS_CACHE_ENTRIES', 32))
+
+
+def flag_level(field='status_flag'):
+    """SQL expression turning a status flag into its FLAG_LEVELS index (unknown or null: 0)."""
+    return Case(
+        *[When(**{field: flag}, then=Value(level)) for level, flag in enumerate(FLAG_LEVELS) if level],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def latest_level(trait):
+    """The FLAG_LEVELS index of a plot's latest ``trait`` observation, as a subquery on FieldPlot."""
+    newest = (
+        PlantTraitData.objects
+        .filter(plant_id=OuterRef('plant_id'), trait=trait)
+        .order_by('-id')
+        .annotate(level=flag_level())
+        .values('level')[:1]
+    )
+    return Coalesce(Subquery(newest, output_field=IntegerField()), Value(0))
+
+
+def parse_flag_filter(value):
+    """(trait, level) from "trait:level"; raises ValueError."""
+    trait, _, level = value.rpartition(':')
+    if not trait or not level.isdigit() or int(level) >= len(FLAG_LEVELS):
+        raise ValueError(f"flag filters look like <trait>:<0-{len(FLAG_LEVELS) - 1}>, got {value!r}")
+    return trait, int(level)
+
+
+def heatmap_rows(plots, sort=None, flag_filters=()):
+    """
+    ``plots`` ordered for the heatmap: by plant_id, or by the flag level of
+    the ``sort`` trait ("-trait" for descending), keeping only plots whose
+    latest flag matches every (trait, level) in ``flag_filters``.
+    """
+    for index, (trait, level) in enumerate(flag_filters):
+        plots = plots.alias(**{f'filter_{index}': latest_level(trait)}).filter(**{f'filter_{index}': level})
+    if not sort:
+        return plots.order_by('plant_id')
+    descending = sort.startswith('-')
+    plots = plots.alias(sort_level=latest_level(sort.lstrip('-')))
+    return plots.order_by('-sort_level' if descending else 'sort_level', 'plant_id')
+
+
+def heatmap_traits(plots, cache_key):
+    """Sorted names of the traits observed for ``plots``, cached under ``cache_key``."""
+    traits = traits_cache.get(cache_key)
+    if traits is None:
+        traits = list(
+            PlantTraitData.objects
+            .filter(plant_id__in=plots.values('plant_id'))
+            .order_by('trait')
+            .values_list('trait', flat=True)
+            .distinct()
+        )
+        traits_cache.set(cache_key, traits)
+    return traits
+
+
+def heatmap_tile(rows, traits, row_offset, row_limit, column_offset, column_limit):
+    """One window of the heatmap: its plant ids and a row-major list of flag levels."""
+    plants = list(rows.values_list('plant_id', flat=True)[row_offset:row_offset + row_limit])
+    columns = traits[column_offset:column_offset + column_limit]
+    row_of = {plant_id: i for i, plant_id in enumerate(plants)}
+    column_of = {trait: j for j, trait in enumerate(columns)}
+
+    flags = [[0] * len(columns) for _ in plants]
+    if plants and columns:
+        observations = PlantTraitData.objects.filter(plant_id__in=plants, trait__in=columns)
+        cells = latest_observations(observations).annotate(level=flag_level()).values_list('plant_id', 'trait', 'level')
+        for plant_id, trait, level in cells:
+            flags[row_of[plant_id]][column_of[trait]] = level
+    return {
+        "row_offset": row_offset,
+        "column_offset": column_offset,
+        "plants": plants,
+        "traits": columns,
+        "flags": flags,
+    }
@@ -0,0 +1,303 @@
+"""
+dashboard.ingest
+
+Streaming ingestion of wide trait sheets (one row per plant, one column per
+trait) into PlantTraitData.
+
+The CSV is read lazily row by row, observations are buffered into bounded
+batches and written with bulk_create inside a single transaction, so memory
+stays flat no matter how many plots or traits the sheet holds.
+
+upsert_observations() and register_samples() are the same idea for BrAPI
+observation and sample payloads.
+"""
+
+import csv
+import datetime
+import time
+import uuid
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .brapi_cache import bump_data_version
+from .models import FieldPlot, PlantTraitData, Sample
+
+try:
+    import resource
+except ImportError:  # Windows dev boxes
+    resource = None
+
+
+NON_TRAIT_COLUMNS = ('plant_id', 'block', 'row', 'column', 'planting_date')
+DEFAULT_BATCH_SIZE = 5000
+
+
+def trait_columns(headers):
+    """Return the header names that hold trait values."""
+    return [h for h in headers if h.lower() not in NON_TRAIT_COLUMNS]
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def ingest_trait_csv(fileobj, user=None, batch_size=DEFAULT_BATCH_SIZE, on_row=None, on_headers=None):
+    """
+    Stream a wide trait CSV into PlantTraitData.
+
+    ``fileobj`` is any text file object. ``on_row(entry, trait_fields)`` is
+    called once per sheet row with the row as a dict, so callers can build
+    their summaries in the same pass instead of re-reading the file.
+    ``on_headers(headers)`` is called first with the header row, whose
+    columns short rows lack from their dicts.
+
+    Returns a stats dict: headers, trait_fields, rows, cells, seconds,
+    cells_per_sec and peak_memory_mb.
+    """
+    started = time.perf_counter()
+    reader = csv.reader(fileobj)
+    headers = next(reader, [])
+    trait_fields = trait_columns(headers)
+    trait_index = [(headers.index(t), t) for t in trait_fields]
+    pid_index = headers.index('plant_id') if 'plant_id' in headers else None
+    if on_headers is not None:
+        on_headers(headers)
+
+    rows = cells = 0
+    batch = []
+
+    with transaction.atomic():
+        for row in reader:
+            rows += 1
+            pid = row[pid_index] if pid_index is not None and pid_index < len(row) else None
+
+            for idx, trait in trait_index:
+                value = row[idx].strip() if idx < len(row) else ''
+                if value:
+                    batch.append(PlantTraitData(
+                        plant_id=pid,
+                        trait=trait,
+                        value=value,
+                        uploaded_by=user,
+                    ))
+
+            if on_row is not None:
+                on_row(dict(zip(headers, row)), trait_fields)
+
+            if len(batch) >= batch_size:
+                PlantTraitData.objects.bulk_create(batch, batch_size=batch_size)
+                cells += len(batch)
+                batch = []
+
+        if batch:
+            PlantTraitData.objects.bulk_create(batch, batch_size=batch_size)
+            cells += len(batch)
+
+        # bulk_create sends no signals
+        bump_data_version(PlantTraitData)
+
+    seconds = time.perf_counter() - started
+    return {
+        'headers': headers,
+        'trait_fields': trait_fields,
+        'rows': rows,
+        'cells': cells,
+        'seconds': round(seconds, 3),
+        'cells_per_sec': int(cells / seconds) if seconds else cells,
+        'peak_memory_mb': peak_memory_mb(),
+    }
+
+
+LOOKUP_CHUNK_SIZE = 2000
+
+
+def chunked(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_plant_ids(plant_ids):
+    found = set()
+    for chunk in chunked(plant_ids, LOOKUP_CHUNK_SIZE):
+        found.update(FieldPlot.objects.filter(plant_id__in=chunk).values_list('plant_id', flat=True))
+    return found
+
+
+def latest_observation_ids(pairs):
+    """{(plant_id, trait): id of its newest PlantTraitData row} for the pairs that exist."""
+    ids = {}
+    traits = {trait for _, trait in pairs}
+    for chunk in chunked({plant_id for plant_id, _ in pairs}, LOOKUP_CHUNK_SIZE):
+        rows = (
+            PlantTraitData.objects
+            .filter(plant_id__in=chunk, trait__in=traits)
+            .values_list('plant_id', 'trait', 'id')
+            .order_by('id')
+        )
+        for plant_id, trait, pk in rows:
+            if (plant_id, trait) in pairs:
+                ids[(plant_id, trait)] = pk
+    return ids
+
+
+def update_values(values_by_id, timestamp):
+    """
+    Set value and timestamp on existing PlantTraitData rows from (value, id)
+    pairs. One prepared UPDATE run with executemany: bulk_update() builds a
+    CASE expression per row, which costs more than the writes themselves.
+    """
+    if not values_by_id:
+        return
+    meta, quote = PlantTraitData._meta, connection.ops.quote_name
+    stamp = meta.get_field('timestamp').get_db_prep_value(timestamp, connection)
+    sql = (
+        f"UPDATE {quote(meta.db_table)} SET {quote(meta.get_field('value').column)} = %s, "
+        f"{quote(meta.get_field('timestamp').column)} = %s "
+        f"WHERE {quote(meta.pk.column)} = %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(value, stamp, pk) for value, pk in values_by_id])
+
+
+def validate_observation(obs, known_units):
+    """(plant_id, trait, value) for a BrAPI observation dict, or raise ValueError with the message to report."""
+    unit_id = obs.get("observationUnitDbId")
+    trait = obs.get("observationVariableName")
+    value = obs.get("value")
+    timestamp = obs.get("observationTimeStamp")
+
+    if not all([unit_id, trait, value, timestamp]):
+        raise ValueError("Missing required fields")
+    unit_id = str(unit_id)
+    if unit_id not in known_units:
+        raise ValueError(f"Observation unit {unit_id} not found")
+    try:
+        datetime.datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid timestamp format: {timestamp}")
+    return unit_id, str(trait), str(value)
+
+
+def upsert_observations(observations, user=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Record a batch of BrAPI observations with one lookup per table.
+
+    Every record is validated against a single preloaded set of plot ids;
+    the valid ones upsert on (observationUnitDbId, observationVariableName)
+    with bulk_update / bulk_create inside one transaction. When a pair
+    occurs several times in the payload the last value wins, as it would
+    with sequential writes.
+
+    Returns (ids, errors): ids holds one observation id per valid record, in
+    payload order; errors holds {"observation", "error"} dicts for the rest.
+    """
+    observations = [obs if isinstance(obs, dict) else {} for obs in observations]
+    known_units = existing_plant_ids({str(obs["observationUnitDbId"]) for obs in observations
+                                      if obs.get("observationUnitDbId")})
+
+    accepted, errors = [], []
+    for obs in observations:
+        try:
+            accepted.append(validate_observation(obs, known_units))
+        except ValueError as exc:
+            errors.append({"observation": obs, "error": str(exc)})
+
+    latest_values = {(plant_id, trait): value for plant_id, trait, value in accepted}
+    if not latest_values:
+        return [], errors
+
+    # timestamp is auto_now: like save(), a write stamps the time it was recorded
+    now = timezone.now()
+    with transaction.atomic():
+        pair_ids = latest_observation_ids(set(latest_values))
+
+        update_values([
+            (value, pair_ids[pair]) for pair, value in latest_values.items() if pair in pair_ids
+        ], now)
+
+        creates = [
+            PlantTraitData(plant_id=plant_id, trait=trait, value=value, uploaded_by=user)
+            for (plant_id, trait), value in latest_values.items() if (plant_id, trait) not in pair_ids
+        ]
+        for obj in PlantTraitData.objects.bulk_create(creates, batch_size=batch_size):
+            pair_ids[(obj.plant_id, obj.trait)] = obj.pk
+
+        bump_data_version(PlantTraitData)
+
+    return [pair_ids[(plant_id, trait)] for plant_id, trait, _ in accepted], errors
+
+
+SAMPLE_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'smartfield/brapi/samples')
+SAMPLE_REQUIRED_FIELDS = ("sampleName", "observationUnitDbId", "takenDateTime", "sampleType")
+
+
+def sample_db_id(study_id, unit_id, sample_name, taken):
+    """
+    Deterministic sampleDbId: the same study, unit, name and sampling time
+    always give the same id, so a resubmitted plate is recognised instead of
+    registered twice.
+    """
+    key = '|'.join(str(part or '') for part in (study_id, unit_id, sample_name, taken.isoformat()))
+    return str(uuid.uuid5(SAMPLE_NAMESPACE, key))
+
+
+def register_samples(samples, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Register a batch of BrAPI samples with one lookup per table and bulk_create.
+
+    Returns (created, errors): the new Sample instances (primary keys set, so
+    they can be serialized without re-reading them) and {"sample", "error"}
+    dicts for the records that were rejected, including ones already
+    registered.
+    """
+    samples = [sample if isinstance(sample, dict) else {} for sample in samples]
+    known_units = existing_plant_ids({str(sample["observationUnitDbId"]) for sample in samples
+                                      if sample.get("observationUnitDbId")})
+
+    pending, errors = {}, []
+    for sample in samples:
+        name = sample.get("sampleName", "N/A")
+        if not all(sample.get(field) for field in SAMPLE_REQUIRED_FIELDS):
+            errors.append({"sample": name, "error": "Missing required fields"})
+            continue
+        unit_id = str(sample["observationUnitDbId"])
+        if unit_id not in known_units:
+            errors.append({"sample": name, "error": f"ObservationUnitDbId '{unit_id}' not found"})
+            continue
+        try:
+            taken = datetime.datetime.fromisoformat(str(sample["takenDateTime"]).replace("Z", "+00:00"))
+        except ValueError:
+            errors.append({"sample": name, "error": f"Invalid 'takenDateTime' format: {sample['takenDateTime']}"})
+            continue
+        if timezone.is_naive(taken):
+            taken = timezone.make_aware(taken)
+
+        db_id = sample_db_id(sample.get("studyDbId"), unit_id, name, taken)
+        if db_id in pending:
+            errors.append({"sample": name, "error": f"Duplicate sample in request ({db_id})"})
+            continue
+        pending[db_id] = Sample(
+            sampleDbId=db_id,
+            sampleName=name,
+            studyDbId=sample.get("studyDbId"),
+            observationUnitDbId=unit_id,
+            germplasmDbId=sample.get("germplasmDbId"),
+            sampleType=sample["sampleType"],
+            takenBy=sample.get("takenBy"),
+            sampleTimestamp=taken,
+        )
+
+    for chunk in chunked(pending, LOOKUP_CHUNK_SIZE):
+        for db_id in Sample.objects.filter(sampleDbId__in=chunk).values_list('sampleDbId', flat=True):
+            errors.append({"sample": pending.pop(db_id).sampleName, "error": f"Sample {db_id} is already registered"})
+
+    with transaction.atomic():
+        created = Sample.objects.bulk_create(pending.values(), batch_size=batch_size)
+        if created:
+            bump_data_version(Sample)
+    return created, errors
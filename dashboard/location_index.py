@@ -0,0 +1,71 @@
+"""
+dashboard.location_index
+
+Keeps the Location table in step with FieldPlot.
+
+Each Location holds the centroid (mean latitude/longitude), bounding box and
+plot count of the plots sharing its name, computed with one GROUP BY over
+the indexed FieldPlot.location column. Plot saves and deletes refresh only
+the location(s) they touch. Queryset .update() / bulk writes on FieldPlot
+send no signals, so code doing them should call refresh_locations() with the
+affected names; after raw loads (loaddata, SQL imports) run
+``python manage.py rebuild_locations``, which calls rebuild_locations().
+"""
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+
+from .models import FieldPlot, Location
+
+STAT_FIELDS = (
+    'plot_count', 'latitude', 'longitude',
+    'min_latitude', 'max_latitude', 'min_longitude', 'max_longitude',
+)
+
+
+def location_stats(names=None):
+    """{location name: stats dict} aggregated from FieldPlot (restricted to ``names`` when given)."""
+    plots = FieldPlot.objects.exclude(location__isnull=True).exclude(location='')
+    if names is not None:
+        plots = plots.filter(location__in=names)
+    rows = plots.values_list('location').order_by().annotate(
+        Count('id'), Avg('latitude'), Avg('longitude'),
+        Min('latitude'), Max('latitude'), Min('longitude'), Max('longitude'),
+    )
+    return {name: dict(zip(STAT_FIELDS, values)) for name, *values in rows}
+
+
+def refresh_locations(names):
+    """Recompute the Location rows for ``names``; names without plots drop to plot_count 0."""
+    names = {name for name in names if name}
+    if not names:
+        return
+    stats = location_stats(names)
+    empty = dict(dict.fromkeys(STAT_FIELDS), plot_count=0)
+    with transaction.atomic():
+        for name in sorted(names):
+            Location.objects.update_or_create(locationName=name, defaults=stats.get(name, empty))
+
+
+def rebuild_locations():
+    """Recompute every Location from scratch; returns how many were refreshed."""
+    names = set(Location.objects.values_list('locationName', flat=True)) | set(location_stats())
+    refresh_locations(names)
+    return len(names)
+
+
+def remember_previous_location(sender, instance, raw=False, **kwargs):
+    """pre_save: note where an existing plot was, so moving it refreshes both locations."""
+    if raw or instance.pk is None:
+        instance._previous_location = None
+        return
+    instance._previous_location = (
+        FieldPlot.objects.filter(pk=instance.pk).values_list('location', flat=True).first()
+    )
+
+
+def refresh_plot_location(sender, instance, raw=False, **kwargs):
+    """post_save / post_delete receiver, connected in DashboardConfig.ready()."""
+    if raw:
+        return
+    refresh_locations({instance.location, getattr(instance, '_previous_location', None)})
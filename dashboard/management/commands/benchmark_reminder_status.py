@@ -0,0 +1,71 @@
+"""
+dashboard.management.commands.benchmark_reminder_status
+
+Check the SQL reminder status of dashboard.reminders against
+calculate_trait_reminder_status() row by row, and time counting per status
+both ways:
+    python manage.py benchmark_reminder_status --rows 200000
+
+--rows adds synthetic timelines (with a mix of actual dates) inside a
+transaction that is rolled back at the end. Any disagreement is printed and
+makes the command exit with an error.
+"""
+
+import datetime
+from collections import Counter
+
+from django.utils import timezone
+
+from dashboard.benchmarks import TRAITS_PER_PLANT, BenchmarkCommand, insert_in_batches, rolled_back, speedup, timed
+from dashboard.models import TraitTimeline
+from dashboard.reminders import reminder_counts, with_reminder_status
+from dashboard.utils import calculate_trait_reminder_status
+
+
+def synthetic_timelines(rows, today):
+    plants = max(rows // TRAITS_PER_PLANT, 1)
+    for i in range(rows):
+        expected = today + datetime.timedelta(days=(i % 61) - 30)
+        # Two thirds recorded, some of those ahead of the expected date
+        actual = None if i % 3 == 0 else expected + datetime.timedelta(days=(i % 7) - 3)
+        yield TraitTimeline(
+            plant_id=f"BENCH-{i % plants:07d}",
+            trait=f"trait_{(i // plants) % TRAITS_PER_PLANT:02d}",
+            expected_date=expected,
+            actual_date=actual,
+        )
+
+
+class Command(BenchmarkCommand):
+    help = "Parity check and timing of the SQL reminder status against the Python one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=0, help="Synthetic TraitTimeline rows to add (rolled back)")
+
+    def handle(self, *args, **opts):
+        with rolled_back():
+            insert_in_batches(TraitTimeline, synthetic_timelines(opts["rows"], timezone.now().date()))
+            self.run()
+        self.check_parity("timelines differ between SQL and calculate_trait_reminder_status")
+        self.stdout.write(self.style.SUCCESS("SQL and Python statuses identical"))
+
+    def run(self):
+        # Python would raise comparing an actual date with a missing expected one
+        timelines = TraitTimeline.objects.exclude(actual_date__isnull=False, expected_date__isnull=True)
+
+        python_ms, python_counts = timed(lambda: Counter(
+            calculate_trait_reminder_status(entry.expected_date, entry.actual_date) for entry in timelines.all()))
+        sql_ms, sql_counts = timed(lambda: reminder_counts(with_reminder_status(timelines)))
+
+        rows = with_reminder_status(timelines).values_list('pk', 'expected_date', 'actual_date', 'reminder_status')
+        for pk, expected, actual, status in rows.iterator(chunk_size=10000):
+            if calculate_trait_reminder_status(expected, actual) != status:
+                self.mismatch(f"timeline {pk}: SQL says {status}")
+
+        total = sum(sql_counts.values())
+        self.stdout.write(f"{total} timelines  Python loop {python_ms:8.1f} ms  SQL count {sql_ms:8.1f} ms"
+                          f"  ({speedup(python_ms, sql_ms)})")
+        for status, count in sql_counts.items():
+            self.stdout.write(f"  {status:<14} {count}")
+        if dict(python_counts) != {status: n for status, n in sql_counts.items() if n}:
+            self.mismatch("the counts per status differ")
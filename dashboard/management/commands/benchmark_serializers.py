@@ -0,0 +1,61 @@
+"""
+dashboard.management.commands.benchmark_serializers
+
+Check that the values() fast path renders exactly what the DRF serializers
+render, and time both:
+    python manage.py benchmark_serializers --rows 5000
+
+Rows are read from the current database; models with no rows are skipped.
+Any mismatch is printed and makes the command exit with an error.
+"""
+
+from dashboard.benchmarks import BenchmarkCommand, best_of, speedup
+from dashboard.models import FieldPlot, Germplasm, PlantTraitData, Sample, Trial
+from dashboard.serializers import (
+    GermplasmSerializer, ObservationSerializer, ObservationUnitSerializer, SampleSerializer, TrialSerializer,
+    fast_germplasm, fast_observation_units, fast_observations, fast_samples, fast_trials,
+)
+
+CASES = [
+    ("observations", PlantTraitData, ObservationSerializer, fast_observations),
+    ("observationunits", FieldPlot, ObservationUnitSerializer, fast_observation_units),
+    ("samples", Sample, SampleSerializer, fast_samples),
+    ("germplasm", Germplasm, GermplasmSerializer, fast_germplasm),
+    ("trials", Trial, TrialSerializer, fast_trials),
+]
+
+
+class Command(BenchmarkCommand):
+    help = "Parity check and timing of the values() BrAPI serializers against the DRF ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Rows per model")
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per serializer")
+
+    def handle(self, *args, **opts):
+        rows, repeat = opts["rows"], opts["repeat"]
+
+        for label, model, serializer_class, fast in CASES:
+            queryset = model.objects.order_by('pk')[:rows]
+            if not queryset.exists():
+                self.stdout.write(f"{label:<18} no rows, skipped")
+                continue
+
+            slow_ms, expected = best_of(repeat, lambda: serializer_class(list(queryset.all()), many=True).data)
+            fast_ms, actual = best_of(repeat, lambda: fast.many(fast.queryset(queryset)))
+
+            before = self.mismatches
+            for e, a in zip(expected, actual):
+                if list(e.items()) != list(a.items()):
+                    self.mismatch(f"{label}: expected {dict(e)!r}\n  {' ' * len(label)}  got      {a!r}")
+            if len(expected) != len(actual):
+                self.mismatch(f"{label}: {len(expected)} rows from DRF, {len(actual)} from values()")
+            bad = self.mismatches - before
+
+            self.stdout.write(
+                f"{label:<18} {len(expected):>7} rows  DRF {slow_ms:>9.1f} ms  values() {fast_ms:>8.1f} ms"
+                f"  ({speedup(slow_ms, fast_ms)})  "
+                + (self.style.ERROR(f"{bad} mismatches") if bad else self.style.SUCCESS("identical"))
+            )
+
+        self.check_parity("rows differ between the DRF and values() serializers")
@@ -0,0 +1,70 @@
+"""
+dashboard.management.commands.benchmark_spatial_index
+
+Check the grid-cell queries of dashboard.spatial against plain coordinate
+scans of the current FieldPlot rows, and time both:
+    python manage.py benchmark_spatial_index --queries 50 --meters 100
+
+Query centres are taken from random geolocated plots. Any disagreement is
+printed and makes the command exit with an error.
+"""
+
+import random
+
+from dashboard.benchmarks import BenchmarkCommand, speedup, timed
+from dashboard.models import FieldPlot
+from dashboard.spatial import distance_expression, nearest, radius_bbox, within_bbox, within_radius
+
+
+class Command(BenchmarkCommand):
+    help = "Parity check and timing of the FieldPlot grid-cell index against coordinate scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", type=int, default=50, help="Random query points")
+        parser.add_argument("--meters", type=float, default=100, help="Radius (and half bbox size) in metres")
+        parser.add_argument("--k", type=int, default=10, help="Plots per nearest-neighbour query")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **opts):
+        plots = FieldPlot.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        points = list(plots.values_list('latitude', 'longitude'))
+        if not points:
+            self.stdout.write("No geolocated plots, nothing to check.")
+            return
+        centres = random.Random(opts["seed"]).sample(points, min(opts["queries"], len(points)))
+        meters, k = opts["meters"], opts["k"]
+        timings = {"bbox": [0, 0], "radius": [0, 0], "nearest": [0, 0]}
+
+        for latitude, longitude in centres:
+            west, south, east, north = bbox = radius_bbox(latitude, longitude, meters)
+            distance = distance_expression(latitude, longitude)
+
+            checks = [
+                ("bbox",
+                 lambda: set(within_bbox(bbox).values_list('pk', flat=True)),
+                 lambda: set(plots.filter(longitude__range=(west, east), latitude__range=(south, north))
+                             .values_list('pk', flat=True))),
+                ("radius",
+                 lambda: set(within_radius(latitude, longitude, meters).values_list('pk', flat=True)),
+                 lambda: set(plots.annotate(distance=distance).filter(distance__lte=meters)
+                             .values_list('pk', flat=True))),
+                ("nearest",
+                 lambda: [round(plot.distance, 6) for plot in nearest(latitude, longitude, k)],
+                 lambda: [round(d, 6) for d in plots.annotate(distance=distance).order_by('distance')
+                          .values_list('distance', flat=True)[:k]]),
+            ]
+            for label, indexed, scan in checks:
+                indexed_ms, got = timed(indexed)
+                scan_ms, expected = timed(scan)
+                timings[label][0] += indexed_ms
+                timings[label][1] += scan_ms
+                if got != expected:
+                    self.mismatch(f"{label} at ({latitude}, {longitude}): index and scan differ")
+
+        for label, (indexed_ms, scan_ms) in timings.items():
+            self.stdout.write(
+                f"{label:<8} {len(centres)} queries  grid index {indexed_ms / len(centres):8.2f} ms"
+                f"  scan {scan_ms / len(centres):8.2f} ms  ({speedup(scan_ms, indexed_ms)})"
+            )
+        self.check_parity("queries differ between the grid index and a full scan")
+        self.stdout.write(self.style.SUCCESS(f"{len(points)} plots, all queries identical"))
@@ -0,0 +1,124 @@
+"""
+dashboard.management.commands.benchmark_trait_indexes
+
+Measure the PlantTraitData / TraitTimeline indexes on synthetic data:
+    python manage.py benchmark_trait_indexes --rows 5000000
+
+Everything runs inside a transaction that is rolled back at the end: the
+synthetic rows are inserted, every benchmarked query is EXPLAINed and timed
+with the indexes dropped, then again with them in place.
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from dashboard.benchmarks import TRAITS_PER_PLANT, batches, best_of, insert_in_batches, rolled_back, speedup, timed
+from dashboard.models import PlantTraitData, TraitTimeline
+
+
+def synthetic_observations(rows):
+    plants = max(rows // TRAITS_PER_PLANT, 1)
+    for i in range(rows):
+        yield PlantTraitData(
+            plant_id=f"BENCH-{i % plants:07d}",
+            trait=f"trait_{(i // plants) % TRAITS_PER_PLANT:02d}",
+            value=str(i % 97),
+        )
+
+
+def insert_observations(rows, stamp):
+    """Synthetic observations, each insert batch stamped a minute before the previous one."""
+    for minutes, batch in enumerate(batches(synthetic_observations(rows))):
+        created = PlantTraitData.objects.bulk_create(batch)
+        # auto_now stamps the rows as they are inserted, so the spread is applied afterwards
+        PlantTraitData.objects.filter(pk__range=(created[0].pk, created[-1].pk)).update(
+            timestamp=stamp - datetime.timedelta(minutes=minutes))
+
+
+def synthetic_timelines(rows, today):
+    plants = max(rows // TRAITS_PER_PLANT, 1)
+    flags = ['🕓', '⏳', '❌', '✔️']
+    for i in range(rows):
+        yield TraitTimeline(
+            plant_id=f"BENCH-{i % plants:07d}",
+            trait=f"trait_{(i // plants) % TRAITS_PER_PLANT:02d}",
+            expected_date=today + datetime.timedelta(days=(i % 365) - 180),
+            status_flag=flags[i % 4],
+        )
+
+
+def benchmark_queries(today, stamp):
+    """(label, queryset) pairs mirroring the dashboard and BrAPI access patterns."""
+    plant = "BENCH-0000042"
+    return [
+        ("plant_snapshot", PlantTraitData.objects.filter(plant_id=plant).order_by('trait', '-timestamp')),
+        ("plant_trait_history", PlantTraitData.objects.filter(plant_id=plant).order_by('-timestamp')),
+        ("latest value", PlantTraitData.objects.filter(plant_id=plant, trait="trait_03").order_by('-timestamp')[:1]),
+        ("observations by trait", PlantTraitData.objects.filter(trait="trait_07").order_by('plant_id')[:1000]),
+        # One insert batch of insert_observations()
+        ("observations in window", PlantTraitData.objects.filter(timestamp__range=(
+            stamp - datetime.timedelta(minutes=10.5), stamp - datetime.timedelta(minutes=9.5)))),
+        ("timeline for plant", TraitTimeline.objects.filter(plant_id=plant).order_by('trait')),
+        ("overdue due this week", TraitTimeline.objects.filter(
+            expected_date__range=(today, today + datetime.timedelta(days=7)), status_flag='❌')),
+    ]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN and time the trait indexes on a synthetic table (rolled back afterwards)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5_000_000, help="Synthetic PlantTraitData rows")
+        parser.add_argument("--timeline-rows", type=int, help="Synthetic TraitTimeline rows (default: --rows / 5)")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query")
+
+    def handle(self, *args, **opts):
+        rows = opts["rows"]
+        timeline_rows = opts.get("timeline_rows") or max(rows // 5, 1)
+        with rolled_back():
+            self.run(rows, timeline_rows, opts["repeat"])
+        self.stdout.write(self.style.SUCCESS("Synthetic data rolled back."))
+
+    def run(self, rows, timeline_rows, repeat):
+        today = timezone.now().date()
+        stamp = timezone.now()
+
+        self.stdout.write(f"Inserting {rows} observations and {timeline_rows} timeline rows...")
+        observations_ms, _ = timed(lambda: insert_observations(rows, stamp))
+        timelines_ms, _ = timed(lambda: insert_in_batches(TraitTimeline, synthetic_timelines(timeline_rows, today)))
+        self.stdout.write(f"  done in {(observations_ms + timelines_ms) / 1000:.1f}s")
+
+        indexes = [(PlantTraitData, idx) for idx in PlantTraitData._meta.indexes]
+        indexes += [(TraitTimeline, idx) for idx in TraitTimeline._meta.indexes]
+
+        # Plain DDL statements: SQLite refuses a schema_editor() context inside atomic()
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+        before = self.measure("WITHOUT indexes", today, stamp, repeat)
+
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+            cursor.execute("ANALYZE")
+        after = self.measure("WITH indexes", today, stamp, repeat)
+
+        self.stdout.write("\nSummary (best of %d, ms)" % repeat)
+        for label in before:
+            self.stdout.write(f"  {label:<24} {before[label]:>10.2f} → {after[label]:>10.2f}"
+                              f"  ({speedup(before[label], after[label])})")
+
+    def measure(self, title, today, stamp, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {title} ==="))
+        timings = {}
+        for label, queryset in benchmark_queries(today, stamp):
+            self.stdout.write(self.style.MIGRATE_LABEL(f"\n{label}"))
+            self.stdout.write(queryset.explain())
+            best, _ = best_of(repeat, lambda: list(queryset.all()))
+            timings[label] = best
+            self.stdout.write(f"  {best:.2f} ms")
+        return timings
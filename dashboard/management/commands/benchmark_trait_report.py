@@ -0,0 +1,84 @@
+"""
+dashboard.management.commands.benchmark_trait_report
+
+Check that the trait status report of export_trait_pdf is read with a
+single query, whatever the number of plots and traits:
+    python manage.py benchmark_trait_report --plants 10000 --traits 20
+
+Synthetic timelines are inserted inside a transaction that is rolled back
+at the end. The pivoted matrix is compared with the per-cell lookups the
+report used to make for a sample of plants, and the HTML of the first part
+is rendered (--pdf renders it to PDF too). More than one query, or any
+difference, makes the command exit with an error.
+"""
+
+import datetime
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from dashboard.benchmarks import BenchmarkCommand, insert_in_batches, rolled_back, timed
+from dashboard.models import TraitTimeline
+from dashboard.pivot import pivot_timeline_flags
+from dashboard.trait_report import render_report, report_html, report_parts
+
+MAX_QUERIES = 1
+SAMPLE_PLANTS = 50
+
+
+def synthetic_timelines(plants, traits, today):
+    flags = ['🕓', '⏳', '❌', '✔️']
+    for i in range(plants * traits):
+        # Leave a few cells empty so missing timelines are covered too
+        if i % 11 == 0:
+            continue
+        yield TraitTimeline(
+            plant_id=f"REPORT-{i // traits:06d}",
+            trait=f"trait_{i % traits:02d}",
+            expected_date=today + datetime.timedelta(days=i % 30),
+            status_flag=flags[i % 4],
+        )
+
+
+class Command(BenchmarkCommand):
+    help = "Query count, parity and timing of the trait status report (synthetic data, rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plants", type=int, default=10000)
+        parser.add_argument("--traits", type=int, default=20)
+        parser.add_argument("--pdf", action="store_true", help="Also render the first part to PDF")
+
+    def handle(self, *args, **opts):
+        with rolled_back():
+            insert_in_batches(TraitTimeline, synthetic_timelines(opts["plants"], opts["traits"], timezone.now().date()))
+            self.run(opts["pdf"])
+        self.stdout.write(self.style.SUCCESS("Synthetic data rolled back."))
+        self.check_parity("cells differ between the pivot and per-cell lookups")
+
+    def run(self, pdf):
+        timelines = TraitTimeline.objects.all()
+        with CaptureQueriesContext(connection) as queries:
+            pivot_ms, (traits, rows) = timed(lambda: pivot_timeline_flags(timelines))
+        self.stdout.write(f"{len(rows)} plants x {len(traits)} traits pivoted with {len(queries)} "
+                          f"quer{'y' if len(queries) == 1 else 'ies'} in {pivot_ms:.0f} ms "
+                          f"(per-cell lookups: {len(rows) * len(traits)} queries)")
+        if len(queries) > MAX_QUERIES:
+            raise CommandError(f"The report took {len(queries)} queries, expected at most {MAX_QUERIES}")
+
+        # The lookups export_trait_pdf used to make for every cell
+        for plant_id, flags in rows[:SAMPLE_PLANTS]:
+            for trait, flag in zip(traits, flags):
+                record = TraitTimeline.objects.filter(plant_id=plant_id, trait=trait).first()
+                if flag != (record.status_flag if record else "-"):
+                    self.mismatch(f"{plant_id} / {trait}: pivot has {flag!r}")
+        if not self.mismatches:
+            self.stdout.write(f"  first {min(SAMPLE_PLANTS, len(rows))} plants identical to per-cell lookups")
+
+        parts = report_parts(rows)
+        html_ms, html = timed(lambda: report_html(traits, parts[0], 1, len(parts)))
+        self.stdout.write(f"  {len(parts)} file(s); part 1 HTML {len(html) / 1024:.0f} KiB in {html_ms:.0f} ms")
+        if pdf:
+            pdf_ms, document = timed(lambda: render_report(traits, parts[0], 1, len(parts)))
+            self.stdout.write(f"  part 1 PDF {len(document) / 1024:.0f} KiB in {pdf_ms:.0f} ms")
@@ -0,0 +1,45 @@
+"""
+dashboard.management.commands.ingest_trait_csv
+
+Bulk-load a wide trait sheet (same layout as the dashboard upload) from disk:
+    python manage.py ingest_trait_csv sheet.csv --batch-size 5000
+
+Prints rows, stored values, throughput and peak memory when done.
+"""
+
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.ingest import DEFAULT_BATCH_SIZE, ingest_trait_csv
+
+
+class Command(BaseCommand):
+    help = "Stream a wide trait CSV (plant_id + one column per trait) into PlantTraitData."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=str, help="Path to the trait sheet CSV")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f"Rows per bulk INSERT (default {DEFAULT_BATCH_SIZE})")
+        parser.add_argument("--user", type=str, help="Username recorded as uploaded_by")
+
+    def handle(self, *args, **opts):
+        path = Path(opts["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+
+        user = None
+        if opts.get("user"):
+            user = User.objects.filter(username=opts["user"]).first()
+            if user is None:
+                raise CommandError(f"Unknown user '{opts['user']}'")
+
+        with path.open(newline="", encoding="utf-8-sig") as fh:
+            stats = ingest_trait_csv(fh, user=user, batch_size=opts["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['cells']} values from {stats['rows']} rows × {len(stats['trait_fields'])} traits "
+            f"in {stats['seconds']}s ({stats['cells_per_sec']} values/sec, "
+            f"peak memory {stats['peak_memory_mb']} MB)"
+        ))
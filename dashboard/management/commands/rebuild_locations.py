@@ -0,0 +1,22 @@
+"""
+dashboard.management.commands.rebuild_locations
+
+Recompute every Location (centroid, bounding box, plot count) from FieldPlot:
+    python manage.py rebuild_locations
+
+Plot saves keep the locations they touch up to date, but raw writes do not
+(loaddata, SQL imports, queryset .update() on FieldPlot.location); run this
+after them.
+"""
+
+from django.core.management.base import BaseCommand
+
+from dashboard.location_index import rebuild_locations
+
+
+class Command(BaseCommand):
+    help = "Recompute every Location from the FieldPlots sharing its name."
+
+    def handle(self, *args, **opts):
+        refreshed = rebuild_locations()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {refreshed} location(s)."))
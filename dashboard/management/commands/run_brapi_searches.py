@@ -0,0 +1,54 @@
+"""
+dashboard.management.commands.run_brapi_searches
+
+Run queued BrAPI searches outside the web process and expire old results:
+    python manage.py run_brapi_searches --poll 5 --max-age 24
+
+Use it with BRAPI_SEARCH_WORKERS = 0 to keep searches off the web workers
+entirely, or from cron to pick up searches left pending or running by a
+restart (running ones once BRAPI_SEARCH_TIMEOUT has passed).
+"""
+
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.brapi_search import recover_stale_searches, run_search
+from dashboard.models import SearchRequest
+
+
+class Command(BaseCommand):
+    help = "Run pending BrAPI searches and delete stored results older than --max-age hours."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", type=float, help="Keep running, checking for new searches every N seconds")
+        parser.add_argument("--max-age", type=float, default=24, help="Delete searches older than this many hours")
+
+    def handle(self, *args, **opts):
+        while True:
+            self.expire(opts["max_age"])
+            ran = self.run_pending()
+            if ran:
+                self.stdout.write(f"Ran {ran} search(es).")
+            if not opts["poll"]:
+                break
+            time.sleep(opts["poll"])
+
+    def expire(self, max_age):
+        cutoff = timezone.now() - datetime.timedelta(hours=max_age)
+        deleted, _ = SearchRequest.objects.filter(created_on__lt=cutoff).delete()
+        if deleted:
+            self.stdout.write(f"Deleted {deleted} expired search(es).")
+
+    def run_pending(self):
+        recovered = recover_stale_searches(queue=False)
+        if recovered:
+            self.stdout.write(f"Recovered {recovered} stale search(es).")
+        pending = SearchRequest.objects.filter(status=SearchRequest.PENDING).order_by('created_on')
+        ran = 0
+        for pk in pending.values_list('pk', flat=True):
+            run_search(pk)
+            ran += 1
+        return ran
@@ -0,0 +1,48 @@
+"""
+dashboard.management.commands.run_pdf_jobs
+
+Render queued PDF reports outside the web process and expire old ones:
+    python manage.py run_pdf_jobs --poll 5 --max-age 168
+
+Use it with PDF_WORKERS = 0 to keep rendering off the web workers entirely,
+or from cron to pick up jobs left pending or running by a restart (once
+PDF_JOB_TIMEOUT has passed).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.models import PdfJob
+from dashboard.pdf_jobs import expire_jobs, recover_stale_jobs, run_pdf_job
+
+
+class Command(BaseCommand):
+    help = "Render pending PDF jobs and delete jobs and cached files older than --max-age hours."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll", type=float, help="Keep running, checking for new jobs every N seconds")
+        parser.add_argument("--max-age", type=float, default=168, help="Delete jobs older than this many hours")
+
+    def handle(self, *args, **opts):
+        while True:
+            deleted = expire_jobs(opts["max_age"])
+            if deleted:
+                self.stdout.write(f"Deleted {deleted} expired PDF job(s).")
+            ran = self.run_pending()
+            if ran:
+                self.stdout.write(f"Rendered {ran} PDF job(s).")
+            if not opts["poll"]:
+                break
+            time.sleep(opts["poll"])
+
+    def run_pending(self):
+        recovered = recover_stale_jobs(queue=False)
+        if recovered:
+            self.stdout.write(f"Recovered {recovered} stale PDF job(s).")
+        pending = PdfJob.objects.filter(status=PdfJob.PENDING).order_by('created_on')
+        ran = 0
+        for pk in pending.values_list('pk', flat=True):
+            run_pdf_job(pk)
+            ran += 1
+        return ran
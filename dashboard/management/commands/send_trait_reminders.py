@@ -1,44 +1,93 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models.functions import Mod
 from dashboard.models import TraitSchedule, FieldPlot, PlantTraitData, TraitTimeline
+from dashboard.timeline_sync import build_desired_timelines, sync_trait_timelines
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date
+from multiprocessing import get_all_start_methods, get_context
+
+
+def scoped_plots(trial=None, since=None, shard=None, workers=1):
+    """Plots with a planting date, optionally limited to a trial, a planting date and a pk shard."""
+    plots = FieldPlot.objects.exclude(planting_date__isnull=True)
+    if trial:
+        plots = plots.filter(trial__trialDbId=trial)
+    if since:
+        plots = plots.filter(planting_date__gte=since)
+    if shard is not None:
+        plots = plots.annotate(shard=Mod('id', workers)).filter(shard=shard)
+    return plots
+
+
+def observed_pairs(traits, plots):
+    """(plant_id, trait) pairs of ``plots`` that have at least one PlantTraitData row, in one query."""
+    return set(
+        PlantTraitData.objects
+        .filter(trait__in=traits, plant_id__in=plots.values('plant_id'))
+        .values_list('plant_id', 'trait')
+        .distinct()
+    )
+
+
+def compute_flags(trait_schedule, today, **scope):
+    """Desired timeline map for the plots selected by ``scope``; also the worker entry point."""
+    plots = scoped_plots(**scope)
+    plot_rows = list(plots.values_list('plant_id', 'planting_date'))
+    observed = observed_pairs(list(trait_schedule), plots)
+    return build_desired_timelines(plot_rows, trait_schedule, observed, today)
+
+
+def compute_shard(args):
+    trait_schedule, today, scope = args
+    desired = compute_flags(trait_schedule, today, **scope)
+    connections.close_all()
+    return desired
+
 
 class Command(BaseCommand):
     help = 'Sends trait data entry reminders by updating TraitTimeline entries'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--trial', type=str, help='Only plots in this trial (trialDbId)')
+        parser.add_argument('--since', type=str, help='Only plots planted on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, default=1, help='Shard plots across N processes')
+
+    def handle(self, *args, **opts):
         today = timezone.now().date()
         trait_schedule = {t.trait: t.days_after_planting for t in TraitSchedule.objects.all()}
-        trait_fields = list(trait_schedule.keys())
-        
+
+        since = None
+        if opts.get('since'):
+            since = parse_date(opts['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since date: {opts['since']}")
+        scope = {'trial': opts.get('trial'), 'since': since}
+
+        workers = max(opts.get('workers') or 1, 1)
+        if workers > 1 and 'fork' not in get_all_start_methods():
+            raise CommandError("--workers needs a platform that supports fork()")
+
         self.stdout.write("Updating trait timelines...")
-        TraitTimeline.objects.all().delete()
-
-        for plot in FieldPlot.objects.all():
-            if not plot.planting_date:
-                continue
-            for trait in trait_fields:
-                due_day = trait_schedule.get(trait)
-                if due_day is None:
-                    continue
-                expected_date = plot.planting_date + timedelta(days=due_day)
-
-                flag = '🕓'  # Default
-                if PlantTraitData.objects.filter(plant_id=plot.plant_id, trait=trait).exists():
-                    flag = '✔️'
-                elif today >= expected_date:
-                    flag = '❌'
-                elif (expected_date - today).days <= 3:
-                    flag = '⏳'
-
-                TraitTimeline.objects.update_or_create(
-                    plant_id=plot.plant_id,
-                    trait=trait,
-                    defaults={
-                        'expected_date': expected_date,
-                        'status_flag': flag,
-                        'entered_by': None  # Can customize if needed
-                    }
-                )
+        if workers == 1:
+            desired = compute_flags(trait_schedule, today, **scope)
+        else:
+            shards = [(trait_schedule, today, dict(scope, shard=i, workers=workers)) for i in range(workers)]
+            # Children must open their own DB connections
+            connections.close_all()
+            desired = {}
+            with get_context('fork').Pool(workers) as pool:
+                for part in pool.imap_unordered(compute_shard, shards):
+                    desired.update(part)
 
+        # A scoped run must not prune timelines belonging to plots outside the scope
+        timeline_scope = None
+        if scope['trial'] or scope['since']:
+            timeline_scope = TraitTimeline.objects.filter(plant_id__in=scoped_plots(**scope).values('plant_id'))
+        counts = sync_trait_timelines(desired, scope=timeline_scope)
+        self.stdout.write(
+            f"{len(desired)} plant × trait pairs: "
+            f"{counts['created']} created, {counts['updated']} updated, "
+            f"{counts['deleted']} removed, {counts['unchanged']} unchanged."
+        )
         self.stdout.write(self.style.SUCCESS("Trait reminders updated successfully."))
@@ -0,0 +1,151 @@
+"""
+dashboard.matrix_store
+
+Server-side storage for uploaded trait sheets and their status flags.
+
+Each upload becomes a TraitMatrix keyed by ``upload_id``; its rows are stored
+as TraitMatrixRow records holding the raw values as a list aligned with the
+headers and the flags as a string of one-letter codes. Sessions only keep the
+upload id, so a sheet survives logout and can be opened by other users with
+``?upload=<upload_id>``.
+"""
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+
+from .models import TraitMatrix, TraitMatrixRow
+
+SESSION_KEY = 'trait_matrix_id'
+ROW_BATCH_SIZE = 2000
+
+FLAG_CODES = {'✔️': 'C', '⏳': 'D', '❌': 'O', '🕓': 'E'}
+CODE_FLAGS = {code: flag for flag, code in FLAG_CODES.items()}
+
+
+def encode_flags(flags, trait_fields):
+    return ''.join(FLAG_CODES.get(flags.get(trait), 'E') for trait in trait_fields)
+
+
+def decode_flags(codes, trait_fields):
+    return {trait: CODE_FLAGS.get(code, '🕓') for trait, code in zip(trait_fields, codes)}
+
+
+class TraitMatrixWriter:
+    """
+    Buffers sheet rows and writes them with bulk_create in bounded batches.
+
+    The columns come from the sheet's header row (``headers``, or set_headers()
+    once it is read), not from any data row, which may be short. The
+    TraitMatrix record is created with the first row, so it is written
+    inside whatever transaction the caller is streaming the sheet in.
+    """
+
+    def __init__(self, user=None, headers=None, batch_size=ROW_BATCH_SIZE):
+        self.user = user
+        self.headers = headers
+        self.batch_size = batch_size
+        self.matrix = None
+        self.position = 0
+        self.batch = []
+
+    def set_headers(self, headers):
+        self.headers = list(headers)
+
+    def add(self, entry, flags, trait_fields):
+        if self.matrix is None:
+            if self.headers is None:
+                raise ValueError("The sheet's headers must be set before its rows are added")
+            self.matrix = TraitMatrix.objects.create(
+                headers=self.headers,
+                trait_fields=list(trait_fields),
+                uploaded_by=self.user,
+            )
+        self.batch.append(TraitMatrixRow(
+            matrix=self.matrix,
+            position=self.position,
+            plant_id=entry.get('plant_id') or '',
+            values=[entry.get(h, '') for h in self.matrix.headers],
+            flags=encode_flags(flags, self.matrix.trait_fields),
+        ))
+        self.position += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            TraitMatrixRow.objects.bulk_create(self.batch, batch_size=self.batch_size)
+            self.batch = []
+
+    def close(self):
+        """Write any buffered rows and return the finished TraitMatrix (None if the sheet was empty)."""
+        self.flush()
+        if self.matrix is not None:
+            self.matrix.row_count = self.position
+            self.matrix.save(update_fields=['row_count'])
+        return self.matrix
+
+
+def remember_matrix(request, matrix):
+    request.session[SESSION_KEY] = str(matrix.upload_id)
+    # Sessions from before the matrix store carried the whole sheet
+    request.session.pop('cached_data', None)
+    request.session.pop('cached_trait_flags', None)
+
+
+def resolve_matrix(request, upload_id=None):
+    """
+    The trait sheet a request refers to: an explicit upload id (argument or
+    ``?upload=``), else the one remembered in the session, else None.
+
+    Never another sheet: an explicit id that matches no sheet raises
+    Http404, and a stale session id is forgotten.
+    """
+    upload_id = upload_id or request.GET.get('upload')
+    if upload_id:
+        try:
+            return TraitMatrix.objects.get(upload_id=upload_id)
+        except (TraitMatrix.DoesNotExist, ValidationError):
+            raise Http404(f"No uploaded trait sheet {upload_id}")
+    remembered = request.session.get(SESSION_KEY)
+    if remembered:
+        try:
+            return TraitMatrix.objects.get(upload_id=remembered)
+        except (TraitMatrix.DoesNotExist, ValidationError):
+            request.session.pop(SESSION_KEY, None)
+    return None
+
+
+def iter_matrix_rows(matrix, chunk_size=ROW_BATCH_SIZE):
+    """Lazily yield (plant_id, entry, flags) for every row, in upload order."""
+    headers, trait_fields = matrix.headers, matrix.trait_fields
+    rows = (
+        TraitMatrixRow.objects
+        .filter(matrix=matrix)
+        .order_by('position')
+        .values_list('plant_id', 'values', 'flags')
+    )
+    for plant_id, values, codes in rows.iterator(chunk_size=chunk_size):
+        yield plant_id, dict(zip(headers, values)), decode_flags(codes, trait_fields)
+
+
+def matrix_flags(matrix):
+    """{plant_id: {trait: flag}} for the whole sheet."""
+    return {plant_id: flags for plant_id, _, flags in iter_matrix_rows(matrix)}
+
+
+def update_matrix_value(matrix, plant_id, trait, value):
+    """Set one cell (and mark it completed when non-empty). Returns the number of rows touched."""
+    if trait not in matrix.headers:
+        return 0
+    value_index = matrix.headers.index(trait)
+    flag_index = matrix.trait_fields.index(trait) if trait in matrix.trait_fields else None
+
+    rows = list(TraitMatrixRow.objects.filter(matrix=matrix, plant_id=plant_id))
+    for row in rows:
+        row.values[value_index] = value
+        if flag_index is not None and value:
+            codes = list(row.flags)
+            codes[flag_index] = FLAG_CODES['✔️']
+            row.flags = ''.join(codes)
+    TraitMatrixRow.objects.bulk_update(rows, ['values', 'flags'])
+    return len(rows)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_observationvariable'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='planttraitdata',
+            index=models.Index(fields=['plant_id', 'trait', '-timestamp'], name='ptd_plant_trait_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='planttraitdata',
+            index=models.Index(fields=['trait', 'plant_id'], name='ptd_trait_plant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='planttraitdata',
+            index=models.Index(fields=['timestamp'], name='ptd_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traittimeline',
+            index=models.Index(fields=['plant_id', 'trait'], name='timeline_plant_trait_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traittimeline',
+            index=models.Index(fields=['expected_date', 'status_flag'], name='timeline_due_status_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:47
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_trait_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraitMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('headers', models.JSONField(default=list)),
+                ('trait_fields', models.JSONField(default=list)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TraitMatrixRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('plant_id', models.CharField(blank=True, max_length=100)),
+                ('values', models.JSONField(default=list)),
+                ('flags', models.TextField(blank=True)),
+                ('matrix', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='dashboard.traitmatrix')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['matrix', 'position'], name='matrix_row_position_idx'), models.Index(fields=['matrix', 'plant_id'], name='matrix_row_plant_idx')],
+            },
+        ),
+    ]
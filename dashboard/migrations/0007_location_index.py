@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:58
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Max, Min
+
+
+def build_location_index(apps, schema_editor):
+    # Same aggregate as dashboard.location_index.location_stats(), on the historical models
+    FieldPlot = apps.get_model('dashboard', 'FieldPlot')
+    Location = apps.get_model('dashboard', 'Location')
+    rows = (
+        FieldPlot.objects.exclude(location__isnull=True).exclude(location='')
+        .values_list('location').order_by('location')
+        .annotate(Count('id'), Avg('latitude'), Avg('longitude'),
+                  Min('latitude'), Max('latitude'), Min('longitude'), Max('longitude'))
+    )
+    Location.objects.bulk_create([
+        Location(locationName=name, plot_count=count, latitude=latitude, longitude=longitude,
+                 min_latitude=min_latitude, max_latitude=max_latitude,
+                 min_longitude=min_longitude, max_longitude=max_longitude)
+        for name, count, latitude, longitude, min_latitude, max_latitude, min_longitude, max_longitude in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Location',
+            fields=[
+                ('locationDbId', models.AutoField(primary_key=True, serialize=False)),
+                ('locationName', models.CharField(max_length=255, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('min_latitude', models.FloatField(blank=True, null=True)),
+                ('max_latitude', models.FloatField(blank=True, null=True)),
+                ('min_longitude', models.FloatField(blank=True, null=True)),
+                ('max_longitude', models.FloatField(blank=True, null=True)),
+                ('plot_count', models.PositiveIntegerField(default=0)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='fieldplot',
+            index=models.Index(fields=['location'], name='fieldplot_location_idx'),
+        ),
+        migrations.RunPython(build_location_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_search_request'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fieldplot',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='sample',
+            name='updated_on',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='fieldplot',
+            index=models.Index(fields=['updated_on'], name='fieldplot_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sample',
+            index=models.Index(fields=['updated_on'], name='sample_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sample',
+            index=models.Index(fields=['sampleTimestamp'], name='sample_timestamp_idx'),
+        ),
+    ]
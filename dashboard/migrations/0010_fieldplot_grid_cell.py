@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:09
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_modification_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fieldplot',
+            name='grid_cell',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('latitude'), '+', models.Value(90)), '*', models.Value(1000))), '*', models.Value(360000)), '+', django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('longitude'), '+', models.Value(180)), '*', models.Value(1000)))), models.BigIntegerField()), output_field=models.BigIntegerField()),
+        ),
+        migrations.AddIndex(
+            model_name='fieldplot',
+            index=models.Index(fields=['grid_cell'], name='fieldplot_grid_cell_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_pdfjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchrequest',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='searchrequest',
+            name='started_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_search_request_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='pdfjob',
+            name='queued_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pdfjob',
+            name='started_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
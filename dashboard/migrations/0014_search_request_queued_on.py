@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_pdfjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchrequest',
+            name='queued_on',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,13 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Cast, Floor
 from django.contrib.auth.models import User
 
+# FieldPlot.grid_cell resolution (1000 per degree: cells of about 110 m)
+GRID_CELLS_PER_DEGREE = 1000
+GRID_COLUMNS = 360 * GRID_CELLS_PER_DEGREE
+
 
 class TraitTimeline(models.Model):
     plant_id = models.CharField(max_length=100)
@@ -23,6 +30,12 @@ class TraitTimeline(models.Model):
     updated_on = models.DateTimeField(auto_now=True)
     entered_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['plant_id', 'trait'], name='timeline_plant_trait_idx'),
+            models.Index(fields=['expected_date', 'status_flag'], name='timeline_due_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.trait} for {self.plant_id} ({self.status_flag})"
 
@@ -57,6 +70,13 @@ class Sample(models.Model):
     sampleType = models.CharField(max_length=100, default="Tissue")
     takenBy = models.CharField(max_length=100, null=True, blank=True)
     sampleTimestamp = models.DateTimeField(null=True, blank=True)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_on'], name='sample_updated_idx'),
+            models.Index(fields=['sampleTimestamp'], name='sample_timestamp_idx'),
+        ]
 
     def __str__(self):
         return self.sampleName
@@ -99,10 +119,137 @@ class PlantTraitData(models.Model):
         null=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['plant_id', 'trait', '-timestamp'], name='ptd_plant_trait_ts_idx'),
+            models.Index(fields=['trait', 'plant_id'], name='ptd_trait_plant_idx'),
+            models.Index(fields=['timestamp'], name='ptd_timestamp_idx'),
+        ]
+
     def __str__(self):
         return f"{self.plant_id} - {self.trait}: {self.value}"
 
 
+class TraitMatrix(models.Model):
+    """One uploaded trait sheet; rows live in TraitMatrixRow (see dashboard.matrix_store)."""
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    headers = models.JSONField(default=list)
+    trait_fields = models.JSONField(default=list)
+    row_count = models.PositiveIntegerField(default=0)
+    uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Trait sheet {self.upload_id} ({self.row_count} rows)"
+
+
+class TraitMatrixRow(models.Model):
+    matrix = models.ForeignKey(TraitMatrix, on_delete=models.CASCADE, related_name='rows')
+    position = models.PositiveIntegerField()
+    plant_id = models.CharField(max_length=100, blank=True)
+    values = models.JSONField(default=list)  # aligned with TraitMatrix.headers
+    flags = models.TextField(blank=True)      # one status code per TraitMatrix.trait_fields
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['matrix', 'position'], name='matrix_row_position_idx'),
+            models.Index(fields=['matrix', 'plant_id'], name='matrix_row_plant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.plant_id} (row {self.position})"
+
+
+class DataVersion(models.Model):
+    """Write counter per model; feeds BrAPI ETags and response cache keys (see dashboard.brapi_cache)."""
+    model_label = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model_label} v{self.version}"
+
+
+class SearchRequest(models.Model):
+    """
+    A BrAPI POST /search/{entity} request and, once run, its result set
+    (see dashboard.brapi_search). Matching primary keys are stored packed in
+    ``result_ids`` and paged on GET /search/{entity}/{searchResultsDbId}.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    searchResultsDbId = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    entity = models.CharField(max_length=50)
+    parameters = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    result_ids = models.BinaryField(null=True, blank=True)
+    result_count = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    queued_on = models.DateTimeField(null=True, blank=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    completed_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_on'], name='search_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} search {self.searchResultsDbId} ({self.status})"
+
+
+class PdfJob(models.Model):
+    """
+    A PDF (or ZIP of PDFs) rendered in the background (see
+    dashboard.pdf_jobs). ``inputs`` holds the report's parameters and the
+    data versions they were requested at; ``key`` is the SHA-256 of the
+    kind and inputs, and names the rendered file in the PDF cache
+    directory, so an unchanged report is served from disk without rendering.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=30)
+    inputs = models.JSONField(default=dict)
+    filename = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_on = models.DateTimeField(auto_now_add=True)
+    queued_on = models.DateTimeField(null=True, blank=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    completed_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_on'], name='pdfjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} PDF {self.key[:12]} ({self.status})"
+
+
 class Germplasm(models.Model):
     germplasmDbId = models.CharField(max_length=50, unique=True)
     germplasmName = models.CharField(max_length=100)
@@ -138,11 +285,50 @@ class FieldPlot(models.Model):
     planting_date = models.DateField(null=True, blank=True)
     location = models.CharField(max_length=255, null=True, blank=True)
     trial = models.ForeignKey(Trial, on_delete=models.CASCADE, null=True, blank=True)
+    updated_on = models.DateTimeField(auto_now=True)
+    # Row-major cell of a fixed lat/lon grid, computed by the database; see dashboard.spatial
+    grid_cell = models.GeneratedField(
+        expression=Cast(
+            Floor((models.F('latitude') + 90) * GRID_CELLS_PER_DEGREE) * GRID_COLUMNS
+            + Floor((models.F('longitude') + 180) * GRID_CELLS_PER_DEGREE),
+            models.BigIntegerField(),
+        ),
+        output_field=models.BigIntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['location'], name='fieldplot_location_idx'),
+            models.Index(fields=['updated_on'], name='fieldplot_updated_idx'),
+            models.Index(fields=['grid_cell'], name='fieldplot_grid_cell_idx'),
+        ]
 
     def __str__(self):
         return f"{self.plant_id} ({self.status})"
 
 
+class Location(models.Model):
+    """
+    One row per distinct FieldPlot.location, maintained by
+    dashboard.location_index. Rows are kept (with plot_count 0) when their
+    last plot goes, so a locationDbId never changes meaning.
+    """
+    locationDbId = models.AutoField(primary_key=True)
+    locationName = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    min_latitude = models.FloatField(null=True, blank=True)
+    max_latitude = models.FloatField(null=True, blank=True)
+    min_longitude = models.FloatField(null=True, blank=True)
+    max_longitude = models.FloatField(null=True, blank=True)
+    plot_count = models.PositiveIntegerField(default=0)
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.locationName} ({self.plot_count} plots)"
+
+
 class PlantData(models.Model):
     plant_id = models.CharField(max_length=100, unique=True)
     planting_date = models.DateField(null=True, blank=True)
@@ -0,0 +1,40 @@
+"""
+dashboard.parsers
+
+Request parsers for the BrAPI endpoints.
+"""
+
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+DEFAULT_MAX_DECOMPRESSED_BYTES = 100 * 1024 * 1024
+
+
+class GzipJSONParser(JSONParser):
+    """
+    JSON parser that also accepts ``Content-Encoding: gzip`` bodies, so field
+    devices can compress large observation syncs. The inflated body is capped
+    at BRAPI_MAX_DECOMPRESSED_BYTES.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context.get('request')
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').lower() if request is not None else ''
+        if encoding == 'gzip' and stream is not None:
+            limit = getattr(settings, 'BRAPI_MAX_DECOMPRESSED_BYTES', DEFAULT_MAX_DECOMPRESSED_BYTES)
+            try:
+                body = gzip.GzipFile(fileobj=stream).read(limit + 1)
+            except (OSError, EOFError, zlib.error) as exc:
+                raise ParseError(f'Invalid gzip body - {exc}')
+            if len(body) > limit:
+                raise ParseError('Decompressed body is too large')
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        if encoding not in ('', 'identity'):
+            raise ParseError(f'Unsupported Content-Encoding: {encoding}')
+        return super().parse(stream, media_type, parser_context)
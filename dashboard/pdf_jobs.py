@@ -0,0 +1,241 @@
+"""
+dashboard.pdf_jobs
+
+PDF reports rendered in the background and cached on disk by content.
+
+A view gathers a report's inputs, its parameters plus the DataVersion
+counters of the models it reads (see dashboard.brapi_cache), and calls
+request_pdf(kind, inputs, filename). The SHA-256 of the kind and inputs is
+the job key and the name of the rendered file under PDF_CACHE_DIR, so an
+unchanged report is found on disk and served at once; anything else
+becomes a PdfJob that a worker renders while the browser polls its status
+page. Only the renderer reads the report's data.
+
+Jobs run on a small in-process thread pool (PDF_WORKERS, default 1). With
+PDF_WORKERS = 0 they are left pending for the run_pdf_jobs command. A job
+queued or running for longer than PDF_JOB_TIMEOUT seconds is taken to have
+lost its worker (e.g. to a restart) and is queued again; one that has been
+running MAX_ATTEMPTS times is failed.
+Bump PDF_CACHE_VERSION when a report template changes, so that files
+rendered from the old template are not served again.
+"""
+
+import datetime
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.datastructures import MultiValueDict
+from weasyprint import HTML
+from xhtml2pdf import pisa
+
+from .models import PdfJob, PlantTraitData
+from .pivot import pivot_timeline_flags
+from .reminders import filter_reminders, reminder_context, with_reminder_status
+from .trait_report import render_report, render_report_zip, report_parts, report_timelines
+
+PDF_CACHE_VERSION = 1
+DEFAULT_WORKERS = 1
+DEFAULT_TIMEOUT = 1800
+MAX_ATTEMPTS = 2
+
+
+def cache_dir():
+    return getattr(settings, 'PDF_CACHE_DIR', os.path.join(settings.MEDIA_ROOT, 'pdf_cache'))
+
+
+def job_key(kind, inputs):
+    payload = json.dumps([PDF_CACHE_VERSION, kind, inputs], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_trait_reminders(inputs):
+    # Statuses as of the day the report was requested, which is part of its key
+    timelines = with_reminder_status(today=parse_date(inputs['today']))
+    context = reminder_context(filter_reminders(timelines, MultiValueDict(inputs['params'])))
+    return HTML(string=render_to_string('dashboard/trait_reminder_pdf.html', context)).write_pdf()
+
+
+def render_trait_status(inputs):
+    data = PlantTraitData.objects.order_by('plant_id', 'trait', 'id').values(
+        'plant_id', 'trait', 'value', 'status_flag', 'timestamp')
+    return HTML(string=render_to_string('dashboard/trait_status_pdf.html', {'data': data})).write_pdf()
+
+
+def trait_report_parts(inputs):
+    traits, rows = pivot_timeline_flags(report_timelines(inputs['trial']))
+    return traits, report_parts(rows, inputs['plants_per_file'])
+
+
+def render_trait_report(inputs):
+    traits, parts = trait_report_parts(inputs)
+    return render_report(traits, parts[inputs['part'] - 1], inputs['part'], len(parts))
+
+
+def render_trait_report_zip(inputs):
+    return render_report_zip(*trait_report_parts(inputs))
+
+
+def render_plant_snapshot(inputs):
+    records = (
+        PlantTraitData.objects
+        .filter(plant_id=inputs['plant_id'])
+        .order_by('trait', '-timestamp')
+        .values_list('trait', 'value', 'timestamp', 'uploaded_by__username')
+    )
+    grouped = {}
+    for trait, value, timestamp, username in records:
+        grouped.setdefault(trait, []).append({
+            "value": value,
+            "timestamp": timestamp.strftime('%Y-%m-%d %H:%M'),
+            "user": username or "unknown"
+        })
+    context = {"plant_id": inputs['plant_id'], "grouped_traits": grouped, "now": timezone.now()}
+    html = render_to_string('dashboard/plant_snapshot_pdf.html', context)
+    output = io.BytesIO()
+    pisa.CreatePDF(io.StringIO(html), dest=output)
+    return output.getvalue()
+
+
+# kind -> (renderer, file extension, content type)
+RENDERERS = {
+    'trait_reminders': (render_trait_reminders, '.pdf', 'application/pdf'),
+    'trait_status': (render_trait_status, '.pdf', 'application/pdf'),
+    'trait_report': (render_trait_report, '.pdf', 'application/pdf'),
+    'trait_report_zip': (render_trait_report_zip, '.zip', 'application/zip'),
+    'plant_snapshot': (render_plant_snapshot, '.pdf', 'application/pdf'),
+}
+
+
+def job_path(job):
+    """Where the rendered file of ``job`` is (or will be) stored."""
+    extension = RENDERERS[job.kind][1]
+    return os.path.join(cache_dir(), job.key[:2], job.key + extension)
+
+
+def content_type(job):
+    return RENDERERS[job.kind][2]
+
+
+_executor = None
+
+
+def pdf_workers():
+    return getattr(settings, 'PDF_WORKERS', DEFAULT_WORKERS)
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=pdf_workers(), thread_name_prefix='pdf-jobs')
+    return _executor
+
+
+def request_pdf(kind, inputs, filename, user=None):
+    """
+    The PdfJob for this report, DONE at once when its file is already on
+    disk, else queued (again, if an earlier attempt failed).
+    """
+    key = job_key(kind, inputs)
+    job, created = PdfJob.objects.get_or_create(
+        key=key, defaults={'kind': kind, 'inputs': inputs, 'filename': filename, 'requested_by': user})
+    if os.path.exists(job_path(job)):
+        if job.status != PdfJob.DONE:
+            PdfJob.objects.filter(pk=job.pk).update(status=PdfJob.DONE, error='', completed_on=timezone.now())
+            job.status = PdfJob.DONE
+        return job
+    if not created and job.status in (PdfJob.PENDING, PdfJob.RUNNING):
+        if recover_stale_jobs(PdfJob.objects.filter(pk=job.pk)):
+            job.refresh_from_db()
+        return job
+
+    PdfJob.objects.filter(pk=job.pk).update(
+        status=PdfJob.PENDING, error='', queued_on=timezone.now(), started_on=None, attempts=0, completed_on=None)
+    job.status = PdfJob.PENDING
+    if pdf_workers():
+        queue_job(job.pk)
+    return job
+
+
+def queue_job(pk):
+    transaction.on_commit(lambda: executor().submit(run_pdf_job_in_thread, pk))
+
+
+def recover_stale_jobs(jobs=None, queue=True):
+    """
+    Jobs of ``jobs`` (default: all) whose worker must have stopped: PENDING
+    or RUNNING since longer than PDF_JOB_TIMEOUT seconds. They are queued
+    again (submitted to this process's workers when ``queue``), or FAILED
+    once they have been running MAX_ATTEMPTS times. Returns how many were
+    recovered.
+    """
+    jobs = PdfJob.objects.all() if jobs is None else jobs
+    now = timezone.now()
+    cutoff = now - datetime.timedelta(seconds=getattr(settings, 'PDF_JOB_TIMEOUT', DEFAULT_TIMEOUT))
+    stale_running = jobs.filter(status=PdfJob.RUNNING, started_on__lt=cutoff)
+    recovered = stale_running.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=PdfJob.FAILED, error="The PDF worker stopped before finishing", completed_on=now)
+    requeued = stale_running.update(status=PdfJob.PENDING, started_on=None, queued_on=now)
+    # Pending jobs queued on a pool that has since gone away
+    requeued += jobs.filter(status=PdfJob.PENDING, queued_on__lt=cutoff).update(queued_on=now)
+    if requeued and queue and pdf_workers():
+        for pk in jobs.filter(status=PdfJob.PENDING, queued_on=now).values_list('pk', flat=True):
+            queue_job(pk)
+    return recovered + requeued
+
+
+def write_atomically(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def run_pdf_job(pk):
+    """Render a pending PdfJob into the cache (no-op if another worker claimed it)."""
+    if not PdfJob.objects.filter(pk=pk, status=PdfJob.PENDING).update(
+            status=PdfJob.RUNNING, started_on=timezone.now(), attempts=F('attempts') + 1):
+        return
+    job = PdfJob.objects.get(pk=pk)
+    try:
+        renderer = RENDERERS[job.kind][0]
+        write_atomically(job_path(job), renderer(job.inputs))
+    except Exception as exc:
+        PdfJob.objects.filter(pk=pk).update(status=PdfJob.FAILED, error=str(exc), completed_on=timezone.now())
+        return
+    PdfJob.objects.filter(pk=pk).update(status=PdfJob.DONE, completed_on=timezone.now())
+
+
+def run_pdf_job_in_thread(pk):
+    close_old_connections()
+    try:
+        run_pdf_job(pk)
+    finally:
+        connection.close()
+
+
+def expire_jobs(max_age_hours):
+    """Delete jobs and cached files older than ``max_age_hours``; returns the number of jobs deleted."""
+    cutoff = timezone.now() - datetime.timedelta(hours=max_age_hours)
+    expired = PdfJob.objects.filter(created_on__lt=cutoff).exclude(status=PdfJob.RUNNING)
+    for job in expired:
+        try:
+            os.remove(job_path(job))
+        except FileNotFoundError:
+            pass
+    deleted, _ = expired.delete()
+    return deleted
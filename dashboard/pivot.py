@@ -0,0 +1,64 @@
+"""
+dashboard.pivot
+
+Plot x trait matrices straight from PlantTraitData, pivoted in SQL.
+
+latest_observations() keeps the newest row per (plant_id, trait);
+pivot_traits() groups those by plant with one conditional aggregate per
+trait, so a whole matrix page is a single query however many traits it has.
+pivot_timeline_flags() does the same for TraitTimeline status flags from one
+ordered query, pivoted in memory.
+"""
+
+from django.db.models import Case, Max, When
+
+from .models import PlantTraitData
+
+
+def latest_observations(observations=None):
+    """The newest PlantTraitData row of every (plant_id, trait) pair in ``observations``."""
+    observations = PlantTraitData.objects.all() if observations is None else observations
+    newest = observations.order_by().values('plant_id', 'trait').annotate(newest=Max('id')).values('newest')
+    return PlantTraitData.objects.filter(id__in=newest)
+
+
+def trait_columns(traits):
+    """Column aliases for ``traits``; trait names are free text, so they are not used as SQL aliases."""
+    return [f"trait_{i}" for i in range(len(traits))]
+
+
+def pivot_traits(observations, traits):
+    """
+    One row per plant: plant_id, then the value of each of ``traits`` (None
+    when not observed). Returns a values_list queryset ordered by plant_id.
+    """
+    columns = trait_columns(traits)
+    pivot = {
+        column: Max(Case(When(trait=trait, then='value')))
+        for column, trait in zip(columns, traits)
+    }
+    rows = (
+        observations
+        .filter(trait__in=traits)
+        .order_by()
+        .values('plant_id')
+        .annotate(**pivot)
+        .order_by('plant_id')
+    )
+    return rows.values_list('plant_id', *columns)
+
+
+def pivot_timeline_flags(timelines):
+    """
+    (traits, rows) of the status flags in ``timelines`` (a TraitTimeline
+    queryset): the sorted trait names, and one (plant_id, [flag per trait,
+    "-" when missing]) per plant in plant_id order. Of several timelines for
+    the same plant and trait the oldest wins.
+    """
+    records = timelines.order_by('plant_id', 'trait', 'id').values_list('plant_id', 'trait', 'status_flag')
+    flags, traits = {}, set()
+    for plant_id, trait, flag in records:
+        flags.setdefault(plant_id, {}).setdefault(trait, flag)
+        traits.add(trait)
+    traits = sorted(traits)
+    return traits, [(plant_id, [row.get(trait, "-") for trait in traits]) for plant_id, row in flags.items()]
@@ -0,0 +1,136 @@
+"""
+dashboard.plot_map
+
+GeoJSON for the field map, restricted to what the map is showing.
+
+plot_features() reads only the plots inside the requested bounding box,
+through the grid index of dashboard.spatial. At low zoom, or when the box
+holds more than PLOT_MAP_MAX_POINTS plots, the plots are clustered on a
+screen-sized grid with one GROUP BY instead of being sent one by one.
+Otherwise each plot is a Point feature carrying the latest value of the
+requested traits, read with a single query filtered to those traits and the
+plots in the box.
+"""
+
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Floor
+
+from .models import FieldPlot, PlantTraitData, TraitSchedule
+from .pivot import latest_observations
+from .spatial import within_bbox
+
+DEFAULT_TRAITS = ('height', 'chlorophyll')
+DEFAULT_CLUSTER_ZOOM = 17
+DEFAULT_MAX_POINTS = 5000
+# Clusters are about this many pixels across on a 256 px web-map tile
+CLUSTER_CELL_PX = 48
+
+
+def parse_zoom(value):
+    """Web-map zoom level, or None; raises ValueError."""
+    if value in (None, ''):
+        return None
+    zoom = int(value)
+    if not 0 <= zoom <= 24:
+        raise ValueError("zoom must be between 0 and 24")
+    return zoom
+
+
+def plots_in(bbox):
+    if bbox is not None:
+        return within_bbox(bbox)
+    return FieldPlot.objects.filter(latitude__isnull=False, longitude__isnull=False)
+
+
+def trait_names(traits):
+    """The stored spellings of ``traits``, matched case-insensitively against TraitSchedule."""
+    wanted = {trait.lower() for trait in traits}
+    known = [name for name in TraitSchedule.objects.values_list('trait', flat=True) if name.lower() in wanted]
+    return set(traits) | set(known)
+
+
+def trait_values(plots, traits):
+    """{plant_id: {requested trait: latest value}} for ``plots``, in one query."""
+    by_name = {trait.lower(): trait for trait in traits}
+    observations = PlantTraitData.objects.filter(
+        trait__in=trait_names(traits), plant_id__in=plots.values('plant_id'))
+    values = defaultdict(dict)
+    for plant_id, trait, value in latest_observations(observations).values_list('plant_id', 'trait', 'value'):
+        values[plant_id][by_name.get(trait.lower(), trait)] = value
+    return values
+
+
+def point_features(plots, traits):
+    values = trait_values(plots, traits) if traits else {}
+    return [
+        {
+            "type": "Feature",
+            "id": plant_id,
+            "geometry": {"type": "Point", "coordinates": [longitude, latitude]},
+            "properties": {
+                "status": plot_status,
+                "traits": {trait: values.get(plant_id, {}).get(trait) for trait in traits},
+            },
+        }
+        for plant_id, latitude, longitude, plot_status
+        in plots.values_list('plant_id', 'latitude', 'longitude', 'status').order_by('pk')
+    ]
+
+
+def cluster_features(plots, zoom):
+    """One Point per occupied grid cell, at the mean position of its plots, with per-status counts."""
+    cell = 360 / 2 ** zoom * CLUSTER_CELL_PX / 256
+    rows = (
+        plots
+        .annotate(cell_x=Floor(F('longitude') / cell), cell_y=Floor(F('latitude') / cell))
+        .values_list('cell_x', 'cell_y', 'status')
+        .order_by()
+        .annotate(Count('id'), Sum('latitude'), Sum('longitude'))
+    )
+    cells = {}
+    for cell_x, cell_y, plot_status, count, latitude_sum, longitude_sum in rows:
+        totals = cells.setdefault((cell_x, cell_y), {"count": 0, "latitude": 0.0, "longitude": 0.0, "statuses": {}})
+        totals["count"] += count
+        totals["latitude"] += latitude_sum
+        totals["longitude"] += longitude_sum
+        totals["statuses"][plot_status] = count
+    return [
+        {
+            "type": "Feature",
+            "id": f"cluster:{int(cell_x)}:{int(cell_y)}",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [totals["longitude"] / totals["count"], totals["latitude"] / totals["count"]],
+            },
+            "properties": {"cluster": True, "count": totals["count"], "statuses": totals["statuses"]},
+        }
+        for (cell_x, cell_y), totals in sorted(cells.items())
+    ]
+
+
+def fitting_zoom(bbox):
+    """The zoom at which ``bbox`` spans about one tile, for requests that do not say."""
+    if bbox is None:
+        return 0
+    west, south, east, north = bbox
+    span = max(east - west, north - south)
+    return max(0, min(24, int(math.log2(360 / span)))) if span > 0 else 24
+
+
+def plot_features(bbox=None, zoom=None, traits=DEFAULT_TRAITS):
+    """A GeoJSON FeatureCollection of the plots in ``bbox`` (all plots when None)."""
+    plots = plots_in(bbox)
+    zoom = fitting_zoom(bbox) if zoom is None else zoom
+    max_points = getattr(settings, 'PLOT_MAP_MAX_POINTS', DEFAULT_MAX_POINTS)
+    clustered = (zoom < getattr(settings, 'PLOT_MAP_CLUSTER_ZOOM', DEFAULT_CLUSTER_ZOOM)
+                 or plots.count() > max_points)
+    return {
+        "type": "FeatureCollection",
+        "clustered": clustered,
+        "zoom": zoom,
+        "features": cluster_features(plots, zoom) if clustered else point_features(plots, list(traits)),
+    }
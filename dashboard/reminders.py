@@ -0,0 +1,142 @@
+"""
+dashboard.reminders
+
+Trait reminder status computed by the database.
+
+with_reminder_status() annotates TraitTimeline rows with the same label
+calculate_trait_reminder_status() gives, as a Case/When against today's
+date, so reminder lists can be filtered, ordered and counted in SQL:
+
+    with_reminder_status().filter(reminder_status=OVERDUE)
+    reminder_counts(timelines, 'trait')      {trait: {status: n, "total": n}}
+"""
+
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.utils import timezone
+
+from .models import FieldPlot, TraitTimeline
+
+OVERDUE = "❌ Overdue"
+DUE_SOON = "⏳ Due Soon"
+TOO_EARLY = "🕓 Too Early"
+COMPLETED = "✔️ Completed"
+REMINDER_STATUSES = (OVERDUE, DUE_SOON, TOO_EARLY, COMPLETED)
+
+# Short names accepted by ?status= filters
+STATUS_KEYS = {
+    "overdue": OVERDUE,
+    "due_soon": DUE_SOON,
+    "too_early": TOO_EARLY,
+    "completed": COMPLETED,
+}
+
+# Query parameters read by filter_reminders()
+FILTER_PARAMS = ("status", "trait", "plant_id", "trial")
+
+# Groupings of reminder_counts() -> the TraitTimeline field grouped on
+GROUP_FIELDS = {
+    "status": None,
+    "trait": "trait",
+    "plot": "plant_id",
+}
+
+
+def reminder_status(today=None):
+    """
+    The reminder status as a query expression: overdue or due soon while no
+    actual date is recorded, then too early or completed by comparing the
+    actual date with the expected one.
+    """
+    today = today or timezone.now().date()
+    return Case(
+        When(actual_date__isnull=True, expected_date__lt=today, then=Value(OVERDUE)),
+        When(actual_date__isnull=True, then=Value(DUE_SOON)),
+        When(actual_date__lt=F('expected_date'), then=Value(TOO_EARLY)),
+        default=Value(COMPLETED),
+        output_field=CharField(),
+    )
+
+
+def with_reminder_status(timelines=None, today=None):
+    """``timelines`` (default: all TraitTimeline rows) annotated with ``reminder_status``."""
+    timelines = TraitTimeline.objects.all() if timelines is None else timelines
+    return timelines.annotate(reminder_status=reminder_status(today))
+
+
+def parse_status(value):
+    """A REMINDER_STATUSES label from a label or a STATUS_KEYS name; raises ValueError."""
+    if value in REMINDER_STATUSES:
+        return value
+    try:
+        return STATUS_KEYS[value.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown status {value!r}; use one of {', '.join(STATUS_KEYS)}")
+
+
+def filter_reminders(timelines, params):
+    """
+    Narrow annotated ``timelines`` by request parameters: ``status``
+    (repeatable), ``trait``, ``plant_id`` and ``trial`` (Trial pk). Raises
+    ValueError on a bad value.
+    """
+    statuses = [parse_status(value) for value in params.getlist('status')]
+    if statuses:
+        timelines = timelines.filter(reminder_status__in=statuses)
+    if params.get('trait'):
+        timelines = timelines.filter(trait=params['trait'])
+    if params.get('plant_id'):
+        timelines = timelines.filter(plant_id=params['plant_id'])
+    trial = params.get('trial')
+    if trial:
+        if not trial.isdigit():
+            raise ValueError(f"Invalid trial: {trial}")
+        timelines = timelines.filter(plant_id__in=FieldPlot.objects.filter(trial_id=int(trial)).values('plant_id'))
+    return timelines
+
+
+def reminder_counts(timelines, group='status'):
+    """
+    Counts of annotated ``timelines`` per status in one GROUP BY query:
+    ``{status: n}`` for group "status", else ``{trait or plant_id: {status:
+    n, ..., "total": n}}``.
+    """
+    field = GROUP_FIELDS[group]
+    if field is None:
+        counts = dict.fromkeys(REMINDER_STATUSES, 0)
+        rows = timelines.order_by().values_list('reminder_status').annotate(count=Count('id'))
+        counts.update(rows)
+        return counts
+
+    grouped = {}
+    rows = timelines.order_by(field).values_list(field, 'reminder_status').annotate(count=Count('id'))
+    for key, status, count in rows:
+        counts = grouped.get(key)
+        if counts is None:
+            counts = grouped[key] = dict.fromkeys(REMINDER_STATUSES, 0) | {"total": 0}
+        counts[status] = count
+        counts["total"] += count
+    return grouped
+
+
+def reminder_context(timelines):
+    """Template context of the reminder dashboard and its PDF, from annotated ``timelines``."""
+    rows = timelines.order_by('plant_id', 'trait').values_list(
+        'plant_id', 'trait', 'reminder_status', 'expected_date', 'actual_date', 'note')
+    plant_trait_map = {}
+    trait_reminders = []
+    for plant_id, trait, status, expected, actual, note in rows:
+        plant_trait_map.setdefault(plant_id, {})[trait] = status
+        trait_reminders.append({
+            'plot': plant_id,
+            'trait': trait,
+            'status': status,
+            'expected_date': expected,
+            'actual_date': actual,
+            'note': note,
+        })
+    return {
+        'trait_list': sorted({reminder['trait'] for reminder in trait_reminders}),
+        'plant_trait_map': plant_trait_map,
+        'plant_ids': sorted(plant_trait_map),
+        'trait_reminders': trait_reminders,
+    }
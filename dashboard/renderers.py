@@ -0,0 +1,41 @@
+"""
+dashboard.renderers
+
+Delimited-text renderers for BrAPI table responses (observations/table).
+"""
+
+import csv
+import io
+
+from rest_framework.renderers import BaseRenderer
+
+
+class DelimitedTableRenderer(BaseRenderer):
+    """
+    Renders a BrAPI table result ({"headerRow", "observationVariables",
+    "data"}) as delimited text: one header line, then one line per row.
+    Anything else (e.g. an error envelope) is rendered as a single cell.
+    """
+    delimiter = ','
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        out = io.StringIO()
+        writer = csv.writer(out, delimiter=self.delimiter, lineterminator='\n')
+        if isinstance(data, dict) and 'headerRow' in data:
+            writer.writerow(data['headerRow'] + [v['observationVariableName'] for v in data['observationVariables']])
+            writer.writerows(['' if value is None else value for value in row] for row in data['data'])
+        else:
+            writer.writerow([data])
+        return out.getvalue().encode(self.charset)
+
+
+class CSVTableRenderer(DelimitedTableRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class TSVTableRenderer(DelimitedTableRenderer):
+    media_type = 'text/tsv'
+    format = 'tsv'
+    delimiter = '\t'
@@ -1,4 +1,7 @@
-from rest_framework import serializers
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
 from .models import (
     FieldPlot,
     Germplasm,
@@ -65,14 +68,18 @@ class ObservationUnitSerializer(serializers.ModelSerializer):
         fields = ['observationUnitDbId', 'location', 'plantingDate']
 
     def get_location(self, obj):
-        if obj.latitude is not None and obj.longitude is not None:
-            return {
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [obj.longitude, obj.latitude]
-                }
+        return point_location(obj.latitude, obj.longitude)
+
+
+def point_location(latitude, longitude):
+    if latitude is not None and longitude is not None:
+        return {
+            "geometry": {
+                "type": "Point",
+                "coordinates": [longitude, latitude]
             }
-        return None
+        }
+    return None
 
 
 # ───────────────────────────────
@@ -200,3 +207,123 @@ class ImageSerializer(serializers.ModelSerializer):
             'scale', 'timeStamp', 'takenBy', 'uploadedBy',
             'observationUnitDbId', 'additionalInfo'
         ]
+
+
+# ───────────────────────────────
+# values() fast path
+# ───────────────────────────────
+
+class ValuesSerializer:
+    """
+    Produces the same JSON as a ModelSerializer straight from values_list()
+    rows, skipping model instances and per-field machinery.
+
+    The serializer's fields are compiled once into (key, column, converter)
+    steps. Fields that are not a plain model attribute (SerializerMethodField,
+    dotted sources) must be given in ``computed`` as
+    ``{key: ((column, ...), function)}``.
+
+        fast = ValuesSerializer(ObservationSerializer)
+        rows = fast.queryset(PlantTraitData.objects.all())
+        data = fast.many(rows)
+
+    Rows start with the primary key, so paginate() can take keyset tokens
+    from them. ``only(keys)`` gives a serializer for a sparse fieldset that
+    also fetches only the columns those keys need.
+    """
+
+    def __init__(self, serializer_class, computed=None, keys=None):
+        self.serializer_class = serializer_class
+        self.computed = computed or {}
+        self.keys = keys
+        self._plan = None
+        self._subsets = {}
+
+    @staticmethod
+    def converter(field):
+        """A fast to_representation for ``field``, or None when the raw value is already right."""
+        if isinstance(field, serializers.CharField):
+            return str
+        if isinstance(field, serializers.IntegerField):
+            return int
+        if isinstance(field, serializers.FloatField):
+            return float
+        if isinstance(field, serializers.DateField) and not isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return lambda value: value if isinstance(value, str) else value.isoformat()
+        if isinstance(field, serializers.JSONField) and not field.binary:
+            return None
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            return None
+        return field.to_representation
+
+    def compile(self):
+        columns = ['pk']
+        plan = []
+
+        def column(name):
+            if name not in columns:
+                columns.append(name)
+            return columns.index(name)
+
+        for key, field in self.serializer_class().fields.items():
+            if field.write_only or (self.keys is not None and key not in self.keys):
+                continue
+            if key in self.computed:
+                names, function = self.computed[key]
+                plan.append((key, tuple(column(name) for name in names), function))
+            elif field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{key} needs an entry in ValuesSerializer(computed=...)")
+            else:
+                plan.append((key, column(field.source), self.converter(field)))
+        return columns, plan
+
+    @property
+    def field_names(self):
+        return [key for key, field in self.serializer_class().fields.items() if not field.write_only]
+
+    def only(self, keys):
+        """This serializer restricted to the output ``keys``; raises ValueError for unknown ones."""
+        keys = tuple(keys)
+        if keys not in self._subsets:
+            unknown = [key for key in keys if key not in self.field_names]
+            if unknown:
+                raise ValueError(f"Unknown field(s): {', '.join(unknown)}; available: {', '.join(self.field_names)}")
+            self._subsets[keys] = ValuesSerializer(self.serializer_class, self.computed, keys=set(keys))
+        return self._subsets[keys]
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            self._plan = self.compile()
+        return self._plan
+
+    def queryset(self, queryset):
+        columns, _ = self.plan
+        return queryset.values_list(*columns)
+
+    def to_representation(self, row):
+        data = {}
+        for key, index, convert in self.plan[1]:
+            if isinstance(index, tuple):
+                data[key] = convert(*[row[i] for i in index])
+            else:
+                value = row[index]
+                data[key] = value if value is None or convert is None else convert(value)
+        return data
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+fast_observations = ValuesSerializer(ObservationSerializer)
+fast_observation_units = ValuesSerializer(
+    ObservationUnitSerializer,
+    computed={'location': (('latitude', 'longitude'), point_location)},
+)
+fast_samples = ValuesSerializer(SampleSerializer)
+fast_trials = ValuesSerializer(TrialSerializer)
+fast_germplasm = ValuesSerializer(GermplasmSerializer)
@@ -0,0 +1,144 @@
+"""
+dashboard.spatial
+
+Area queries over FieldPlot coordinates without PostGIS.
+
+Every plot has a ``grid_cell``: the row-major number of the cell of a fixed
+latitude/longitude grid (GRID_CELLS_PER_DEGREE per degree) it falls in,
+computed by the database as a generated column and indexed. A bounding box
+turns into one indexed range of grid_cell per grid row it covers, and only
+the plots in those cells are checked against the exact coordinates.
+
+    within_bbox((west, south, east, north))
+    within_radius(latitude, longitude, meters)       annotated with distance
+    nearest(latitude, longitude, k)                  list, closest first
+
+Distances use the equirectangular approximation, which is well within a
+metre at field scale and needs nothing but arithmetic in SQL.
+"""
+
+import math
+
+from django.db.models import Count, F, FloatField, Max, Min, Q, Value
+from django.db.models.functions import Sqrt
+
+from .models import GRID_CELLS_PER_DEGREE, GRID_COLUMNS, FieldPlot
+
+METERS_PER_DEGREE = 111320.0
+# Past this many grid rows a box is read as one range (then filtered on the coordinates)
+MAX_ROW_RANGES = 64
+
+
+def parse_bbox(value):
+    """(west, south, east, north) from "west,south,east,north" degrees, or None; raises ValueError."""
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be west,south,east,north in decimal degrees")
+    if not (west <= east and south <= north):
+        raise ValueError("bbox must be west,south,east,north with west <= east and south <= north")
+    return west, south, east, north
+
+
+def grid_row(latitude):
+    return math.floor((latitude + 90) * GRID_CELLS_PER_DEGREE)
+
+
+def grid_column(longitude):
+    return math.floor((longitude + 180) * GRID_CELLS_PER_DEGREE)
+
+
+def grid_cell(latitude, longitude):
+    """The FieldPlot.grid_cell of a point (the same arithmetic the database does)."""
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
+
+
+def cell_ranges(bbox):
+    """(first, last) grid_cell ranges covering ``bbox`` = (west, south, east, north)."""
+    west, south, east, north = bbox
+    first_row, last_row = grid_row(south), grid_row(north)
+    first_column, last_column = grid_column(west), grid_column(east)
+    if last_row - first_row >= MAX_ROW_RANGES:
+        return [(first_row * GRID_COLUMNS + first_column, last_row * GRID_COLUMNS + last_column)]
+    return [
+        (row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+        for row in range(first_row, last_row + 1)
+    ]
+
+
+def within_bbox(bbox, plots=None):
+    """The plots of ``plots`` (default: all) inside ``bbox`` = (west, south, east, north)."""
+    plots = FieldPlot.objects.all() if plots is None else plots
+    west, south, east, north = bbox
+    cells = Q()
+    for first, last in cell_ranges(bbox):
+        cells |= Q(grid_cell__range=(first, last))
+    return plots.filter(cells).filter(
+        latitude__range=(south, north), longitude__range=(west, east))
+
+
+def radius_bbox(latitude, longitude, meters):
+    """The bbox around a circle; the longitude span widens with latitude."""
+    dlat = meters / METERS_PER_DEGREE
+    dlon = meters / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return (max(longitude - dlon, -180), max(latitude - dlat, -90),
+            min(longitude + dlon, 180), min(latitude + dlat, 90))
+
+
+def distance_expression(latitude, longitude):
+    """Approximate distance in metres from (latitude, longitude) to a plot, as a query expression."""
+    x_scale = METERS_PER_DEGREE * math.cos(math.radians(latitude))
+    dx = (F('longitude') - Value(longitude)) * Value(x_scale)
+    dy = (F('latitude') - Value(latitude)) * Value(METERS_PER_DEGREE)
+    return Sqrt(dx * dx + dy * dy, output_field=FloatField())
+
+
+def within_radius(latitude, longitude, meters, plots=None):
+    """The plots within ``meters`` of a point, annotated with ``distance`` (metres)."""
+    return (
+        within_bbox(radius_bbox(latitude, longitude, meters), plots)
+        .annotate(distance=distance_expression(latitude, longitude))
+        .filter(distance__lte=meters)
+    )
+
+
+def nearest(latitude, longitude, k, plots=None):
+    """
+    The ``k`` plots closest to a point, closest first, each with a
+    ``distance`` attribute. The search starts at one grid cell and doubles
+    its radius until it has found k plots. If the first circle falls short,
+    the extent of ``plots`` is read once: with no more than k of them, or once
+    the circle would hold the whole extent, they are simply sorted by distance.
+    """
+    plots = FieldPlot.objects.all() if plots is None else plots
+    located = plots.filter(latitude__isnull=False, longitude__isnull=False)
+    by_distance = located.annotate(distance=distance_expression(latitude, longitude)).order_by('distance', 'pk')
+    meters = METERS_PER_DEGREE / GRID_CELLS_PER_DEGREE
+    cover = None
+    while cover is None or meters < cover:
+        found = list(within_radius(latitude, longitude, meters, plots).order_by('distance', 'pk')[:k])
+        if len(found) >= k:
+            return found
+        if cover is None:
+            cover = covering_radius(latitude, longitude, located, k)
+        meters *= 2
+    return list(by_distance[:k])
+
+
+def covering_radius(latitude, longitude, plots, k):
+    """
+    The radius around a point that holds every plot of ``plots``, as
+    distance_expression() measures it, or 0 when there are no more than k.
+    """
+    extent = plots.aggregate(
+        count=Count('pk'), south=Min('latitude'), north=Max('latitude'),
+        west=Min('longitude'), east=Max('longitude'))
+    if extent['count'] <= k:
+        return 0
+    x_scale = METERS_PER_DEGREE * math.cos(math.radians(latitude))
+    return max(
+        math.hypot((lon - longitude) * x_scale, (lat - latitude) * METERS_PER_DEGREE)
+        for lat in (extent['south'], extent['north']) for lon in (extent['west'], extent['east'])
+    )
@@ -0,0 +1,724 @@
+import datetime
+import io
+import json
+import shutil
+import struct
+import tempfile
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .brapi_cache import bump_data_version, response_cache
+from .heatmap_raster import TILE_SIZE, matrix_cache, tile_cache
+from .heatmap_tiles import traits_cache
+from .ingest import ingest_trait_csv
+from .models import (
+    FieldPlot, Germplasm, Location, PdfJob, PlantTraitData, Sample, SearchRequest, TraitMatrix, TraitMatrixRow, TraitSchedule,
+    TraitTimeline, Trial,
+)
+from .pdf_jobs import recover_stale_jobs, request_pdf, run_pdf_job, trait_report_parts
+from .pivot import pivot_timeline_flags
+from .reminders import COMPLETED, DUE_SOON, OVERDUE, TOO_EARLY, reminder_counts, with_reminder_status
+from .serializers import (
+    GermplasmSerializer, ObservationSerializer, ObservationUnitSerializer, SampleSerializer, TrialSerializer,
+    fast_germplasm, fast_observation_units, fast_observations, fast_samples, fast_trials,
+)
+from .spatial import nearest, within_bbox, within_radius
+from .trait_values import columns_cache
+from .utils import calculate_trait_reminder_status
+
+
+class BrapiTestCase(TestCase):
+    """An authenticated API client, and no cached BrAPI pages left over from other tests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('brapi'))
+        response_cache.clear()
+
+    def data(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['result']['data']
+
+
+class BrapiTimeFilterTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        PlantTraitData.objects.create(plant_id='P1', trait='height', value='10')
+        PlantTraitData.objects.create(plant_id='P2', trait='height', value='12')
+
+    def test_date_filters(self):
+        yesterday = (timezone.now() - datetime.timedelta(days=1)).date().isoformat()
+        tomorrow = (timezone.now() + datetime.timedelta(days=1)).date().isoformat()
+        for path, param in [('observations', 'updatedSince'),
+                            ('observations', 'observationTimeStampRangeStart'),
+                            ('observationunits', 'updatedSince'),
+                            ('samples', 'updatedSince')]:
+            with self.subTest(path=path, param=param):
+                response = self.client.get(f'/brapi/v2/{path}', {param: yesterday})
+                self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/brapi/v2/observations', {'updatedSince': yesterday})
+        self.assertEqual(len(response.json()['result']['data']), 2)
+        response = self.client.get('/brapi/v2/observations', {'updatedSince': tomorrow})
+        self.assertEqual(response.json()['result']['data'], [])
+
+    def test_invalid_date(self):
+        response = self.client.get('/brapi/v2/observations', {'updatedSince': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BrapiObservationTableTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        for plant in ['P1', 'P2', 'P3']:
+            PlantTraitData.objects.create(plant_id=plant, trait='height', value='10')
+            PlantTraitData.objects.create(plant_id=plant, trait='width', value='4')
+
+    def test_page_tokens(self):
+        units, token = [], ''
+        for _ in range(3):
+            response = self.client.get('/brapi/v2/observations/table', {'pageToken': token, 'pageSize': 2})
+            self.assertEqual(response.status_code, 200)
+            units += [row[2] for row in response.json()['result']['data']]
+            token = response.json()['metadata']['pagination']['nextPageToken']
+            if not token:
+                break
+        self.assertEqual(units, ['P1', 'P2', 'P3'])
+
+
+class UploadTimelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('supervisor')
+        self.client.force_login(self.user)
+        TraitSchedule.objects.create(crop='maize', trait='height', days_after_planting=30)
+        TraitSchedule.objects.create(crop='maize', trait='width', days_after_planting=60)
+
+    def upload(self, text):
+        sheet = SimpleUploadedFile('sheet.csv', text.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/dashboard/traits/upload/', {'file': sheet})
+
+    def test_disjoint_uploads_keep_other_timelines(self):
+        self.upload("plant_id,planting_date,height,width\nA1,2026-01-01,10,\nA2,2026-01-01,,\n")
+        self.assertEqual(TraitTimeline.objects.filter(plant_id__in=['A1', 'A2']).count(), 4)
+        TraitTimeline.objects.filter(plant_id='A1', trait='height').update(
+            actual_date=datetime.date(2026, 2, 1), note='measured by hand')
+
+        self.upload("plant_id,planting_date,height,width\nB1,2026-03-01,,5\n")
+
+        self.assertEqual(TraitTimeline.objects.filter(plant_id__in=['A1', 'A2']).count(), 4)
+        self.assertEqual(TraitTimeline.objects.filter(plant_id='B1').count(), 2)
+        kept = TraitTimeline.objects.get(plant_id='A1', trait='height')
+        self.assertEqual((kept.actual_date, kept.note), (datetime.date(2026, 2, 1), 'measured by hand'))
+
+
+@override_settings(PDF_WORKERS=0)
+class PdfJobRecoveryTests(TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(PDF_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.inputs = {"plant_id": "P1", "versions": [0]}
+
+    def stale_job(self, attempts):
+        job = request_pdf('plant_snapshot', self.inputs, 'snapshot_P1.pdf')
+        long_ago = timezone.now() - datetime.timedelta(days=1)
+        PdfJob.objects.filter(pk=job.pk).update(status=PdfJob.RUNNING, started_on=long_ago, attempts=attempts)
+        return job
+
+    def test_stale_running_job_is_queued_again(self):
+        job = self.stale_job(attempts=1)
+        self.assertEqual(request_pdf('plant_snapshot', self.inputs, 'snapshot_P1.pdf').status, PdfJob.PENDING)
+        run_pdf_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PdfJob.DONE, 2))
+
+    def test_job_failing_twice_is_failed(self):
+        job = self.stale_job(attempts=2)
+        call_command('run_pdf_jobs', stdout=io.StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.FAILED)
+
+    def test_recent_running_job_is_left_alone(self):
+        job = request_pdf('plant_snapshot', self.inputs, 'snapshot_P1.pdf')
+        PdfJob.objects.filter(pk=job.pk).update(status=PdfJob.RUNNING, started_on=timezone.now(), attempts=1)
+        self.assertEqual(recover_stale_jobs(), 0)
+
+
+class TraitMatrixTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('editor'))
+        other = User.objects.create_user('other')
+        self.matrix = TraitMatrix.objects.create(headers=['plant_id', 'height'], trait_fields=['height'],
+                                                 uploaded_by=other, row_count=1)
+        TraitMatrixRow.objects.create(matrix=self.matrix, position=0, plant_id='P1', values=['P1', ''], flags='E')
+
+    def update(self, **extra):
+        body = {'plant_id': 'P1', 'trait': 'height', 'value': '12', **extra}
+        return self.client.post('/dashboard/traits/update-trait/', json.dumps(body), content_type='application/json')
+
+    def test_no_sheet_without_an_id(self):
+        self.assertEqual(self.update().status_code, 400)
+        self.assertEqual(TraitMatrixRow.objects.get().values, ['P1', ''])
+
+    def test_unknown_id_is_404(self):
+        self.assertEqual(self.update(upload_id=str(uuid.uuid4())).status_code, 404)
+        self.assertEqual(self.client.get('/dashboard/traits/edit-traits/', {'upload': 'junk'}).status_code, 404)
+
+    def test_explicit_id(self):
+        self.assertEqual(self.update(upload_id=str(self.matrix.upload_id)).status_code, 200)
+        self.assertEqual(TraitMatrixRow.objects.get().values, ['P1', '12'])
+
+
+class ValuesSerializerParityTests(TestCase):
+    """The fast_* serializers give exactly what their DRF serializers give."""
+
+    @classmethod
+    def setUpTestData(cls):
+        trial = Trial.objects.create(trialDbId='T1', trialName='Trial 1', programName='Maize',
+                                     startDate=datetime.date(2026, 3, 1), additionalInfo={'site': 'north'})
+        Trial.objects.create(trialDbId='T2', trialName='Trial 2')
+        Germplasm.objects.create(germplasmDbId='G1', germplasmName='Line 1', genus='Zea', synonyms=['L1', 'ZL-1'])
+        Germplasm.objects.create(germplasmDbId='G2', germplasmName='Line 2')
+        FieldPlot.objects.create(plant_id='P1', latitude=-1.25, longitude=36.8,
+                                 planting_date=datetime.date(2026, 3, 5), trial=trial)
+        FieldPlot.objects.create(plant_id='P2')
+        PlantTraitData.objects.create(plant_id='P1', trait='height', value='152')
+        PlantTraitData.objects.create(plant_id='P2', trait='colour', value='dark green')
+        Sample.objects.create(sampleDbId='S1', sampleName='leaf', studyDbId='1', observationUnitDbId='P1',
+                              sampleTimestamp=timezone.now())
+        Sample.objects.create(sampleDbId='S2', sampleName='root')
+
+    def assertParity(self, fast, serializer_class, queryset):
+        queryset = queryset.order_by('pk')
+        expected = [dict(item) for item in serializer_class(queryset, many=True).data]
+        self.assertEqual(fast.many(fast.queryset(queryset)), expected)
+        keys = list(expected[0])[:2]
+        self.assertEqual(fast.only(keys).many(fast.only(keys).queryset(queryset)),
+                         [{key: item[key] for key in keys} for item in expected])
+
+    def test_observations(self):
+        self.assertParity(fast_observations, ObservationSerializer, PlantTraitData.objects.all())
+
+    def test_observation_units(self):
+        self.assertParity(fast_observation_units, ObservationUnitSerializer, FieldPlot.objects.all())
+
+    def test_germplasm(self):
+        self.assertParity(fast_germplasm, GermplasmSerializer, Germplasm.objects.all())
+
+    def test_samples(self):
+        self.assertParity(fast_samples, SampleSerializer, Sample.objects.all())
+
+    def test_trials(self):
+        self.assertParity(fast_trials, TrialSerializer, Trial.objects.all())
+
+
+@override_settings(PDF_WORKERS=0, TRAIT_REPORT_PLANTS_PER_FILE=10)
+class TraitReportQueryTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('reporter'))
+
+    def add_plants(self, count):
+        flags = ['🕓', '⏳', '❌', '✔️']
+        TraitTimeline.objects.bulk_create(
+            TraitTimeline(plant_id=f'R{i:03d}', trait=trait, status_flag=flags[i % 4])
+            for i in range(count) for trait in ('height', 'width', 'yield'))
+        bump_data_version(TraitTimeline)
+
+    def test_pivot_is_one_query(self):
+        for plants in (3, 30):
+            self.add_plants(plants)
+            with self.assertNumQueries(1):
+                traits, rows = pivot_timeline_flags(TraitTimeline.objects.all())
+        self.assertEqual(traits, ['height', 'width', 'yield'])
+        self.assertEqual(rows[1], ('R001', ['⏳', '⏳', '⏳']))
+
+    def test_report_job_reads_one_query(self):
+        self.add_plants(25)
+        with self.assertNumQueries(1):
+            traits, parts = trait_report_parts({"trial": None, "plants_per_file": 10})
+        self.assertEqual([len(part) for part in parts], [10, 10, 5])
+
+    def test_export_queries_do_not_grow_with_plants(self):
+        counts = []
+        for plants in (5, 50):
+            self.add_plants(plants)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/dashboard/traits/export/pdf/', {'part': 1})
+            self.assertEqual(response.status_code, 302)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.add_plants(80)
+        with self.assertNumQueries(counts[0]):
+            self.client.get('/dashboard/traits/export/pdf/', {'part': 2})
+
+
+class IngestTests(TestCase):
+    def test_row_and_cell_counts(self):
+        sheet = io.StringIO("plant_id,block,height,width\nP1,1,10,4\nP2,1,,5\nP3,2\nP4,2,12, \n")
+        seen = []
+        stats = ingest_trait_csv(sheet, batch_size=2, on_row=lambda entry, traits: seen.append(entry['plant_id']))
+        self.assertEqual((stats['rows'], stats['cells']), (4, 4))
+        self.assertEqual(stats['trait_fields'], ['height', 'width'])
+        self.assertEqual(seen, ['P1', 'P2', 'P3', 'P4'])
+        self.assertEqual(
+            sorted(PlantTraitData.objects.values_list('plant_id', 'trait', 'value')),
+            [('P1', 'height', '10'), ('P1', 'width', '4'), ('P2', 'width', '5'), ('P4', 'height', '12')])
+
+
+class SendTraitRemindersTests(TestCase):
+    def setUp(self):
+        north = Trial.objects.create(trialDbId='NORTH', trialName='North')
+        south = Trial.objects.create(trialDbId='SOUTH', trialName='South')
+        planted = datetime.date(2026, 1, 1)
+        for plant_id, trial in (('A', north), ('B', north), ('C', south)):
+            FieldPlot.objects.create(plant_id=plant_id, trial=trial, planting_date=planted)
+        TraitSchedule.objects.create(crop='maize', trait='height', days_after_planting=30)
+        PlantTraitData.objects.create(plant_id='A', trait='height', value='10')
+
+    def run_command(self, **options):
+        output = io.StringIO()
+        call_command('send_trait_reminders', stdout=output, **options)
+        return output.getvalue()
+
+    def test_sync_is_a_diff(self):
+        self.assertIn("3 created, 0 updated, 0 removed, 0 unchanged", self.run_command())
+        self.assertEqual(TraitTimeline.objects.get(plant_id='A').status_flag, '✔️')
+        TraitTimeline.objects.filter(plant_id='B').update(note='checked')
+        self.assertIn("0 created, 0 updated, 0 removed, 3 unchanged", self.run_command())
+        self.assertEqual(TraitTimeline.objects.get(plant_id='B').note, 'checked')
+
+    def test_scoped_run_prunes_only_its_plots(self):
+        self.run_command()
+        for plant_id in ('A', 'C'):
+            TraitTimeline.objects.create(plant_id=plant_id, trait='retired')
+        self.assertIn("1 removed", self.run_command(trial='NORTH'))
+        self.assertEqual(sorted(TraitTimeline.objects.filter(trait='retired').values_list('plant_id', flat=True)), ['C'])
+        self.run_command()
+        self.assertFalse(TraitTimeline.objects.filter(trait='retired').exists())
+
+
+class KeysetPaginationTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(7):
+            Germplasm.objects.create(germplasmDbId=f'G{i}', germplasmName=f'Line {i}')
+
+    def test_tokens_walk_every_row_once(self):
+        names, token, pages = [], '', 0
+        while True:
+            response = self.client.get('/brapi/v2/germplasm', {'pageToken': token, 'pageSize': 3})
+            names += [row['germplasmDbId'] for row in self.data(response)]
+            pagination = response.json()['metadata']['pagination']
+            self.assertIsNone(pagination['totalCount'])
+            pages += 1
+            token = pagination['nextPageToken']
+            if not token:
+                break
+        self.assertEqual((pages, names), (3, [f'G{i}' for i in range(7)]))
+
+    def test_total_count_on_request(self):
+        response = self.client.get('/brapi/v2/germplasm', {'pageToken': '', 'pageSize': 3, 'includeTotalCount': 'true'})
+        self.assertEqual(response.json()['metadata']['pagination']['totalCount'], 7)
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/brapi/v2/germplasm', {'pageToken': 'not-a-token'}).status_code, 400)
+
+
+class ObservationUpsertTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        FieldPlot.objects.create(plant_id='P1')
+        FieldPlot.objects.create(plant_id='P2')
+        self.existing = PlantTraitData.objects.create(plant_id='P1', trait='height', value='10')
+
+    def post(self, observations):
+        return self.client.post('/brapi/v2/observations', {'observations': observations}, format='json')
+
+    def observation(self, unit, trait, value):
+        return {'observationUnitDbId': unit, 'observationVariableName': trait, 'value': value,
+                'observationTimeStamp': '2026-05-01T10:00:00Z'}
+
+    def test_last_value_wins_on_duplicate_pairs(self):
+        response = self.post([
+            self.observation('P1', 'height', '11'),
+            self.observation('P2', 'height', '20'),
+            self.observation('P1', 'height', '12'),
+            self.observation('P2', 'height', '21'),
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(sorted(PlantTraitData.objects.values_list('plant_id', 'value')), [('P1', '12'), ('P2', '21')])
+        self.assertEqual(PlantTraitData.objects.get(plant_id='P1').pk, self.existing.pk)
+
+    def test_invalid_records_are_reported(self):
+        response = self.post([self.observation('P1', 'width', '3'), self.observation('NOPE', 'width', '3')])
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertTrue(PlantTraitData.objects.filter(plant_id='P1', trait='width').exists())
+        self.assertFalse(PlantTraitData.objects.filter(plant_id='NOPE').exists())
+
+
+class SampleRegistrationTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        FieldPlot.objects.create(plant_id='P1')
+
+    def post(self, samples):
+        return self.client.post('/brapi/v2/samples', {'samples': samples}, format='json')
+
+    def sample(self, name, taken='2026-05-01T10:00:00Z'):
+        return {'sampleName': name, 'observationUnitDbId': 'P1', 'studyDbId': '1',
+                'takenDateTime': taken, 'sampleType': 'Tissue'}
+
+    def test_duplicates_are_rejected(self):
+        response = self.post([self.sample('leaf'), self.sample('leaf'), self.sample('root')])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(len(response.json()['result']['data']), 2)
+        self.assertEqual(Sample.objects.count(), 2)
+
+        # Resubmitting the same plate registers nothing new
+        response = self.post([self.sample('leaf')])
+        self.assertEqual(response.status_code, 207)
+        self.assertIn('already registered', response.json()['metadata']['status'][1]['message'])
+        self.assertEqual(Sample.objects.count(), 2)
+
+    def test_same_name_at_another_time_is_a_new_sample(self):
+        self.assertEqual(self.post([self.sample('leaf')]).status_code, 201)
+        self.assertEqual(self.post([self.sample('leaf', taken='2026-05-02T10:00:00Z')]).status_code, 201)
+        self.assertEqual(Sample.objects.count(), 2)
+
+
+# The sub-requests run inline: worker threads would not see the test's transaction
+@override_settings(BRAPI_BATCH_WORKERS=0)
+class BatchTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        FieldPlot.objects.create(plant_id='P1')
+        FieldPlot.objects.create(plant_id='P2')
+
+    def test_results_come_back_in_request_order(self):
+        response = self.client.post('/brapi/v2/batch', {'requests': [
+            {'id': 'units', 'path': 'observationunits', 'params': {'pageSize': 1}},
+            'nope',
+            '/brapi/v2/calls',
+        ]}, format='json')
+        results = self.data(response)
+        self.assertEqual([(r['id'], r['path'], r['status']) for r in results], [
+            ('units', 'observationunits?pageSize=1', 200),
+            ('1', 'nope', 404),
+            ('2', 'calls', 200),
+        ])
+        self.assertEqual(len(results[0]['body']['result']['data']), 1)
+        self.assertEqual(results[0]['body']['metadata']['pagination']['totalCount'], 2)
+
+    @override_settings(BRAPI_BATCH_MAX_REQUESTS=2)
+    def test_too_many_requests(self):
+        response = self.client.post('/brapi/v2/batch', {'requests': ['calls'] * 3}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SpatialTests(BrapiTestCase):
+    # (plant_id, latitude, longitude), created so that pk order is not distance order
+    PLOTS = [('east', 0.3000, 32.0050), ('far', 0.3100, 32.0100), ('mid', 0.3020, 32.0000),
+             ('near', 0.3001, 32.0001), ('other', 5.0, 40.0)]
+
+    def setUp(self):
+        super().setUp()
+        for plant_id, latitude, longitude in self.PLOTS:
+            FieldPlot.objects.create(plant_id=plant_id, latitude=latitude, longitude=longitude)
+        FieldPlot.objects.create(plant_id='nowhere')
+
+    def ids(self, plots):
+        return [plot.plant_id for plot in plots]
+
+    def test_bbox(self):
+        self.assertEqual(sorted(self.ids(within_bbox((31.999, 0.299, 32.006, 0.303)))), ['east', 'mid', 'near'])
+
+    def test_radius(self):
+        plots = within_radius(0.3, 32.0, 300)
+        self.assertEqual(sorted(self.ids(plots)), ['mid', 'near'])
+        self.assertTrue(all(plot.distance <= 300 for plot in plots))
+
+    def test_nearest_is_closest_first(self):
+        self.assertEqual(self.ids(nearest(0.3, 32.0, 3)), ['near', 'mid', 'east'])
+        self.assertEqual(self.ids(nearest(0.3, 32.0, 5)), ['near', 'mid', 'east', 'far', 'other'])
+
+    def test_nearest_with_few_plots_stops_widening(self):
+        plots = FieldPlot.objects.filter(plant_id__in=['far', 'east'])
+        with self.assertNumQueries(3):
+            self.assertEqual(self.ids(nearest(0.3, 32.0, 10, plots)), ['east', 'far'])
+
+    def test_observationunits_keep_distance_order(self):
+        data = self.data(self.client.get('/brapi/v2/observationunits', {
+            'latitude': 0.3, 'longitude': 32.0, 'nearest': 3}))
+        self.assertEqual([unit['observationUnitDbId'] for unit in data], ['near', 'mid', 'east'])
+
+    def test_nearest_needs_a_point(self):
+        response = self.client.get('/brapi/v2/observationunits', {'nearest': 3})
+        self.assertEqual(response.status_code, 400)
+
+
+class TraitValuesTests(TestCase):
+    def setUp(self):
+        columns_cache.clear()
+        self.client.force_login(User.objects.create_user('viewer'))
+        for plant_id, plot_status in (('P1', 'ready'), ('P2', 'too-early'), ('P3', 'ready')):
+            FieldPlot.objects.create(plant_id=plant_id, status=plot_status)
+        PlantTraitData.objects.bulk_create([
+            PlantTraitData(plant_id='P1', trait='height', value='4'),
+            PlantTraitData(plant_id='P1', trait='height', value='10'),  # newer, wins
+            PlantTraitData(plant_id='P3', trait='height', value='12.5'),
+            PlantTraitData(plant_id='P2', trait='colour', value='red'),
+        ])
+        bump_data_version(PlantTraitData)
+
+    def get(self, **params):
+        response = self.client.get(reverse('gps:trait_values_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_json_columns(self):
+        data = self.get().json()
+        self.assertEqual(data['plants'], ['P1', 'P2', 'P3'])
+        self.assertEqual(data['status']['dictionary'], ['ready', 'too-early'])
+        self.assertEqual(data['status']['codes'], [0, 1, 0])
+        colour, height = data['traits']
+        self.assertEqual((colour['type'], colour['dictionary'], colour['values']), ('category', ['red'], [0, 0, 0]))
+        self.assertEqual((height['type'], height['values'], height['range']), ('numeric', [10, 0, 12.5], [10, 12.5]))
+
+    def test_binary_layout(self):
+        body = self.get(format='binary').content
+        (length,) = struct.unpack_from('<I', body)
+        header = json.loads(body[4:4 + length])
+        data = body[4 + length:]
+        self.assertEqual((4 + length) % 8, 0)
+
+        def buffer(entry, typecode):
+            offset, size = entry
+            self.assertEqual(offset % 8, 0)
+            raw = data[offset:offset + size]
+            return list(struct.unpack(f'<{size // struct.calcsize(typecode)}{typecode}', raw))
+
+        self.assertEqual(header['plants'], ['P1', 'P2', 'P3'])
+        self.assertEqual(header['status']['dtype'], 'uint8')
+        self.assertEqual(buffer(header['status']['codes'], 'B'), [0, 1, 0])
+        colour, height = header['traits']
+        self.assertEqual(buffer(colour['values'], 'B'), [0, 0, 0])
+        self.assertEqual(buffer(colour['valid'], 'B'), [0b010])
+        self.assertEqual(height['dtype'], 'float32')
+        self.assertEqual(buffer(height['values'], 'f'), [10, 0, 12.5])
+        self.assertEqual(buffer(height['valid'], 'B'), [0b101])
+        self.assertEqual(height['range'], [10, 12.5])
+
+
+class HeatmapTileTests(TestCase):
+    def setUp(self):
+        traits_cache.clear()
+        self.client.force_login(User.objects.create_user('viewer'))
+        for plant_id in ('P1', 'P2', 'P3'):
+            FieldPlot.objects.create(plant_id=plant_id)
+        PlantTraitData.objects.bulk_create([
+            PlantTraitData(plant_id='P1', trait='height', value='1', status_flag='✔️'),
+            PlantTraitData(plant_id='P2', trait='height', value='1', status_flag='✔️'),
+            PlantTraitData(plant_id='P2', trait='height', value='', status_flag='❌'),  # newer, wins
+            PlantTraitData(plant_id='P3', trait='height', value='', status_flag='⏳'),
+            PlantTraitData(plant_id='P3', trait='leaves', value='5', status_flag='✔️'),
+        ])
+        bump_data_version(PlantTraitData)
+
+    def tile(self, **params):
+        response = self.client.get(reverse('traits:trait_heatmap_tiles'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_flags(self):
+        tile = self.tile()
+        self.assertEqual(tile['plants'], ['P1', 'P2', 'P3'])
+        self.assertEqual(tile['traits'], ['height', 'leaves'])
+        self.assertEqual(tile['flags'], [[3, 0], [1, 0], [2, 3]])
+        self.assertEqual((tile['total_rows'], tile['total_columns']), (3, 2))
+
+    def test_window(self):
+        tile = self.tile(row_offset=1, row_limit=1, column_offset=1, column_limit=5)
+        self.assertEqual((tile['plants'], tile['traits'], tile['flags']), (['P2'], ['leaves'], [[0]]))
+
+    def test_sort_and_filter(self):
+        self.assertEqual(self.tile(sort='-height')['plants'], ['P1', 'P3', 'P2'])
+        self.assertEqual(self.tile(sort='height')['plants'], ['P2', 'P3', 'P1'])
+        tile = self.tile(flag='leaves:0', sort='-height')
+        self.assertEqual((tile['plants'], tile['total_rows']), (['P1', 'P2'], 2))
+
+    def test_bad_flag_filter(self):
+        response = self.client.get(reverse('traits:trait_heatmap_tiles'), {'flag': 'height:9'})
+        self.assertEqual(response.status_code, 400)
+
+
+class HeatmapRasterTests(TestCase):
+    PLANTS = 600
+
+    def setUp(self):
+        for cache in (matrix_cache, tile_cache, traits_cache, columns_cache):
+            cache.clear()
+        self.client.force_login(User.objects.create_user('viewer'))
+        FieldPlot.objects.bulk_create(FieldPlot(plant_id=f'P{i:04d}') for i in range(self.PLANTS))
+        PlantTraitData.objects.bulk_create([
+            PlantTraitData(plant_id='P0000', trait='height', value='3', status_flag='✔️'),
+            PlantTraitData(plant_id='P0001', trait='leaves', value='7', status_flag='❌'),
+        ])
+        bump_data_version(PlantTraitData)
+
+    def raster(self, **params):
+        return self.client.get(reverse('traits:trait_heatmap_raster'), params)
+
+    def image(self, **params):
+        response = self.raster(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        return Image.open(io.BytesIO(response.content))
+
+    def test_overview_fits_one_tile(self):
+        info = self.raster(format='json').json()
+        self.assertEqual((info['rows'], info['columns'], info['zoom']), (self.PLANTS, 2, 2))
+        self.assertEqual(info['traits'], ['height', 'leaves'])
+        self.assertEqual(self.image().size, (2, 150))  # width = traits, height = 600 plants / 2**2
+
+    def test_tile_size_at_zoom(self):
+        self.assertEqual(self.image(zoom=0, y=0).size, (2, TILE_SIZE))
+        self.assertEqual(self.image(zoom=0, y=2).size, (2, self.PLANTS - 2 * TILE_SIZE))
+        self.assertEqual(self.image(zoom=1, y=1).size, (2, (self.PLANTS - 2 * TILE_SIZE) // 2))
+        self.assertEqual(self.raster(zoom=0, y=3).status_code, 404)
+
+    def test_status_colours(self):
+        pixels = self.image(zoom=0).convert('RGBA')
+        self.assertEqual(pixels.getpixel((0, 0)), (0x28, 0xa7, 0x45, 255))  # P0000 height completed
+        self.assertEqual(pixels.getpixel((1, 1)), (0xff, 0x4d, 0x4d, 255))  # P0001 leaves overdue
+        self.assertEqual(pixels.getpixel((0, 1)), (0xcc, 0xcc, 0xcc, 255))  # not observed
+
+    def test_bad_kind(self):
+        self.assertEqual(self.raster(kind='nope').status_code, 400)
+
+
+class ReminderStatusTests(TestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        day = datetime.timedelta(days=1)
+        dates = [None, today - day, today, today + day]
+        TraitTimeline.objects.bulk_create(
+            TraitTimeline(plant_id=f'P{i}', trait=f'trait_{j}', expected_date=expected, actual_date=actual)
+            for i, expected in enumerate(dates) for j, actual in enumerate(dates)
+            # Python cannot compare an actual date with a missing expected one
+            if expected is not None or actual is None
+        )
+
+    def test_sql_status_matches_python(self):
+        rows = with_reminder_status().values_list('expected_date', 'actual_date', 'reminder_status')
+        self.assertEqual(len(rows), 13)
+        for expected, actual, status in rows:
+            self.assertEqual(status, calculate_trait_reminder_status(expected, actual), (expected, actual))
+
+    def test_counts(self):
+        self.assertEqual(reminder_counts(with_reminder_status()),
+                         {OVERDUE: 1, DUE_SOON: 3, TOO_EARLY: 3, COMPLETED: 6})
+
+    def test_benchmark_command_agrees(self):
+        out = io.StringIO()
+        call_command('benchmark_reminder_status', rows=300, stdout=out)
+        self.assertIn('SQL and Python statuses identical', out.getvalue())
+
+
+@override_settings(BRAPI_SEARCH_WORKERS=2)
+class SearchRecoveryTests(BrapiTestCase):
+    def search(self, **fields):
+        return SearchRequest.objects.create(entity='observationunits', **fields)
+
+    def poll(self, search):
+        with self.captureOnCommitCallbacks() as queued:
+            response = self.client.get(f'/brapi/v2/search/observationunits/{search.searchResultsDbId}')
+        search.refresh_from_db()
+        return response, queued
+
+    def test_stale_pending_search_is_queued_again(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        search = self.search(queued_on=long_ago)
+        response, queued = self.poll(search)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(queued), 1)
+        self.assertGreater(search.queued_on, long_ago)
+
+        # Queued just now: left alone
+        self.assertEqual(len(self.poll(search)[1]), 0)
+
+    def test_stale_running_search_is_retried_then_failed(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        search = self.search(status=SearchRequest.RUNNING, started_on=long_ago, attempts=1)
+        response, queued = self.poll(search)
+        self.assertEqual((response.status_code, search.status, len(queued)), (202, SearchRequest.PENDING, 1))
+
+        SearchRequest.objects.filter(pk=search.pk).update(status=SearchRequest.RUNNING, started_on=long_ago, attempts=2)
+        response, queued = self.poll(search)
+        self.assertEqual((response.status_code, search.status, len(queued)), (500, SearchRequest.FAILED, 0))
+
+    def test_malformed_dates_are_rejected(self):
+        response = self.client.post('/brapi/v2/search/observations',
+                                    {'observationTimeStampRangeStart': 'last week'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('observationTimeStampRangeStart', response.json()['metadata']['status'][0]['message'])
+
+    def test_date_range(self):
+        FieldPlot.objects.create(plant_id='P1')
+        observation = PlantTraitData.objects.create(plant_id='P1', trait='height', value='1')
+        today = timezone.localdate(observation.timestamp)
+        for start, expected in ((today.isoformat(), 1), ((today + datetime.timedelta(days=1)).isoformat(), 0)):
+            response = self.client.post('/brapi/v2/search/observations',
+                                        {'observationTimeStampRangeStart': start}, format='json')
+            self.assertEqual(len(self.data(response)), expected)
+
+
+@override_settings(BRAPI_CACHE_MAX_RECORDS=2)
+class ResponseCacheTests(BrapiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            Germplasm.objects.create(germplasmDbId=f'G{i}', germplasmName=f'line {i}')
+
+    def get(self, page_size):
+        response = self.client.get('/brapi/v2/germplasm', {'pageSize': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_small_pages_are_cached(self):
+        response = self.get(2)
+        self.assertIsNotNone(response_cache.get(response['ETag']))
+        with self.assertNumQueries(1):  # the data versions only
+            self.assertEqual(self.get(2).json(), response.json())
+
+    def test_large_pages_are_not_cached(self):
+        response = self.get(3)
+        self.assertEqual(len(response.json()['result']['data']), 3)
+        self.assertIsNone(response_cache.get(response['ETag']))
+
+
+class LocationIndexTests(TestCase):
+    def test_saves_keep_locations_current(self):
+        FieldPlot.objects.create(plant_id='P1', location='North', latitude=1.0, longitude=30.0)
+        FieldPlot.objects.create(plant_id='P2', location='North', latitude=3.0, longitude=32.0)
+        north = Location.objects.get(locationName='North')
+        self.assertEqual((north.plot_count, north.latitude, north.max_longitude), (2, 2.0, 32.0))
+
+    def test_rebuild_repairs_raw_writes(self):
+        FieldPlot.objects.create(plant_id='P1', location='North', latitude=1.0, longitude=30.0)
+        FieldPlot.objects.filter(plant_id='P1').update(location='South')  # no signals
+        out = io.StringIO()
+        call_command('rebuild_locations', stdout=out)
+        self.assertIn('Rebuilt 2 location(s)', out.getvalue())
+        self.assertEqual(dict(Location.objects.values_list('locationName', 'plot_count')), {'North': 0, 'South': 1})
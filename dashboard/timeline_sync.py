@@ -0,0 +1,131 @@
+"""
+dashboard.timeline_sync
+
+Diff-based regeneration of TraitTimeline.
+
+Callers describe the timeline they want as a mapping of
+(plant_id, trait) -> (expected_date, status_flag). The synchronizer reads the
+existing rows once, then applies only the inserts, updates and deletes needed
+to reach that state, in bulk. Supervisor-entered ``actual_date`` and ``note``
+values on surviving rows are never touched.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .brapi_cache import bump_data_version
+from .models import TraitTimeline
+
+SYNC_BATCH_SIZE = 2000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sync_trait_timelines(desired, entered_by=None, scope=None, prune=True, batch_size=SYNC_BATCH_SIZE):
+    """
+    Bring TraitTimeline in line with ``desired``.
+
+    ``desired`` maps (plant_id, trait) to (expected_date, status_flag), with
+    expected_date as a ``datetime.date``. ``scope`` is an optional
+    TraitTimeline queryset limiting which existing rows are compared (and
+    therefore eligible for deletion); it defaults to the whole table. With
+    ``prune=False`` rows missing from ``desired`` are left alone.
+
+    Returns a dict of counts: created, updated, deleted, unchanged.
+    """
+    if scope is None:
+        scope = TraitTimeline.objects.all()
+
+    existing = {}
+    duplicate_ids = []
+    rows = scope.order_by('id').values_list('id', 'plant_id', 'trait', 'expected_date', 'status_flag')
+    for pk, plant_id, trait, expected_date, status_flag in rows.iterator(chunk_size=batch_size):
+        key = (plant_id, trait)
+        if key in existing:
+            duplicate_ids.append(pk)
+        else:
+            existing[key] = (pk, expected_date, status_flag)
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    unchanged = 0
+
+    for key, (expected_date, status_flag) in desired.items():
+        current = existing.pop(key, None)
+        if current is None:
+            to_create.append(TraitTimeline(
+                plant_id=key[0],
+                trait=key[1],
+                expected_date=expected_date,
+                status_flag=status_flag,
+                entered_by=entered_by,
+            ))
+        elif (current[1], current[2]) != (expected_date, status_flag):
+            to_update.append(TraitTimeline(
+                id=current[0],
+                expected_date=expected_date,
+                status_flag=status_flag,
+                updated_on=now,
+            ))
+        else:
+            unchanged += 1
+
+    # Whatever is left in `existing` is no longer wanted
+    to_delete = duplicate_ids + ([pk for pk, _, _ in existing.values()] if prune else [])
+
+    with transaction.atomic():
+        if to_create:
+            TraitTimeline.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            TraitTimeline.objects.bulk_update(
+                to_update, ['expected_date', 'status_flag', 'updated_on'], batch_size=batch_size
+            )
+        for ids in _chunks(to_delete, batch_size):
+            TraitTimeline.objects.filter(id__in=ids).delete()
+        # bulk_create / bulk_update send no signals
+        if to_create or to_update:
+            bump_data_version(TraitTimeline)
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+    }
+
+
+def reminder_flag(expected_date, today, observed):
+    """Status flag for one plant × trait: observed, overdue, due within 3 days or too early."""
+    if observed:
+        return '✔️'
+    if today >= expected_date:
+        return '❌'
+    if (expected_date - today).days <= 3:
+        return '⏳'
+    return '🕓'
+
+
+def build_desired_timelines(plots, trait_schedule, observed_pairs, today):
+    """
+    Compute the desired timeline map for ``plots`` entirely in memory.
+
+    ``plots`` is an iterable of (plant_id, planting_date); ``trait_schedule``
+    maps trait -> days after planting; ``observed_pairs`` is a set of
+    (plant_id, trait) that already have PlantTraitData.
+    """
+    desired = {}
+    for plant_id, planting_date in plots:
+        if not planting_date:
+            continue
+        for trait, due_day in trait_schedule.items():
+            if due_day is None:
+                continue
+            expected_date = planting_date + timedelta(days=due_day)
+            observed = (plant_id, trait) in observed_pairs
+            desired[(plant_id, trait)] = (expected_date, reminder_flag(expected_date, today, observed))
+    return desired
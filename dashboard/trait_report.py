@@ -0,0 +1,89 @@
+"""
+dashboard.trait_report
+
+The trait status report of export_trait_pdf: the plot x trait status flags
+of TraitTimeline, read with one query (pivot_timeline_flags).
+
+The rows are laid out as page-sized tables rather than one long table, and
+a report with more than TRAIT_REPORT_PLANTS_PER_FILE plants is split into
+several PDFs, each rendered from its own small HTML document. xhtml2pdf
+takes about a second per thousand cells, so parts are kept small.
+"""
+
+import datetime
+import io
+import zipfile
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from xhtml2pdf import pisa
+
+from .models import FieldPlot, TraitTimeline
+
+DEFAULT_PLANTS_PER_FILE = 500
+# About one A4 page of rows at the report's font size
+ROWS_PER_TABLE = 40
+
+FLAG_CLASSES = {'✔️': 'completed', '❌': 'overdue', '⏳': 'due-soon', '🕓': 'too-early'}
+
+
+def plants_per_file():
+    return getattr(settings, 'TRAIT_REPORT_PLANTS_PER_FILE', DEFAULT_PLANTS_PER_FILE)
+
+
+def report_timelines(trial=None):
+    """The TraitTimeline rows of the report, of one Trial pk or of all plots."""
+    timelines = TraitTimeline.objects.all()
+    if trial is not None:
+        timelines = timelines.filter(plant_id__in=FieldPlot.objects.filter(trial_id=trial).values('plant_id'))
+    return timelines
+
+
+def report_plants(timelines):
+    """The plant_ids of the report's rows, in order, without pivoting the flags."""
+    return list(timelines.order_by('plant_id').values_list('plant_id', flat=True).distinct())
+
+
+def report_parts(rows, size=None):
+    """``rows`` (or plant_ids) cut into the plants of each file; always at least one (possibly empty) part."""
+    size = size or plants_per_file()
+    return [rows[start:start + size] for start in range(0, len(rows), size)] or [[]]
+
+
+def report_html(traits, rows, part=1, parts=1, generated_on=None):
+    tables = [
+        [{"plant_id": plant_id, "cells": [(flag, FLAG_CLASSES.get(flag, '')) for flag in flags]}
+         for plant_id, flags in rows[start:start + ROWS_PER_TABLE]]
+        for start in range(0, len(rows), ROWS_PER_TABLE)
+    ]
+    return render_to_string("dashboard/pdf_trait_report.html", {
+        "generated_on": generated_on or datetime.datetime.now(),
+        "trait_names": traits,
+        "tables": tables,
+        "part": part,
+        "parts": parts,
+    })
+
+
+def render_report(traits, rows, part=1, parts=1, generated_on=None):
+    """PDF bytes of one part of the report."""
+    output = io.BytesIO()
+    pisa.CreatePDF(report_html(traits, rows, part, parts, generated_on), dest=output)
+    return output.getvalue()
+
+
+def report_filename(part=1, parts=1):
+    if parts == 1:
+        return "trait_status_report.pdf"
+    return f"trait_status_report_part{part:0{len(str(parts))}d}of{parts}.pdf"
+
+
+def render_report_zip(traits, parts):
+    """A ZIP of one PDF per part (PDFs are already compressed, so they are stored)."""
+    generated_on = datetime.datetime.now()
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+        for part, rows in enumerate(parts, start=1):
+            archive.writestr(report_filename(part, len(parts)),
+                             render_report(traits, rows, part, len(parts), generated_on))
+    return output.getvalue()
@@ -0,0 +1,179 @@
+"""
+dashboard.trait_values
+
+The plant x trait grid of the field visualization as columns rather than
+one object per plant.
+
+trait_columns() reads the plots and, with one aggregated query, the latest
+value of every trait for those plots; cached_trait_columns() keeps recent
+results per data version. Plant ids are sent once; statuses and text traits
+are dictionary-encoded; numeric traits become flat value arrays with a
+validity bitmap (bit i set when plant i has a value, least significant bit
+first) and their min/max range.
+
+as_json() gives the default payload, with values as lists and bitmaps in
+base64. as_binary() packs the same columns for JavaScript typed arrays:
+
+    uint32 (little-endian)   length of the JSON header
+    header                   as_json() without the data, each column naming
+                             its buffers as [byte offset, byte length], the
+                             offset counted from the end of the header
+    buffers                  8-byte aligned: float32 values, uint8/uint16/
+                             uint32 codes (named by each column's dtype),
+                             uint8 bitmaps
+"""
+
+import base64
+import json
+import math
+import struct
+import sys
+from array import array
+
+from django.conf import settings
+
+from .brapi_cache import ResponseCache
+from .models import PlantTraitData
+from .pivot import latest_observations
+
+# A 20k-plot x 30-trait grid takes about 5 MB, so only a few are kept
+DEFAULT_CACHE_ENTRIES = 4
+
+columns_cache = ResponseCache(getattr(settings, 'TRAIT_VALUES_CACHE_ENTRIES', DEFAULT_CACHE_ENTRIES))
+
+
+def parse_numbers(values):
+    """The values as floats, or None unless every one is a finite number."""
+    try:
+        numbers = list(map(float, values))
+    except ValueError:
+        return None
+    return numbers if all(map(math.isfinite, numbers)) else None
+
+
+def code_type(size):
+    """array typecode and dtype name for dictionary codes of a ``size``-entry dictionary."""
+    if size <= 0xFF:
+        return 'B', 'uint8'
+    if size <= 0xFFFF:
+        return 'H', 'uint16'
+    return 'I', 'uint32'
+
+
+def validity_bitmap(positions, length):
+    bitmap = bytearray((length + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return bitmap
+
+
+def dictionary_column(positions, values, length):
+    """(dictionary, codes, dtype) for text ``values`` at ``positions``; other plants get code 0."""
+    dictionary = sorted(set(values))
+    code_of = {value: code for code, value in enumerate(dictionary)}
+    typecode, dtype = code_type(len(dictionary))
+    codes = array(typecode, bytes(array(typecode).itemsize * length))
+    for position, value in zip(positions, values):
+        codes[position] = code_of[value]
+    return dictionary, codes, dtype
+
+
+def trait_column(name, positions, values, length):
+    """One trait: numeric when every recorded value is a finite number, else dictionary-encoded text."""
+    column = {"name": name, "count": len(positions), "valid": validity_bitmap(positions, length)}
+    numbers = parse_numbers(values)
+    if numbers:
+        data = array('d', bytes(8 * length))
+        for position, number in zip(positions, numbers):
+            data[position] = number
+        column.update(type="numeric", values=data, range=[min(numbers), max(numbers)])
+    else:
+        dictionary, codes, dtype = dictionary_column(positions, values, length)
+        column.update(type="category", dtype=dtype, dictionary=dictionary, values=codes, range=None)
+    return column
+
+
+def trait_columns(plots):
+    """Columns for ``plots`` (a FieldPlot queryset), plants in primary-key order."""
+    plants, statuses = [], []
+    for plant_id, plot_status in plots.values_list('plant_id', 'status').order_by('pk'):
+        plants.append(plant_id)
+        statuses.append(plot_status)
+    position_of = {plant_id: i for i, plant_id in enumerate(plants)}
+
+    # trait -> ([plant positions], [values])
+    by_trait = {}
+    observations = PlantTraitData.objects.filter(plant_id__in=plots.values('plant_id'))
+    for plant_id, trait, value in latest_observations(observations).values_list('plant_id', 'trait', 'value'):
+        if value is None or value == '':
+            continue
+        column = by_trait.get(trait)
+        if column is None:
+            column = by_trait[trait] = ([], [])
+        column[0].append(position_of[plant_id])
+        column[1].append(value)
+
+    status_dictionary, status_codes, status_dtype = dictionary_column(range(len(plants)), statuses, len(plants))
+    return {
+        "plants": plants,
+        "status": {"dictionary": status_dictionary, "dtype": status_dtype, "codes": status_codes},
+        "traits": [trait_column(name, *by_trait[name], len(plants)) for name in sorted(by_trait)],
+    }
+
+
+def cached_trait_columns(plots, key):
+    """
+    trait_columns(plots), kept in a small per-process LRU under ``key``,
+    which must change whenever the result can (e.g. include data_versions()).
+    """
+    columns = columns_cache.get(key)
+    if columns is None:
+        columns = trait_columns(plots)
+        columns_cache.set(key, columns)
+    return columns
+
+
+def as_json(columns):
+    return {
+        "plants": columns["plants"],
+        "status": {**columns["status"], "codes": columns["status"]["codes"].tolist()},
+        "traits": [
+            {**trait, "values": trait["values"].tolist(), "valid": base64.b64encode(trait["valid"]).decode('ascii')}
+            for trait in columns["traits"]
+        ],
+    }
+
+
+def little_endian(data):
+    if isinstance(data, array) and sys.byteorder == 'big':
+        data = array(data.typecode, data)
+        data.byteswap()
+    return bytes(data)
+
+
+def as_binary(columns):
+    buffers, offset = [], 0
+
+    def add(data):
+        nonlocal offset
+        raw = little_endian(data)
+        buffers.append(raw + bytes(-len(raw) % 8))
+        position, offset = offset, offset + len(buffers[-1])
+        return [position, len(raw)]
+
+    header = {
+        "plants": columns["plants"],
+        "status": {**columns["status"], "codes": add(columns["status"]["codes"])},
+        "traits": [],
+    }
+    for trait in columns["traits"]:
+        values = trait["values"]
+        if trait["type"] == "numeric":
+            # Half the bytes of float64, and plenty for colouring a grid
+            trait = {**trait, "dtype": "float32"}
+            values = array('f', values)
+        header["traits"].append({**trait, "values": add(values), "valid": add(trait["valid"])})
+    encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Pad so that the buffers, and every typed array in them, start 8-byte aligned
+    encoded += b' ' * (-(4 + len(encoded)) % 8)
+    return struct.pack('<I', len(encoded)) + encoded + b''.join(buffers)
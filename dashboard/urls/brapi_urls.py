@@ -10,6 +10,7 @@ urlpatterns = [
     path('observationunits', brapi_views.brapi_observationunits, name='brapi_observationunits'),
     path('observationvariables', brapi_views.brapi_observationvariables, name='brapi_observationvariables'),
     path('observations', brapi_views.brapi_observations, name='brapi_observations'),
+    path('observations/table', brapi_views.brapi_observations_table, name='brapi_observations_table'),
     path('programs', brapi_views.brapi_programs, name='brapi_programs'),
     path('studies', brapi_views.brapi_studies, name='brapi_studies'),
     path('studies/<str:studyDbId>', brapi_views.brapi_study_detail, name='brapi_study_detail'),
@@ -24,4 +25,7 @@ urlpatterns = [
     path('people', brapi_views.brapi_people, name='brapi_people'),
     path('observationmethods', brapi_views.brapi_observationmethods, name='brapi_observationmethods'),
     path('images', brapi_views.brapi_images, name='brapi_images'),
+    path('search/<str:entity>', brapi_views.brapi_search, name='brapi_search'),
+    path('search/<str:entity>/<str:searchResultsDbId>', brapi_views.brapi_search_results, name='brapi_search_results'),
+    path('batch', brapi_views.brapi_batch, name='brapi_batch'),
 ]
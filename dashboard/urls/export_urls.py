@@ -9,5 +9,7 @@ urlpatterns = [
     path("export-trait-reminders-pdf/", views.export_trait_reminders_pdf, name="export_trait_reminders_pdf"),
     path("export-trait-status-pdf/", views.export_trait_status_pdf, name="export_trait_status_pdf"),
     path("upload-trait-status-csv/", views.upload_trait_status_csv, name="upload_trait_status_csv"),
+    path("pdf-jobs/<str:key>/", views.pdf_job_status, name="pdf_job_status"),
+    path("pdf-jobs/<str:key>/download/", views.pdf_job_download, name="pdf_job_download"),
 
 ]
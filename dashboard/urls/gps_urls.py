@@ -10,4 +10,5 @@ urlpatterns = [
     path('field-visualization/', views.field_visualization_view, name='field_visualization'),
     path('bulk-gps/', views.bulk_gps_assignment, name='bulk_gps'),
     path('api/plot-coordinates/', views.plot_coordinates_api, name='plot_coordinates_api'),
+    path('api/trait-values/', views.trait_values_api, name='trait_values_api'),
 ]
@@ -9,9 +9,12 @@ urlpatterns = [
     # 📋 Trait Table & Heatmap
     path("trait-status/", views.trait_status_table, name="trait_status_table"),
     path("trait-heatmap/", views.trait_heatmap_view, name="trait_heatmap_view"),
+    path("trait-heatmap/tiles/", views.trait_heatmap_tiles, name="trait_heatmap_tiles"),
+    path("trait-heatmap/raster/", views.trait_heatmap_raster, name="trait_heatmap_raster"),
 
     # ⏰ Timeline Dashboard
     path("reminder-dashboard/", views.trait_reminder_dashboard, name="trait_reminder_dashboard"),
+    path("reminder-dashboard/counts/<str:group>/", views.trait_reminder_counts, name="trait_reminder_counts"),
 
     # 📝 Trait Editing
     path("edit-traits/", views.edit_traits_view, name="edit_traits_view"),
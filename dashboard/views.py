@@ -9,13 +9,10 @@
 # --- Built-in modules ---
 import csv
 import datetime
-import io
 import json
-import tempfile
 import traceback
 from datetime import timedelta
 from io import TextIOWrapper
-from collections import defaultdict # Added for trait_heatmap_view
 
 # --- Django core ---
 from django.contrib import messages
@@ -26,28 +23,47 @@ from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import EmailMessage, send_mail
 from django.core.paginator import Paginator
-from django.db.models import Q, F, Value # F and Value added for trait_heatmap_view
-from django.db.models.functions import Coalesce # Coalesce added for trait_heatmap_view
-from django.http import HttpResponse, JsonResponse, HttpResponseServerError
-from django.shortcuts import render, redirect
-from django.template.loader import render_to_string, get_template
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, HttpResponseServerError
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views.decorators.csrf import csrf_exempt    
-from django.views.decorators.http import require_GET, require_http_methods, require_POST
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import etag, require_GET, require_http_methods, require_POST
 
 # --- Third-party libraries ---
-from weasyprint import HTML
-from xhtml2pdf import pisa
 import requests # Added for test_brapi_api
 
 # --- Local app imports ---
 from .forms import BulkGPSAssignmentForm, CustomUserCreationForm, TraitStatusUploadForm
-from .models import FieldPlot, PlantData, PlantTraitData, TraitSchedule, TraitTimeline
-from .utils import calculate_trait_reminder_status
+from .brapi_cache import data_versions, make_etag
+from .heatmap_raster import KINDS, MAX_ZOOM, raster_tile
+from .heatmap_tiles import (
+    FLAG_LEVELS, MAX_TILE_COLUMNS, MAX_TILE_ROWS, heatmap_rows, heatmap_tile, heatmap_traits, parse_flag_filter
+)
+from .ingest import ingest_trait_csv
+from .matrix_store import (
+    TraitMatrixWriter, iter_matrix_rows, matrix_flags, remember_matrix, resolve_matrix, update_matrix_value
+)
+from .models import FieldPlot, PdfJob, PlantData, PlantTraitData, TraitSchedule, TraitTimeline
+from .pdf_jobs import (
+    content_type as pdf_content_type, job_path as pdf_job_path, recover_stale_jobs as recover_stale_pdf_jobs,
+    request_pdf,
+)
+from .plot_map import DEFAULT_TRAITS, parse_zoom, plot_features
+from .reminders import (
+    FILTER_PARAMS, GROUP_FIELDS, STATUS_KEYS, filter_reminders, reminder_context, reminder_counts,
+    with_reminder_status,
+)
+from .spatial import parse_bbox
+from .timeline_sync import sync_trait_timelines
+from .trait_report import plants_per_file, report_filename, report_parts, report_plants, report_timelines
+from .trait_values import as_binary, as_json, cached_trait_columns
 
 
 # ----------------------------------------------------------------------------
@@ -251,41 +267,24 @@ def update_user_status(request):
 def upload_csv(request):
     if request.method == 'POST' and request.FILES.get('file'):
         file = TextIOWrapper(request.FILES['file'].file, encoding='utf-8')
-        reader = csv.reader(file)
-        headers = next(reader)
-        data = []
+        matrix_writer = TraitMatrixWriter(user=request.user)
         planting_dates = {}
-        trait_fields = [h for h in headers if h.lower() not in ['plant_id', 'block', 'row', 'column', 'planting_date']]
-
-        for row in reader:
-            entry = dict(zip(headers, row))
-            data.append(entry)
-            if entry.get("plant_id") and entry.get("planting_date"):
-                try:
-                    planting_dates[entry["plant_id"]] = timezone.datetime.strptime(entry["planting_date"], "%Y-%m-%d")
-                except ValueError:
-                    planting_dates[entry["plant_id"]] = None
-
-        for entry in data:
-            pid = entry.get("plant_id")
-            for trait in trait_fields:
-                value = entry.get(trait, '').strip()
-                if value:
-                    PlantTraitData.objects.create(
-                        plant_id=pid,
-                        trait=trait,
-                        value=value,
-                        uploaded_by=request.user
-                    )
 
         trait_schedule = {t.trait: t.days_after_planting for t in TraitSchedule.objects.all()}
         today = timezone.now()
         trait_flags, trait_due_dates, trait_summary = {}, {}, {}
-        complete, incomplete, empty = 0, 0, 0
+        totals = {'complete': 0, 'incomplete': 0, 'empty': 0}
         plot_labels, plot_data, plot_colors = [], [], []
 
-        for entry in data:
+        def summarize_row(entry, trait_fields):
+            # Runs once per sheet row while the ingest engine streams the file
             pid = entry.get("plant_id")
+            if pid and entry.get("planting_date"):
+                try:
+                    planting_dates[pid] = timezone.datetime.strptime(entry["planting_date"], "%Y-%m-%d")
+                except ValueError:
+                    planting_dates[pid] = None
+
             completed = 0
             flags = {}
             due_map = {}
@@ -297,7 +296,7 @@ def upload_csv(request):
                     completed += 1
                 else:
                     due_day = trait_schedule.get(trait)
-                    if due_day and pid in planting_dates and planting_dates[pid]:
+                    if due_day and planting_dates.get(pid):
                         expected_date_naive = planting_dates[pid] + timedelta(days=due_day)
                         expected_date = timezone.make_aware(expected_date_naive)
                         due_map[trait] = expected_date.strftime("%Y-%m-%d")
@@ -310,46 +309,49 @@ def upload_csv(request):
 
             trait_flags[pid] = flags
             trait_due_dates[pid] = due_map
+            matrix_writer.add(entry, flags, trait_fields)
             total_traits = len(trait_fields)
             plot_labels.append(pid)
             plot_data.append(completed)
             plot_colors.append("green" if completed == total_traits else ("red" if completed == 0 else "orange"))
-            complete += (completed == total_traits)
-            empty += (completed == 0)
-            incomplete += (0 < completed < total_traits)
+            totals['complete'] += (completed == total_traits)
+            totals['empty'] += (completed == 0)
+            totals['incomplete'] += (0 < completed < total_traits)
+
+        stats = ingest_trait_csv(file, user=request.user, on_row=summarize_row, on_headers=matrix_writer.set_headers)
+        headers = stats['headers']
 
-        request.session['cached_data'] = data
-        request.session['cached_trait_flags'] = trait_flags
+        matrix = matrix_writer.close()
+        if matrix is not None:
+            remember_matrix(request, matrix)
 
-        TraitTimeline.objects.all().delete()
+        desired_timeline = {}
         for pid, planting_date in planting_dates.items():
             if not planting_date:
                 continue
             for trait, days_after in trait_schedule.items():
-                expected_date = timezone.make_aware(planting_date + timedelta(days=days_after))
-                TraitTimeline.objects.update_or_create(
-                    plant_id=pid,
-                    trait=trait,
-                    defaults={
-                        'expected_date': expected_date,
-                        'actual_date': None,
-                        'status_flag': trait_flags.get(pid, {}).get(trait, '🕓'),
-                        'note': '',
-                        'entered_by': request.user
-                    }
-                )
-
-        messages.success(request, 'Trait data uploaded successfully!')
+                expected_date = (planting_date + timedelta(days=days_after)).date()
+                desired_timeline[(pid, trait)] = (expected_date, trait_flags.get(pid, {}).get(trait, '🕓'))
+        # Only the plants of this sheet: a partial upload must not prune the others' timelines
+        sheet_plants = sorted({pid for pid, _ in desired_timeline})
+        sync_trait_timelines(desired_timeline, entered_by=request.user,
+                             scope=TraitTimeline.objects.filter(plant_id__in=sheet_plants))
+
+        messages.success(
+            request,
+            f"Trait data uploaded successfully! {stats['cells']} values from {stats['rows']} plots "
+            f"in {stats['seconds']}s ({stats['cells_per_sec']} values/sec, peak memory {stats['peak_memory_mb']} MB)."
+        )
         return render(request, 'dashboard/index.html', {
             'headers': headers,
-            'data': data,
+            'upload_id': matrix.upload_id if matrix else None,
             'trait_flags': trait_flags,
             'trait_due_dates': trait_due_dates,
             'trait_summary': trait_summary,
             'plot_labels': plot_labels,
             'plot_data': plot_data,
             'plot_colors': plot_colors,
-            'summary_data': [complete, incomplete, empty],
+            'summary_data': [totals['complete'], totals['incomplete'], totals['empty']],
         })
     return render(request, 'dashboard/upload.html')
 @login_required
@@ -398,22 +400,18 @@ def upload_schedule_csv(request):
 
 @login_required
 def export_trait_status_csv(request):
+    matrix = resolve_matrix(request)
+    if matrix is None:
+        return HttpResponse("No cached data found. Please upload CSV data first.", status=400)
+
     headers = ['plant_id'] + [t.trait for t in TraitSchedule.objects.all()]
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="trait_status.csv"'
     writer = csv.writer(response)
     writer.writerow(headers)
 
-    data = request.session.get('cached_data')
-    trait_flags = request.session.get('cached_trait_flags')
-
-    if not data or not trait_flags:
-        return HttpResponse("No cached data found. Please upload CSV data first.", status=400)
-
-    for entry in data:
-        pid = entry.get('plant_id')
-        row = [pid] + [trait_flags.get(pid, {}).get(h, '') for h in headers[1:]]
-        writer.writerow(row)
+    for pid, _, flags in iter_matrix_rows(matrix):
+        writer.writerow([pid] + [flags.get(h, '') for h in headers[1:]])
 
     return response
 
@@ -472,18 +470,14 @@ def update_trait_value(request):
             trait = data.get('trait')
             new_value = data.get('value')
 
-            trait_flags = request.session.get('cached_trait_flags', {})
-            if plant_id in trait_flags and trait in trait_flags[plant_id]:
-                trait_flags[plant_id][trait] = new_value
-                request.session['cached_trait_flags'] = trait_flags
-
-            cached_data = request.session.get('cached_data', [])
-            for entry in cached_data:
-                if entry.get('plant_id') == plant_id:
-                    entry[trait] = new_value
-            request.session['cached_data'] = cached_data
+            matrix = resolve_matrix(request, data.get('upload_id'))
+            if matrix is None:
+                return JsonResponse({'success': False, 'message': 'No uploaded trait sheet found'}, status=400)
+            update_matrix_value(matrix, plant_id, trait, new_value)
 
             return JsonResponse({'success': True, 'message': 'Trait updated'})
+        except Http404 as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=404)
         except Exception as e:
             return JsonResponse({'success': False, 'message': str(e)}, status=500)
     return JsonResponse({'success': False, 'message': 'Invalid request method'}, status=405)
@@ -491,13 +485,12 @@ def update_trait_value(request):
 @login_required
 @require_http_methods(["GET"])
 def edit_traits_view(request):
-    data = request.session.get("cached_data", [])
-    trait_flags = request.session.get("cached_trait_flags", {})
-
-    if not data or not trait_flags:
+    matrix = resolve_matrix(request)
+    if matrix is None:
         return HttpResponse("No cached trait data available. Please upload first.", status=400)
 
-    trait_names = [h for h in data[0].keys() if h.lower() not in ["plant_id", "block", "row", "column", "planting_date"]]
+    trait_names = matrix.trait_fields
+    trait_flags = matrix_flags(matrix)
     plant_ids = list(trait_flags.keys())
 
     return render(request, "dashboard/edit_traits.html", {
@@ -588,20 +581,43 @@ def bulk_gps_assignment(request):
 
 @require_GET
 @login_required
+@gzip_page
 def plot_coordinates_api(request):
-    trait_map = {(pt.plant_id, pt.trait.lower()): pt.value for pt in PlantTraitData.objects.all()}
+    """
+    GeoJSON of the plots in ``bbox`` (west,south,east,north) at ``zoom``,
+    with the latest values of ``traits``; clustered at low zoom.
+    """
+    try:
+        bbox = parse_bbox(request.GET.get('bbox'))
+        zoom = parse_zoom(request.GET.get('zoom'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    traits = [t for param in request.GET.getlist('traits') for t in param.split(',') if t] or DEFAULT_TRAITS
+    return JsonResponse(plot_features(bbox, zoom, traits))
+
+def trait_values_etag(request):
+    return make_etag(request.get_full_path(), data_versions(PlantTraitData, FieldPlot))
+
+@require_GET
+@login_required
+@gzip_page
+@etag(trait_values_etag)
+def trait_values_api(request):
+    """
+    Latest value of every trait for every plot, as columns (see
+    dashboard.trait_values). ``?trial=<id>`` restricts it to one trial;
+    ``?format=binary`` returns the typed-array encoding.
+    """
     plots = FieldPlot.objects.all()
-    data = [{
-        "id": p.plant_id,
-        "latitude": p.latitude,
-        "longitude": p.longitude,
-        "status": p.status,
-        "traits": {
-            "height": trait_map.get((p.plant_id, "height")),
-            "chlorophyll": trait_map.get((p.plant_id, "chlorophyll")),
-        }
-    } for p in plots if p.latitude is not None and p.longitude is not None]
-    return JsonResponse({"plots": data})
+    trial = request.GET.get('trial')
+    if trial:
+        if not trial.isdigit():
+            return JsonResponse({"error": f"Invalid trial: {trial}"}, status=400)
+        plots = plots.filter(trial_id=int(trial))
+    columns = cached_trait_columns(plots, (trial, data_versions(PlantTraitData, FieldPlot)))
+    if request.GET.get('format') == 'binary':
+        return HttpResponse(as_binary(columns), content_type='application/octet-stream')
+    return JsonResponse(as_json(columns))
 
 # -----------------------------
 # 7. TRAIT TABLE & HEATMAP
@@ -609,18 +625,15 @@ def plot_coordinates_api(request):
 
 @login_required
 def trait_status_table(request):
-    data = request.session.get('cached_data')
-    trait_flags = request.session.get('cached_trait_flags')
+    matrix = resolve_matrix(request)
     headers = ['plant_id'] + [t.trait for t in TraitSchedule.objects.all()]
 
-    if not data or not trait_flags:
+    if matrix is None:
         return HttpResponse("No cached data found. Please upload trait data first.", status=400)
 
     table_rows = []
-    for entry in data:
-        pid = entry.get('plant_id')
-        row = [pid] + [trait_flags.get(pid, {}).get(trait, '🕓') for trait in headers[1:]]
-        table_rows.append(row)
+    for pid, _, flags in iter_matrix_rows(matrix):
+        table_rows.append([pid] + [flags.get(trait, '🕓') for trait in headers[1:]])
 
     zipped_rows = [zip(headers, row) for row in table_rows]
 
@@ -635,34 +648,85 @@ def trait_status_table(request):
 @login_required
 def trait_heatmap_view(request):
     """
-    Build the {plant_id: {trait: flag}} map in a single DB hit, with the
-    fallback of 🕓 (Too Early) handled in SQL via Coalesce.
+    The heatmap page itself is a fixed-size shell; it loads the matrix
+    window by window from trait_heatmap_tiles.
     """
-    # Query once – annotate missing flags with the literal 🕓
-    records = (
-        PlantTraitData.objects
-        .values("plant_id", "trait")
-        .annotate(flag=Coalesce(F("status_flag"), Value("🕓")))
-    )
-
-    # Build nested dict and collect all trait names
-    trait_flags = defaultdict(dict)
-    trait_set   = set()
-    for rec in records:
-        pid, trait, flag = rec["plant_id"], rec["trait"], rec["flag"]
-        trait_flags[pid][trait] = flag
-        trait_set.add(trait)
-
-    headers = ["PlantID", *sorted(trait_set)]    # first column header + traits
-    # The JS template only needs headers and trait_flags, but we keep data for completeness
-    data = []
-
-    context = {
-        "headers": json.dumps(headers),
-        "data": json.dumps(data),
-        "trait_flags": json.dumps(trait_flags),
-    }
-    return render(request, "dashboard/trait_heatmap.html", context)
+    return render(request, "dashboard/trait_heatmap.html", {"levels": json.dumps(FLAG_LEVELS)})
+
+def heatmap_etag(request):
+    return make_etag(request.get_full_path(), data_versions(PlantTraitData, FieldPlot))
+
+def window_param(request, name, default, maximum):
+    value = request.GET.get(name, '')
+    if not value:
+        return default
+    if not value.isdigit():
+        raise ValueError(f"Invalid {name}: {value}")
+    return min(int(value), maximum)
+
+@require_GET
+@login_required
+@gzip_page
+@etag(heatmap_etag)
+def trait_heatmap_tiles(request):
+    """
+    One tile of the trait heatmap (see dashboard.heatmap_tiles):
+    ``row_offset``/``row_limit`` and ``column_offset``/``column_limit`` pick
+    the window, ``trial`` the plots, ``sort=<trait>`` or ``sort=-<trait>``
+    orders rows by that trait's flag and each ``flag=<trait>:<level>`` keeps
+    only matching rows.
+    """
+    try:
+        row_offset = window_param(request, 'row_offset', 0, 10 ** 9)
+        row_limit = window_param(request, 'row_limit', 100, MAX_TILE_ROWS)
+        column_offset = window_param(request, 'column_offset', 0, 10 ** 9)
+        column_limit = window_param(request, 'column_limit', 50, MAX_TILE_COLUMNS)
+        flag_filters = [parse_flag_filter(value) for value in request.GET.getlist('flag')]
+        trial = window_param(request, 'trial', None, 10 ** 18)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    plots = FieldPlot.objects.all() if trial is None else FieldPlot.objects.filter(trial_id=trial)
+    traits = heatmap_traits(plots, (trial, data_versions(PlantTraitData, FieldPlot)))
+    rows = heatmap_rows(plots, request.GET.get('sort'), flag_filters)
+    tile = heatmap_tile(rows, traits, row_offset, row_limit, column_offset, column_limit)
+    tile.update(total_rows=rows.count(), total_columns=len(traits))
+    return JsonResponse(tile)
+
+@require_GET
+@login_required
+@etag(heatmap_etag)
+def trait_heatmap_raster(request):
+    """
+    A PNG tile of the plant x trait matrix (see dashboard.heatmap_raster).
+    ``kind`` is ``status`` (default) or ``values``, ``trial`` picks the
+    plots and ``zoom``/``x``/``y`` the tile; without ``zoom`` the whole
+    matrix comes as one overview tile. ``?format=json`` describes the
+    matrix (size, zoom, column traits) instead.
+    """
+    kind = request.GET.get('kind', 'status')
+    try:
+        if kind not in KINDS:
+            raise ValueError(f"Invalid kind: {kind}")
+        zoom = window_param(request, 'zoom', None, MAX_ZOOM)
+        x = window_param(request, 'x', 0, 10 ** 9)
+        y = window_param(request, 'y', 0, 10 ** 9)
+        trial = window_param(request, 'trial', None, 10 ** 18)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    plots = FieldPlot.objects.all() if trial is None else FieldPlot.objects.filter(trial_id=trial)
+    cache_key = (None if trial is None else str(trial), data_versions(PlantTraitData, FieldPlot))
+    png, info = raster_tile(kind, plots, cache_key, zoom, x, y)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(info)
+    if png is None:
+        return JsonResponse({"error": "Tile outside the matrix"}, status=404)
+    response = HttpResponse(png, content_type='image/png')
+    response['X-Heatmap-Rows'] = info["rows"]
+    response['X-Heatmap-Columns'] = info["columns"]
+    response['X-Heatmap-Zoom'] = info["zoom"]
+    return response
 
 # -----------------------------
 # 8. PLANTING DATES EDITORS
@@ -707,149 +771,141 @@ def plot_planting_dates(request):
 
 @login_required
 def trait_reminder_dashboard(request):
-    timelines = TraitTimeline.objects.all().order_by('plant_id', 'trait')
-    plant_trait_map = {}
-    trait_reminders = []
-
-    for entry in timelines:
-        plant_id = entry.plant_id
-        trait = entry.trait
-        expected = entry.expected_date
-        actual = entry.actual_date
-        status = calculate_trait_reminder_status(expected, actual)
-
-        # Update matrix display
-        plant_trait_map.setdefault(plant_id, {})[trait] = status
-
-        # Add to reminder list
-        trait_reminders.append({
-            'plot': plant_id,
-            'trait': trait,
-            'status': status,
-            'expected_date': expected,
-            'actual_date': actual,
-            'note': entry.note,
-        })
+    try:
+        timelines = filter_reminders(with_reminder_status(), request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    context = reminder_context(timelines)
+    context.update(status_counts=reminder_counts(timelines), status_keys=STATUS_KEYS)
+    return render(request, 'dashboard/trait_reminder_dashboard.html', context)
+
+@require_GET
+@login_required
+@gzip_page
+def trait_reminder_counts(request, group):
+    """
+    Reminder counts per status, computed in SQL: overall (``status``), or
+    per ``trait`` or ``plot``. Takes the dashboard's filters (``status``,
+    ``trait``, ``plant_id``, ``trial``).
+    """
+    if group not in GROUP_FIELDS:
+        return JsonResponse({"error": f"Unknown grouping: {group}"}, status=404)
+    try:
+        timelines = filter_reminders(with_reminder_status(), request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({"group": group, "counts": reminder_counts(timelines, group)})
 
-    trait_list = sorted(set(t.trait for t in timelines))
-    plant_ids = sorted(plant_trait_map.keys())
-    return render(request, 'dashboard/trait_reminder_dashboard.html', {
-        'trait_list': trait_list,
-        'plant_trait_map': plant_trait_map,
-        'plant_ids': plant_ids,
-        'trait_reminders': trait_reminders,
-    })
 # -----------------------------
 # 10. Export views
 # -----------------------------
 
 @login_required
 def export_trait_reminders_pdf(request):
-    timelines = TraitTimeline.objects.all().order_by('plant_id', 'trait')
-    plant_trait_map = {}
-    trait_reminders = []
-
-    for entry in timelines:
-        plant_id = entry.plant_id
-        trait = entry.trait
-        expected = entry.expected_date
-        actual = entry.actual_date
-        status = calculate_trait_reminder_status(expected, actual)
-
-        plant_trait_map.setdefault(plant_id, {})[trait] = status
-        trait_reminders.append({
-            'plot': plant_id,
-            'trait': trait,
-            'status': status,
-            'expected_date': expected,
-            'actual_date': actual,
-            'note': entry.note,
-        })
-
-    trait_list = sorted(set(t.trait for t in timelines))
-    plant_ids = sorted(plant_trait_map.keys())
-
-    context = {
-        'trait_list': trait_list,
-        'plant_trait_map': plant_trait_map,
-        'plant_ids': plant_ids,
-        'trait_reminders': trait_reminders,
+    try:
+        # Only validates the filters; the job runs the query
+        filter_reminders(with_reminder_status(), request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    inputs = {
+        "params": {name: request.GET.getlist(name) for name in FILTER_PARAMS if name in request.GET},
+        "today": timezone.now().date().isoformat(),
+        "versions": data_versions(TraitTimeline, FieldPlot),
     }
+    return pdf_job_response(request, 'trait_reminders', inputs, 'trait_reminders.pdf')
 
-    template = get_template('dashboard/trait_reminder_pdf.html')
-    html_content = template.render(context)
-
-    with tempfile.NamedTemporaryFile(delete=True, suffix='.pdf') as output:
-        HTML(string=html_content).write_pdf(output.name)
-        output.seek(0)
-        return HttpResponse(output.read(), content_type='application/pdf')
 
-
-# ──────────────────────────────────────────────────────────────────────────────
-# 2️⃣  Trait-Status PDF Export  (remove bad select_related on CharFields)
-# ──────────────────────────────────────────────────────────────────────────────
 @login_required
 def export_trait_status_pdf(request):
-    # CharFields are NOT relations → select_related('plant_id') would crash
-    trait_data = PlantTraitData.objects.all()
-
-    html_string = render_to_string(
-        "dashboard/trait_status_pdf.html",
-        {"data": trait_data},
-    )
-    pdf_file = HTML(string=html_string).write_pdf()
-
-    response = HttpResponse(pdf_file, content_type="application/pdf")
-    response["Content-Disposition"] = (
-        'attachment; filename="trait_status_report.pdf"'
-    )
-    return response
+    inputs = {"versions": data_versions(PlantTraitData)}
+    return pdf_job_response(request, 'trait_status', inputs, 'trait_status_report.pdf')
 
 @login_required
 def export_trait_pdf(request):
-    traits = TraitTimeline.objects.values_list('trait', flat=True).distinct()
-    plants = TraitTimeline.objects.values_list('plant_id', flat=True).distinct()
-
-    data = []
-    for plant_id in plants:
-        row = {"plant_id": plant_id, "traits": {}}
-        for trait in traits:
-            record = TraitTimeline.objects.filter(plant_id=plant_id, trait=trait).first()
-            row["traits"][trait] = record.status_flag if record else "-"
-        data.append(row)
-
-    html = render_to_string("dashboard/pdf_trait_report.html", {
-        "generated_on": datetime.datetime.now(),
-        "plant_traits": data,
-        "trait_names": traits,
+    """
+    The trait status report (see dashboard.trait_report), optionally for
+    one ``trial``. A report too large for one file is split: the page then
+    links each part (``?part=N``) and a ZIP of all of them (``?part=all``).
+    """
+    trial = request.GET.get('trial')
+    if trial and not trial.isdigit():
+        return HttpResponse(f"Invalid trial: {trial}", status=400)
+    trial = int(trial) if trial else None
+    inputs = {
+        "trial": trial,
+        "plants_per_file": plants_per_file(),
+        "versions": data_versions(TraitTimeline, FieldPlot),
+    }
+
+    part = request.GET.get('part')
+    if part == 'all':
+        return pdf_job_response(request, 'trait_report_zip', inputs, 'trait_status_report.zip')
+
+    # Only the plant_ids, to number the parts; the job pivots the flags
+    timelines = report_timelines(trial)
+    plants = report_plants(timelines)
+    parts = report_parts(plants, inputs["plants_per_file"])
+    if part or len(parts) == 1:
+        number = (int(part) if part.isdigit() else 0) if part else 1
+        if not 1 <= number <= len(parts):
+            return HttpResponse(f"Invalid part: {part} (the report has {len(parts)})", status=400)
+        inputs["part"] = number
+        return pdf_job_response(request, 'trait_report', inputs, report_filename(number, len(parts)))
+
+    def query(part):
+        params = request.GET.copy()
+        params['part'] = part
+        return params.urlencode()
+
+    return render(request, 'dashboard/trait_report_parts.html', {
+        "plants": len(plants),
+        "traits": timelines.order_by().values('trait').distinct().count(),
+        "plants_per_file": inputs["plants_per_file"],
+        "parts": [
+            {"query": query(number), "filename": report_filename(number, len(parts)),
+             "first": plants_part[0], "last": plants_part[-1]}
+            for number, plants_part in enumerate(parts, start=1)
+        ],
+        "all_query": query('all'),
     })
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="trait_status_report.pdf"'
-    pisa.CreatePDF(html, dest=response)
-    return response
 @login_required
 def download_snapshot_pdf(request, plant_id):
-    traits = PlantTraitData.objects.filter(plant_id=plant_id).order_by('trait', '-timestamp')
-    grouped = {}
-    for t in traits:
-        grouped.setdefault(t.trait, []).append({
-            "value": t.value,
-            "timestamp": t.timestamp.strftime('%Y-%m-%d %H:%M'),
-            "user": t.uploaded_by.username if t.uploaded_by else "unknown"
-        })
+    inputs = {"plant_id": plant_id, "versions": data_versions(PlantTraitData)}
+    return pdf_job_response(request, 'plant_snapshot', inputs, f"snapshot_{plant_id}.pdf")
 
-    context = {
-        "plant_id": plant_id,
-        "grouped_traits": grouped,
-    }
-    template = get_template("dashboard/plant_snapshot_pdf.html")
-    html = template.render(context)
+def pdf_job_response(request, kind, inputs, filename):
+    """Start (or find) the PdfJob for a report: straight to the file when cached, else to its status page."""
+    job = request_pdf(kind, inputs, filename, request.user)
+    if job.status == PdfJob.DONE:
+        return redirect('exports:pdf_job_download', key=job.key)
+    return redirect('exports:pdf_job_status', key=job.key)
 
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="snapshot_{plant_id}.pdf"'
-    pisa.CreatePDF(io.StringIO(html), dest=response)
-    return response
+@login_required
+def pdf_job_status(request, key):
+    """Progress of a PdfJob: a page that polls itself, or JSON with ``?format=json``."""
+    job = get_object_or_404(PdfJob, key=key)
+    if job.status in (PdfJob.PENDING, PdfJob.RUNNING) and recover_stale_pdf_jobs(PdfJob.objects.filter(pk=job.pk)):
+        job.refresh_from_db()
+    download_url = reverse('exports:pdf_job_download', kwargs={'key': key})
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            "status": job.status,
+            "filename": job.filename,
+            "error": job.error,
+            "download_url": download_url if job.status == PdfJob.DONE else None,
+        })
+    return render(request, 'dashboard/pdf_job_status.html', {"job": job, "download_url": download_url})
+
+@login_required
+def pdf_job_download(request, key):
+    job = get_object_or_404(PdfJob, key=key, status=PdfJob.DONE)
+    try:
+        document = open(pdf_job_path(job), 'rb')
+    except FileNotFoundError:
+        # Expired from the cache: render it again
+        return pdf_job_response(request, job.kind, job.inputs, job.filename)
+    return FileResponse(document, as_attachment=True, filename=job.filename, content_type=pdf_content_type(job))
 
 # -----------------------------
 # 11. Mail
@@ -78,6 +78,7 @@ urlpatterns = [
     path("field-visualization/", views.field_visualization_view, name="field_visualization"),
     path("field-map/", views.field_map_view, name="field_map"),
     path("api/plot-coordinates/", views.plot_coordinates_api, name="plot_coordinates_api"),
+    path("api/trait-values/", views.trait_values_api, name="trait_values_api"),
 
     # ---------------------------------------------------------------
     # Planting & User Management